@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""Assign "Unassigned" reviews that carry coordinates to the nearest known location.
+
+Reviews posted without a location_id land on the Unassigned location
+(bulk_import.UNASSIGNED_NAME), optionally with the reviewer's lat/lon. For
+every such review with coordinates, propose() finds the nearest location in
+one pass. Locations with coordinates are loaded once into NumPy arrays
+sorted by latitude. Each review binary-searches the latitude band within
+max_distance, then runs a vectorized haversine over that band only. A
+proposal needs a location within max_distance miles. Its confidence is
+
+    (1 - d1 / max_distance) * (1 - d1 / d2)
+
+where d1 is the nearest location's distance and d2 the runner-up's (the
+second factor is 1 when no other location is in range). So a review right
+at one location with no competition scores 1; one equidistant between two
+places, or at the edge of the range, scores near 0.
+
+apply() moves the proposals at or above min_confidence to their locations
+in one transaction and refreshes location_stats for every location involved.
+A review a curator reassigned in the meantime is left alone.
+
+Run from backend dir (or: docker compose exec backend python3 auto_assign.py ...):
+   python3 auto_assign.py                      # dry run: print proposals
+   python3 auto_assign.py --apply --min-confidence 0.6
+Also POST /reviews/auto-assign (apply=false by default).
+"""
+import argparse
+import bisect
+
+import numpy as np
+from sqlalchemy import and_, bindparam, select, update
+from sqlalchemy.orm import Session
+
+import geo
+import location_stats
+import models, schemas
+from bulk_import import UNASSIGNED_NAME
+
+DEFAULT_MAX_DISTANCE = 0.1  # miles; a phone's GPS fix is usually well within this
+DEFAULT_MIN_CONFIDENCE = 0.5
+
+
+def _unassigned_ids(db: Session) -> list:
+    loc = models.WingLocation
+    return [loc_id for (loc_id,) in db.query(loc.id).filter(loc.name == UNASSIGNED_NAME)]
+
+
+def propose(db: Session, max_distance: float = DEFAULT_MAX_DISTANCE, limit: int = None):
+    """(proposals, examined, without_coordinates) for the Unassigned reviews; proposals are
+    dicts shaped like schemas.AutoAssignment, most confident first."""
+    unassigned = _unassigned_ids(db)
+    if not unassigned:
+        return [], 0, 0
+    review = models.WingReview
+    pending = db.query(review.id, review.lat, review.lon).filter(review.location_id.in_(unassigned))
+    placeable = pending.filter(review.lat.is_not(None), review.lon.is_not(None)).order_by(review.id)
+    reviews = (placeable.limit(limit) if limit is not None else placeable).all()
+    without_coordinates = pending.filter((review.lat.is_(None)) | (review.lon.is_(None))).count()
+
+    loc = models.WingLocation
+    locations = (
+        db.query(loc.id, loc.name, loc.lat, loc.lon)
+        .filter(loc.lat.is_not(None), loc.lon.is_not(None), loc.id.not_in(unassigned))
+        .order_by(loc.lat)
+        .all()
+    )
+    ids = np.array([row.id for row in locations], dtype=np.int64)
+    lats = np.array([row.lat for row in locations], dtype=float)
+    lons = np.array([row.lon for row in locations], dtype=float)
+    location_names = {row.id: row.name for row in locations}
+    lat_list = lats.tolist()
+    dlat = max_distance / geo.MILES_PER_DEGREE_LAT
+
+    proposals = []
+    for review_id, lat, lon in reviews:
+        lo = bisect.bisect_left(lat_list, lat - dlat)
+        hi = bisect.bisect_right(lat_list, lat + dlat)
+        if lo == hi:
+            continue
+        distances = geo.haversine_miles_array(lat, lon, lats[lo:hi], lons[lo:hi])
+        in_range = np.flatnonzero(distances <= max_distance)
+        if not len(in_range):
+            continue
+        order = in_range[np.argsort(distances[in_range], kind="stable")]
+        nearest = float(distances[order[0]])
+        runner_up = float(distances[order[1]]) if len(order) > 1 else None
+        separation = 1.0 if runner_up is None else (1.0 - nearest / runner_up if runner_up > 0 else 0.0)
+        location_id = int(ids[lo + order[0]])
+        proposals.append({
+            "review_id": review_id,
+            "location_id": location_id,
+            "location_name": location_names[location_id],
+            "distance": nearest,
+            "confidence": round((1.0 - nearest / max_distance) * separation, 4),
+            "runner_up_id": int(ids[lo + order[1]]) if runner_up is not None else None,
+            "runner_up_distance": runner_up,
+            "applied": False,
+        })
+    proposals.sort(key=lambda p: (-p["confidence"], p["review_id"]))
+    return proposals, len(reviews), without_coordinates
+
+
+def apply(db: Session, proposals, min_confidence: float = DEFAULT_MIN_CONFIDENCE) -> int:
+    """Move the confident proposals in one transaction (commits); marks them applied and returns how many moved."""
+    chosen = [p for p in proposals if p["confidence"] >= min_confidence]
+    if not chosen:
+        return 0
+    unassigned = _unassigned_ids(db)
+    table = models.WingReview.__table__
+    still_unassigned = table.c.location_id.in_(
+        select(models.WingLocation.id).where(models.WingLocation.name == UNASSIGNED_NAME)
+    )
+    stmt = (
+        update(table)
+        .where(and_(table.c.id == bindparam("review_id"), still_unassigned))
+        .values(location_id=bindparam("new_location_id"))
+    )
+    db.execute(stmt, [{"review_id": p["review_id"], "new_location_id": p["location_id"]} for p in chosen])
+    # Re-read which ones actually moved: a curator may have placed some meanwhile
+    moved = dict(db.execute(
+        select(table.c.id, table.c.location_id).where(table.c.id.in_([p["review_id"] for p in chosen]))
+    ).all())
+    applied = 0
+    for p in chosen:
+        if moved.get(p["review_id"]) == p["location_id"]:
+            p["applied"] = True
+            applied += 1
+    location_stats.refresh_locations(db, unassigned + [p["location_id"] for p in chosen if p["applied"]])
+    db.commit()
+    return applied
+
+
+def run(db: Session, max_distance: float = DEFAULT_MAX_DISTANCE, min_confidence: float = DEFAULT_MIN_CONFIDENCE,
+        do_apply: bool = False, limit: int = None) -> schemas.AutoAssignResponse:
+    proposals, examined, without_coordinates = propose(db, max_distance, limit)
+    applied = apply(db, proposals, min_confidence) if do_apply else 0
+    return schemas.AutoAssignResponse(
+        examined=examined,
+        without_coordinates=without_coordinates,
+        proposed=len(proposals),
+        applied=applied,
+        assignments=proposals,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Assign Unassigned reviews to the nearest known location.")
+    parser.add_argument("--apply", action="store_true", help="move the confident proposals (default: dry run)")
+    parser.add_argument("--max-distance", type=float, default=DEFAULT_MAX_DISTANCE, help="miles (default 0.1)")
+    parser.add_argument("--min-confidence", type=float, default=DEFAULT_MIN_CONFIDENCE, help="0-1 (default 0.5)")
+    parser.add_argument("--limit", type=int, help="examine at most this many reviews")
+    args = parser.parse_args(argv)
+
+    from database import SessionLocal
+
+    with SessionLocal() as db:
+        result = run(db, args.max_distance, args.min_confidence, args.apply, args.limit)
+    for p in result.assignments:
+        mark = "moved" if p.applied else ("ok" if p.confidence >= args.min_confidence else "low")
+        print(f"review {p.review_id} -> location {p.location_id} ({p.location_name}) "
+              f"{p.distance:.3f} mi, confidence {p.confidence:.2f} [{mark}]")
+    print(f"{result.examined} reviews with coordinates examined, {result.without_coordinates} without; "
+          f"{result.proposed} proposed, {result.applied} applied")
+
+
+if __name__ == "__main__":
+    main()
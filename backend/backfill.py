@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""Backfill wing_reviews columns from values embedded in the comment text.
+
+Rows are read in id order, BATCH_SIZE at a time (keyset, so memory stays flat
+however big the table is). Each batch's comments are parsed by the registered
+extractors, possibly in worker processes. The updates are written with one
+executemany per column in a short transaction that also refreshes the touched
+locations' location_stats rows, so the write lock is only held per batch. A
+checkpoint file records the last id done, so an interrupted run resumes where
+it stopped. Only NULL columns are filled, unless the extractor overwrites.
+
+Run from backend dir:
+   python3 backfill.py --list                      # registered extractors
+   python3 backfill.py heat created_at             # fill those columns
+   python3 backfill.py --all --dry-run             # show what would change, write nothing
+   python3 backfill.py --all --workers 4 --batch-size 5000
+   Or in Docker: docker compose exec backend python3 backfill.py --all
+
+New extractors: register(column, parse) where parse(comment) returns the value
+or None; key_value(key, convert) builds parse for the "key: value" lines the
+importer writes into comments.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Callable, NamedTuple, Optional
+
+from sqlalchemy import bindparam, or_, select, update
+from sqlalchemy.orm import Session
+
+import location_stats
+import models
+import review_attributes
+from database import engine
+
+BATCH_SIZE = int(os.environ.get("BACKFILL_BATCH_SIZE", "2000"))
+
+
+class Extractor(NamedTuple):
+    column: str
+    parse: Callable[[str], object]
+    overwrite: bool = False
+
+
+EXTRACTORS = {}
+
+
+def register(column: str, parse: Callable[[str], object], overwrite: bool = False) -> Extractor:
+    """Register parse(comment) -> value-or-None as the extractor for a wing_reviews column."""
+    extractor = EXTRACTORS[column] = Extractor(column, parse, overwrite)
+    return extractor
+
+
+def key_value(key: str, convert: Callable[[str], object] = str, aliases=()) -> Callable[[str], object]:
+    """parse() for a "key: value" comment line; empty, "None" or unconvertible values give None."""
+    keys = "|".join(re.escape(k) for k in (key, *aliases))
+    pattern = re.compile(rf"(?im)^\s*(?:{keys})\s*:[ \t]*(.*?)\s*$")
+
+    def parse(comment: Optional[str]):
+        if not comment:
+            return None
+        m = pattern.search(comment)
+        if not m or m.group(1) in ("", "None", "null"):
+            return None
+        try:
+            return convert(m.group(1))
+        except ValueError:
+            return None
+
+    return parse
+
+
+# --- built-in extractors --------------------------------------------------
+
+# Match "heat: 5" or "heat: 10" (case insensitive, optional spaces)
+HEAT_PATTERN = re.compile(r"(?i)heat\s*:\s*(\d+)")
+
+
+def parse_heat_from_comment(comment: Optional[str]) -> Optional[int]:
+    if not comment:
+        return None
+    m = HEAT_PATTERN.search(comment)
+    if not m:
+        return None
+    try:
+        return int(m.group(1))
+    except ValueError:
+        return None
+
+
+# Match "creator: 2024-01-15" or "created: 2024-01-15" or "creater: 2024-01-15" (case insensitive)
+# Optional time part: "creator: 2024-01-15 14:30" or "creator: 2024-01-15 14:30:00"
+CREATED_PATTERN = re.compile(
+    r"(?i)(?:creator|created|creater)\s*:\s*"
+    r"(\d{4}-\d{2}-\d{2})"
+    r"(?:\s+(\d{1,2}:\d{2}(?::\d{2})?))?"
+)
+
+
+def parse_date_from_comment(comment: Optional[str]) -> Optional[datetime]:
+    if not comment:
+        return None
+    m = CREATED_PATTERN.search(comment)
+    if not m:
+        return None
+    date_str = m.group(1)
+    time_str = m.group(2) if m.lastindex >= 2 else None
+    try:
+        if time_str:
+            # 14:30 or 14:30:00
+            if time_str.count(":") == 1:
+                time_str += ":00"
+            return datetime.strptime(f"{date_str} {time_str}", "%Y-%m-%d %H:%M:%S")
+        return datetime.strptime(date_str, "%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+register("heat", parse_heat_from_comment)
+register("created_at", parse_date_from_comment)
+for _name in review_attributes.ATTRIBUTES:
+    register(_name, key_value(_name, review_attributes.CONVERTERS[_name]))
+
+
+# --- engine ---------------------------------------------------------------
+
+def parse_batch(columns, rows):
+    """[(id, location_id, comment, *current values)] -> {column: [(id, value)]} for NULL (or overwritable) columns.
+
+    Module-level so worker processes can run it; they look extractors up by column name.
+    """
+    updates = {column: [] for column in columns}
+    for row in rows:
+        review_id, comment, current = row[0], row[2], row[3:]
+        for column, existing in zip(columns, current):
+            extractor = EXTRACTORS[column]
+            if existing is not None and not extractor.overwrite:
+                continue
+            value = extractor.parse(comment)
+            if value is not None and value != existing:
+                updates[column].append((review_id, value))
+    return updates
+
+
+def _read_batches(columns, after_id: int, batch_size: int):
+    """Yield id-ordered row batches after after_id; each read is its own short connection."""
+    table = models.WingReview.__table__
+    stmt = select(table.c.id, table.c.location_id, table.c.comment, *[table.c[c] for c in columns])
+    stmt = stmt.where(table.c.comment.is_not(None))
+    if not any(EXTRACTORS[c].overwrite for c in columns):
+        stmt = stmt.where(or_(*[table.c[c].is_(None) for c in columns]))
+    stmt = stmt.order_by(table.c.id).limit(batch_size)
+    while True:
+        with engine.connect() as conn:
+            rows = [tuple(row) for row in conn.execute(stmt.where(table.c.id > after_id))]
+        if not rows:
+            return
+        yield rows
+        after_id = rows[-1][0]
+
+
+def _write(updates, location_by_id) -> int:
+    """Apply one batch's updates and refresh the touched locations' stats, in one transaction."""
+    table = models.WingReview.__table__
+    written = 0
+    touched = set()
+    with Session(engine) as db, db.begin():
+        for column, pairs in updates.items():
+            if not pairs:
+                continue
+            stmt = update(table).where(table.c.id == bindparam("_id")).values({column: bindparam("_value")})
+            if not EXTRACTORS[column].overwrite:
+                # A concurrent write may have filled it since the batch was read
+                stmt = stmt.where(table.c[column].is_(None))
+            result = db.connection().execute(stmt, [{"_id": i, "_value": v} for i, v in pairs])
+            written += result.rowcount if result.rowcount >= 0 else len(pairs)
+            touched.update(location_by_id[i] for i, _ in pairs)
+        location_stats.refresh_locations(db, touched)
+    return written
+
+
+def _load_checkpoint(path: str, columns) -> dict:
+    if path and os.path.exists(path):
+        with open(path) as f:
+            state = json.load(f)
+        if state.get("columns") == list(columns):
+            return state
+        print(f"Ignoring checkpoint {path}: it is for {state.get('columns')}", file=sys.stderr)
+    return {"columns": list(columns), "last_id": 0, "updated": 0}
+
+
+def _save_checkpoint(path: str, state: dict) -> None:
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def run(columns, batch_size=BATCH_SIZE, workers=0, dry_run=False, checkpoint=None, restart=False, verbose=False) -> int:
+    """Backfill the given columns. Returns the number of column values written (or that would be)."""
+    unknown = [c for c in columns if c not in EXTRACTORS]
+    if unknown:
+        raise SystemExit(f"No extractor registered for: {', '.join(unknown)} (see --list)")
+    missing = [c for c in columns if c not in models.WingReview.__table__.c]
+    if missing:
+        raise SystemExit(f"wing_reviews has no column {', '.join(missing)}")
+
+    columns = list(columns)
+    if restart and checkpoint and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    state = _load_checkpoint(None if dry_run else checkpoint, columns)
+    if state["last_id"]:
+        print(f"Resuming after review id {state['last_id']} ({state['updated']} value(s) written so far)")
+
+    started = time.perf_counter()
+    seen = 0
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        batches = _read_batches(columns, state["last_id"], batch_size)
+        if pool is None:
+            parsed = ((rows, parse_batch(columns, rows)) for rows in batches)
+        else:
+            parsed = _parse_in_pool(pool, columns, batches, ahead=workers * 2)
+        for rows, updates in parsed:
+            seen += len(rows)
+            if dry_run:
+                written = sum(len(pairs) for pairs in updates.values())
+                if verbose:
+                    for column, pairs in updates.items():
+                        for review_id, value in pairs:
+                            print(f"  would set review id={review_id} {column}={value!r}")
+            else:
+                written = _write(updates, {row[0]: row[1] for row in rows})
+            state["last_id"] = rows[-1][0]
+            state["updated"] += written
+            if checkpoint and not dry_run:
+                _save_checkpoint(checkpoint, state)
+            print(f"  ... through review id {state['last_id']}: {seen} row(s) read, {state['updated']} value(s) "
+                  f"{'to write' if dry_run else 'written'}")
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    if checkpoint and not dry_run and os.path.exists(checkpoint):
+        os.remove(checkpoint)  # finished; the next run starts over
+    print(f"Done in {time.perf_counter() - started:.1f}s. {'Would write' if dry_run else 'Wrote'} "
+          f"{state['updated']} value(s) for {', '.join(columns)}.")
+    return state["updated"]
+
+
+def _parse_in_pool(pool, columns, batches, ahead: int):
+    """Parse batches in worker processes, keeping `ahead` in flight and yielding in id order."""
+    pending = []
+    for rows in batches:
+        pending.append((rows, pool.submit(parse_batch, columns, rows)))
+        if len(pending) >= ahead:
+            rows, future = pending.pop(0)
+            yield rows, future.result()
+    for rows, future in pending:
+        yield rows, future.result()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Backfill wing_reviews columns from comment text.")
+    parser.add_argument("columns", nargs="*", help="columns to fill (registered extractors)")
+    parser.add_argument("--all", action="store_true", help="every registered extractor")
+    parser.add_argument("--list", action="store_true", help="list registered extractors and exit")
+    parser.add_argument("--dry-run", action="store_true", help="parse and count, write nothing")
+    parser.add_argument("--verbose", action="store_true", help="with --dry-run, print each value")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--workers", type=int, default=0, help="parse in this many processes (for large tables)")
+    parser.add_argument("--checkpoint", help="checkpoint file (default: backfill-<columns>.checkpoint)")
+    parser.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for column, extractor in EXTRACTORS.items():
+            print(f"{column}{' (overwrites)' if extractor.overwrite else ''}")
+        return
+    columns = list(EXTRACTORS) if args.all else args.columns
+    if not columns:
+        parser.error("name the columns to backfill, or pass --all")
+    checkpoint = args.checkpoint or f"backfill-{'-'.join(columns)}.checkpoint"
+    run(columns, args.batch_size, args.workers, args.dry_run, checkpoint, args.restart, args.verbose)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,639 @@
+#!/usr/bin/env python3
+"""Latency benchmark for the read endpoints. Run from backend dir:
+   python3 benchmark.py                                   # 1k and 10k reviews, in-process + HTTP
+   python3 benchmark.py --sizes 1000,10000,100000,1000000 --concurrency 1,8 --out bench.json
+   python3 benchmark.py --compare bench-main.json --out bench.json   # print the change vs an earlier run
+   python3 benchmark.py --url http://localhost:8000       # against a running server (no dataset, no query counts)
+
+Each size gets a synthetic database (cached in --data-dir and reused while the
+seed matches) built with "alembic upgrade head" and filled with locations and
+reviews shaped like data_import/ratings_fixed.json: its venue names, coordinates,
+rating/heat distributions and comment format. Every size runs in its own
+process so DB_PATH can point at that size's database.
+
+The app is driven either in-process (straight ASGI calls, no network) or over
+HTTP (uvicorn on a local port, keep-alive clients in threads), with the given
+numbers of concurrent clients. Per endpoint the JSON output has p50/p95/p99,
+mean and max latency in ms, throughput and SQL statements per request.
+The response cache is disabled unless --cache is given.
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import random
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.parse import quote, urlsplit
+
+import review_attributes
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+SEED_FILE = os.path.join(BACKEND_DIR, "..", "data_import", "ratings_fixed.json")
+DEFAULT_DATA_DIR = os.path.join(tempfile.gettempdir(), "wings-benchmark")
+NAME_SUFFIXES = ("Wings", "Tavern", "Grill", "Pub", "Bar & Grill", "Kitchen", "Taproom", "Sports Bar", "Wing House")
+# Fraction of locations created as near-copies of an earlier one (what /locations/duplicates looks for).
+DUPLICATE_FRACTION = 0.02
+INSERT_BATCH = 10000
+
+
+# --- synthetic data -------------------------------------------------------
+
+def load_seed(path=SEED_FILE):
+    """The fields dicts of the Dart ratings export."""
+    with open(path) as f:
+        return [entry["fields"] for entry in json.load(f)]
+
+
+def _comment(fields, created):
+    # Same layout import_ratings.py sends: every field except name, address and rating
+    return "\n".join(
+        f"{k}: {created if k == 'created' else v}"
+        for k, v in fields.items()
+        if k not in ("venu_name", "address", "overall_rating")
+    )
+
+
+def generate(conn, reviews, seed, reviews_per_location=4, seed_file=SEED_FILE):
+    """Insert synthetic locations and reviews through a DB-API connection. Returns the location count."""
+    rng = random.Random(seed)
+    fields = load_seed(seed_file)
+    words = sorted({w for f in fields for w in re.findall(r"[A-Za-z']{3,}", f["venu_name"] or "")})
+    points = [(f["lat"], f["lon"]) for f in fields if f.get("lat") is not None and f.get("lon") is not None]
+    towns = [f["address"].split(",", 1)[-1].strip() for f in fields if f.get("address")]
+    ratings = [f["overall_rating"] for f in fields if f.get("overall_rating") is not None]
+    heats = [f.get("heat") if isinstance(f.get("heat"), int) else None for f in fields]
+
+    n_locations = max(1, reviews // reviews_per_location)
+    locations = []
+    for i in range(1, n_locations + 1):
+        if i > 10 and rng.random() < DUPLICATE_FRACTION:
+            _, name, address, lat, lon = locations[rng.randrange(len(locations))]
+            name = rng.choice((name.lower(), name.replace("'", ""), f"The {name}", name + "s"))
+            if lat is not None:
+                lat, lon = lat + rng.gauss(0, 0.0003), lon + rng.gauss(0, 0.0003)
+        else:
+            name = " ".join(rng.sample(words, rng.choice((1, 2)))) + " " + rng.choice(NAME_SUFFIXES)
+            address = f"{rng.randint(1, 9999)} {rng.choice(words)} St, {rng.choice(towns)}"
+            if rng.random() < 0.05:
+                lat = lon = None
+            else:
+                lat, lon = rng.choice(points)
+                lat, lon = lat + rng.gauss(0, 0.3), lon + rng.gauss(0, 0.3)
+        locations.append((i, name, address, lat, lon))
+
+    cursor = conn.cursor()
+    for start in range(0, len(locations), INSERT_BATCH):
+        cursor.executemany(
+            "INSERT INTO wing_locations (id, name, address, lat, lon) VALUES (?, ?, ?, ?, ?)",
+            locations[start:start + INSERT_BATCH],
+        )
+
+    columns = ("location_id", "rating", "comment", "heat", "created_at", "lat", "lon") + review_attributes.ATTRIBUTES
+    insert_review = f"INSERT INTO wing_reviews ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})"
+    first = datetime(2014, 1, 1)
+    span = int((datetime(2025, 6, 1) - first).total_seconds())
+    batch = []
+    for _ in range(reviews):
+        # Squared uniform: a few locations collect many reviews, most have a handful
+        location_id = locations[int(n_locations * rng.random() ** 2)][0]
+        _, _, _, lat, lon = locations[location_id - 1]
+        created = first + timedelta(seconds=rng.randrange(span))
+        source = rng.choice(fields)
+        attributes = review_attributes.parse_comment(_comment(source, ""))
+        batch.append((
+            location_id,
+            rng.choice(ratings),
+            _comment({k: v for k, v in source.items() if k not in attributes}, created.strftime("%Y-%m-%dT%H:%M:%SZ")),
+            rng.choice(heats),
+            created.strftime("%Y-%m-%d %H:%M:%S.%f"),
+            lat,
+            lon,
+            *[attributes.get(name) for name in review_attributes.ATTRIBUTES],
+        ))
+        if len(batch) >= INSERT_BATCH:
+            cursor.executemany(insert_review, batch)
+            batch = []
+    if batch:
+        cursor.executemany(insert_review, batch)
+    conn.commit()
+    return n_locations
+
+
+def prepare_database(db_path, reviews, seed):
+    """Create (or reuse) the benchmark database DB_PATH points at."""
+    from alembic import command
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    # Regenerate when the size, seed or schema changes
+    signature = f"{reviews}:{seed}:{ScriptDirectory.from_config(config).get_current_head()}"
+    marker = f"{db_path}.seed"
+    if os.path.exists(marker) and os.path.exists(db_path):
+        with open(marker) as f:
+            if f.read().strip() == signature:
+                return
+    for suffix in ("", "-wal", "-shm", ".seed"):
+        if os.path.exists(db_path + suffix):
+            os.remove(db_path + suffix)
+
+    import location_stats
+    from database import SessionLocal, engine
+
+    command.upgrade(config, "head")
+    started = time.perf_counter()
+    raw = engine.raw_connection()
+    try:
+        n_locations = generate(raw, reviews, seed)
+    finally:
+        raw.close()
+    db = SessionLocal()
+    try:
+        location_stats.rebuild(db)
+        db.commit()
+    finally:
+        db.close()
+    print(f"Generated {reviews} review(s) / {n_locations} location(s) in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    with open(marker, "w") as f:
+        f.write(signature)
+
+
+# --- query counting -------------------------------------------------------
+
+class QueryCounter:
+    """Counts SQL statements executed on the app's engines."""
+
+    def __init__(self):
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def _on_execute(self, *args):
+        with self._lock:
+            self.count += 1
+
+    def install(self):
+        from sqlalchemy import event
+
+        import database
+
+        engines = {database.engine, database.read_engine}
+        for async_engine in (database.async_engine, database.async_read_engine):
+            if async_engine is not None:
+                engines.add(async_engine.sync_engine)
+        for engine in engines:
+            event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def take(self):
+        with self._lock:
+            count, self.count = self.count, 0
+            return count
+
+
+# --- drivers --------------------------------------------------------------
+
+class ASGIClient:
+    """Calls the ASGI app directly on one event loop; concurrency is asyncio tasks."""
+
+    def __init__(self, app, on_close=None):
+        self.app = app
+        self.on_close = on_close
+        self.loop = asyncio.new_event_loop()
+
+    def _call(self, path):
+        path, _, query = path.partition("?")
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+            "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+            "query_string": query.encode(), "headers": [(b"host", b"benchmark")],
+            "client": ("127.0.0.1", 0), "server": ("benchmark", 80),
+        }
+        result = {"status": None, "headers": {}, "body": b""}
+        done = asyncio.Event()
+
+        async def receive():
+            if done.is_set() or result["status"] is not None:
+                await done.wait()
+                return {"type": "http.disconnect"}
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                result["status"] = message["status"]
+                result["headers"] = {k.decode().lower(): v.decode() for k, v in message.get("headers", [])}
+            elif message["type"] == "http.response.body":
+                result["body"] += message.get("body", b"")
+                if not message.get("more_body"):
+                    done.set()
+
+        async def run():
+            await self.app(scope, receive, send)
+            return result
+
+        return run()
+
+    async def _lifespan(self, phase):
+        """Send lifespan.startup / lifespan.shutdown, as a server would."""
+        if self._lifespan_task is None:
+            scope = {"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}
+            self._lifespan_task = asyncio.ensure_future(self.app(scope, self._lifespan_in.get, self._lifespan_out.put))
+        await self._lifespan_in.put({"type": f"lifespan.{phase}"})
+        message = await self._lifespan_out.get()
+        if message["type"].endswith("failed"):
+            raise RuntimeError(message.get("message") or f"lifespan {phase} failed")
+        if phase == "shutdown":
+            await self._lifespan_task
+
+    def __enter__(self):
+        asyncio.set_event_loop(self.loop)
+        self._lifespan_task = None
+        self._lifespan_in = asyncio.Queue()
+        self._lifespan_out = asyncio.Queue()
+        self.loop.run_until_complete(self._lifespan("startup"))
+        return self
+
+    def __exit__(self, *exc):
+        self.loop.run_until_complete(self._lifespan("shutdown"))
+        if self.on_close is not None:
+            self.loop.run_until_complete(self.on_close())
+        self.loop.close()
+
+    def get(self, path):
+        result = self.loop.run_until_complete(self._call(path))
+        return result["status"], result["headers"], result["body"]
+
+    def run(self, paths, concurrency):
+        """GET every path with `concurrency` tasks in flight. Returns [(seconds, status)], wall seconds."""
+        samples = []
+        pending = iter(paths)
+
+        async def worker():
+            for path in pending:
+                started = time.perf_counter()
+                result = await self._call(path)
+                samples.append((time.perf_counter() - started, result["status"]))
+
+        async def run_all():
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+        started = time.perf_counter()
+        self.loop.run_until_complete(run_all())
+        return samples, time.perf_counter() - started
+
+
+class HTTPClient:
+    """Keep-alive HTTP/1.1 clients, one connection per thread."""
+
+    def __init__(self, base_url):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.prefix = parts.path.rstrip("/")
+        self._local = threading.local()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def get(self, path):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = http.client.HTTPConnection(self.host, self.port, timeout=120)
+        try:
+            conn.request("GET", self.prefix + path)
+            resp = conn.getresponse()
+            body = resp.read()
+        except (http.client.HTTPException, OSError):
+            conn.close()
+            self._local.conn = None
+            raise
+        return resp.status, {k.lower(): v for k, v in resp.getheaders()}, body
+
+    def run(self, paths, concurrency):
+        samples = []
+        lock = threading.Lock()
+        pending = iter(paths)
+
+        def worker():
+            while True:
+                with lock:
+                    path = next(pending, None)
+                if path is None:
+                    return
+                started = time.perf_counter()
+                try:
+                    status = self.get(path)[0]
+                except (http.client.HTTPException, OSError):
+                    status = None
+                elapsed = time.perf_counter() - started
+                with lock:
+                    samples.append((elapsed, status))
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for future in [pool.submit(worker) for _ in range(concurrency)]:
+                future.result()
+        return samples, time.perf_counter() - started
+
+
+class LocalServer:
+    """uvicorn serving the app on a free local port, in a background thread."""
+
+    def __init__(self, app, on_close=None):
+        import uvicorn
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning"))
+        self.on_close = on_close
+        self.thread = threading.Thread(target=asyncio.run, args=(self._serve(),), daemon=True)
+
+    async def _serve(self):
+        await self.server.serve()
+        if self.on_close is not None:
+            await self.on_close()
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError("uvicorn failed to start")
+            time.sleep(0.01)
+        return f"http://127.0.0.1:{self.port}"
+
+    def __exit__(self, *exc):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+# --- scenarios ------------------------------------------------------------
+
+def scenarios(client):
+    """(name, path) pairs covering each read_locations branch, read_reviews and the duplicate groups.
+
+    Parameters (a centre point, a search word, a busy location) come from the data via the API,
+    so the same list works against a generated database or a running server.
+    """
+    status, _, body = client.get("/locations/?sort_by=reviews&limit=20")
+    if status != 200 or not json.loads(body):
+        raise RuntimeError(f"/locations/ returned {status}; is the database empty?")
+    top = json.loads(body)
+    busiest = top[0]
+    placed = next((loc for loc in top if loc.get("lat") is not None), busiest)
+    word = next((w for w in re.findall(r"[A-Za-z]{4,}", busiest["name"] or "")), "wing")
+    lat, lon = placed.get("lat") or 0, placed.get("lon") or 0
+    near = f"lat={lat}&lon={lon}&max_distance=25"
+
+    result = [("locations_default", "/locations/?limit=50")]
+    for sort_by in ("name", "rating", "heat", "reviews", "date_created", "recently_reviewed"):
+        result.append((f"locations_sort_{sort_by}", f"/locations/?limit=50&sort_by={sort_by}"))
+    _, headers, _ = client.get("/locations/?limit=50&sort_by=rating")
+    if headers.get("x-next-cursor"):
+        result.append(("locations_sort_rating_cursor", f"/locations/?limit=50&sort_by=rating&cursor={quote(headers['x-next-cursor'])}"))
+    result += [
+        ("locations_skip_1000", "/locations/?limit=50&skip=1000&sort_by=name"),
+        ("locations_min_rating", "/locations/?limit=50&min_rating=7"),
+        ("locations_min_rating_sort_rating", "/locations/?limit=50&min_rating=7&sort_by=rating"),
+        ("locations_min_sauce_max_cost", "/locations/?limit=50&min_sauce=1&max_cost=10&sort_by=sauce"),
+        ("locations_style", "/locations/?limit=50&style=buffalo"),
+        ("locations_search", f"/locations/?limit=50&search={quote(word)}"),
+        ("locations_distance", f"/locations/?limit=50&{near}&sort_by=distance"),
+        ("locations_distance_sort_rating", f"/locations/?limit=50&{near}&sort_by=rating"),
+        ("locations_distance_min_rating", f"/locations/?limit=50&{near}&min_rating=7&sort_by=distance"),
+        ("leaderboard_30d", "/locations/leaderboard?window=30d&as_of=2025-05-31"),
+        ("leaderboard_year", "/locations/leaderboard?window=year&as_of=2025-05-31"),
+        ("leaderboard_all_near", f"/locations/leaderboard?window=all&{near}"),
+        ("clusters_world", "/locations/clusters?bbox=-180,-90,180,90&zoom=3"),
+        ("clusters_city", f"/locations/clusters?bbox={lon - 0.5},{lat - 0.3},{lon + 0.5},{lat + 0.3}&zoom=11"),
+        ("location_by_id", f"/locations/by-id/{busiest['id']}"),
+        ("location_by_id_with_reviews", f"/locations/by-id/{busiest['id']}?include=reviews,stats"),
+        ("similar", f"/locations/by-id/{busiest['id']}/similar?k=10"),
+        ("similar_nearby", f"/locations/by-id/{busiest['id']}/similar?k=10&metric=euclidean&max_distance=25"),
+        ("reviews_default", "/reviews/?limit=50"),
+        ("reviews_skip_1000", "/reviews/?limit=50&skip=1000"),
+        ("reviews_by_location", f"/reviews/?limit=50&location_id={busiest['id']}"),
+        ("reviews_search", f"/reviews/search?q={quote(word)}&limit=50"),
+        ("duplicates", "/locations/duplicates?limit=50"),
+        ("duplicates_min_score_0_6", "/locations/duplicates?limit=50&min_score=0.6"),
+    ]
+    return result
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-pct * len(sorted_values) // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def measure(client, name, path, concurrency, requests, warmup, counter=None):
+    """Warm up, then time `requests` GETs of path. Returns one result dict."""
+    first = time.perf_counter()
+    client.get(path)
+    first_ms = (time.perf_counter() - first) * 1000
+    client.run([path] * warmup, concurrency)
+    if counter is not None:
+        counter.take()
+    samples, wall = client.run([path] * requests, concurrency)
+    queries = counter.take() if counter is not None else None
+    latencies = sorted(elapsed * 1000 for elapsed, _ in samples)
+    errors = sum(1 for _, status in samples if status != 200)
+    return {
+        "endpoint": name,
+        "path": path,
+        "concurrency": concurrency,
+        "requests": len(samples),
+        "errors": errors,
+        "first_ms": round(first_ms, 3),
+        "p50_ms": round(percentile(latencies, 50), 3),
+        "p95_ms": round(percentile(latencies, 95), 3),
+        "p99_ms": round(percentile(latencies, 99), 3),
+        "mean_ms": round(sum(latencies) / len(latencies), 3),
+        "max_ms": round(latencies[-1], 3),
+        "throughput_rps": round(len(samples) / wall, 1) if wall else None,
+        "queries_per_request": round(queries / len(samples), 2) if queries is not None else None,
+    }
+
+
+def run_suite(client, mode, args, counter=None, only=None):
+    results = []
+    for name, path in scenarios(client):
+        if only and not only.search(name):
+            continue
+        for concurrency in args.concurrency:
+            result = measure(client, name, path, concurrency, args.requests, args.warmup, counter)
+            result["mode"] = mode
+            results.append(result)
+            print(
+                f"  {mode:<9} c={concurrency:<3} {name:<34} p50 {result['p50_ms']:>9.2f}ms  "
+                f"p95 {result['p95_ms']:>9.2f}ms  p99 {result['p99_ms']:>9.2f}ms  "
+                f"{result['throughput_rps'] or 0:>8.1f} req/s  q/req {result['queries_per_request']}",
+                file=sys.stderr,
+            )
+    return results
+
+
+async def _dispose_async_engines():
+    """Close pooled async connections on the loop that opened them (aiosqlite threads block exit)."""
+    import database
+
+    for async_engine in (database.async_engine, database.async_read_engine):
+        if async_engine is not None:
+            await async_engine.dispose()
+
+
+def run_size(args):
+    """Worker process for one dataset size (DB_PATH is already set)."""
+    prepare_database(os.environ["DB_PATH"], args.worker_size, args.seed)
+    import main
+
+    counter = QueryCounter()
+    counter.install()
+    only = re.compile(args.only) if args.only else None
+    results = []
+    if "inprocess" in args.modes:
+        with ASGIClient(main.app, on_close=_dispose_async_engines) as client:
+            results += run_suite(client, "inprocess", args, counter, only)
+    if "http" in args.modes:
+        with LocalServer(main.app, on_close=_dispose_async_engines) as base_url, HTTPClient(base_url) as client:
+            results += run_suite(client, "http", args, counter, only)
+    for result in results:
+        result["size"] = args.worker_size
+    return results
+
+
+# --- reporting ------------------------------------------------------------
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(old, new):
+    """Print p50/p95 changes between two result files, matched on size/mode/concurrency/endpoint."""
+    def key(r):
+        return (r["size"], r["mode"], r["concurrency"], r["endpoint"])
+
+    before = {key(r): r for r in old["results"]}
+    print(f"{'size':>8} {'mode':<9} {'c':>3} {'endpoint':<34} {'p50 ms':>19} {'p95 ms':>19}")
+    for r in new["results"]:
+        b = before.get(key(r))
+        if b is None:
+            continue
+        cells = []
+        for field in ("p50_ms", "p95_ms"):
+            change = (r[field] - b[field]) / b[field] * 100 if b[field] else 0.0
+            cells.append(f"{b[field]:>7.2f}->{r[field]:>7.2f} {change:+4.0f}%")
+        print(f"{r['size']:>8} {r['mode']:<9} {r['concurrency']:>3} {r['endpoint']:<34} {cells[0]:>19} {cells[1]:>19}")
+
+
+def _int_list(value):
+    return [int(float(v)) for v in value.split(",") if v.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes", type=_int_list, default=[1000, 10000], help="review counts, e.g. 1000,10000,100000,1000000")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 8], help="concurrent clients, e.g. 1,8,32")
+    parser.add_argument("--requests", type=int, default=200, help="timed requests per endpoint and concurrency")
+    parser.add_argument("--warmup", type=int, default=10, help="untimed requests before each measurement")
+    parser.add_argument("--modes", default="inprocess,http", help="inprocess, http or both")
+    parser.add_argument("--only", help="regex selecting endpoint names, e.g. 'locations_(sort|distance)'")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--data-dir", default=DEFAULT_DATA_DIR, help="where generated databases are kept")
+    parser.add_argument("--cache", action="store_true", help="leave the response cache on")
+    parser.add_argument("--url", help="benchmark a running server instead of generated databases")
+    parser.add_argument("--out", help="write results as JSON")
+    parser.add_argument("--compare", help="earlier --out file to compare against")
+    parser.add_argument("--worker-size", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--result-file", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    args.modes = {m.strip() for m in args.modes.split(",")}
+
+    if args.worker_size is not None:
+        results = run_size(args)
+        with open(args.result_file, "w") as f:
+            json.dump(results, f)
+        return
+
+    meta = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "commit": _git_commit(),
+        "python": sys.version.split()[0],
+        "seed": args.seed,
+        "requests": args.requests,
+        "warmup": args.warmup,
+        "cache": args.cache,
+        "db_async": os.environ.get("DB_ASYNC", ""),
+    }
+    results = []
+    if args.url:
+        print(f"Benchmarking {args.url}", file=sys.stderr)
+        only = re.compile(args.only) if args.only else None
+        with HTTPClient(args.url) as client:
+            for result in run_suite(client, "http", args, only=only):
+                result["size"] = args.url
+                results.append(result)
+    else:
+        os.makedirs(args.data_dir, exist_ok=True)
+        for size in args.sizes:
+            print(f"Size {size}:", file=sys.stderr)
+            env = dict(os.environ, DB_PATH=os.path.abspath(os.path.join(args.data_dir, f"bench_{size}.db")))
+            if not args.cache:
+                env["RESPONSE_CACHE_SIZE"] = "0"
+            with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as tmp:
+                result_file = tmp.name
+            try:
+                subprocess.run(
+                    [sys.executable, os.path.abspath(__file__), *_without_reporting(sys.argv[1:]),
+                     "--worker-size", str(size), "--result-file", result_file],
+                    cwd=BACKEND_DIR, env=env, check=True,
+                )
+                with open(result_file) as f:
+                    results += json.load(f)
+            finally:
+                os.remove(result_file)
+
+    report = {"meta": meta, "results": results}
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {len(results)} result(s) to {args.out}", file=sys.stderr)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+def _without_reporting(argv):
+    """Command-line arguments minus --out/--compare (and their values), for the worker processes."""
+    kept, skip = [], False
+    for arg in argv:
+        if skip:
+            skip = False
+            continue
+        if arg in ("--out", "--compare"):
+            skip = True
+            continue
+        if arg.startswith(("--out=", "--compare=")):
+            continue
+        kept.append(arg)
+    return kept
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,221 @@
+"""Bulk import for POST /reviews/bulk and POST /locations/bulk.
+
+Bodies are NDJSON (one JSON object per line, streamed as it arrives) or a
+single JSON array. Rows are validated one by one and inserted in batches of
+BULK_BATCH_SIZE, one transaction per batch; bad rows are reported by index
+instead of failing the whole request. Locations are matched by normalized
+name against a map loaded once per request, and created when missing.
+"""
+import json
+import os
+from datetime import timezone
+
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+import location_stats
+import models, schemas
+import names
+import review_attributes
+from database import run_db
+
+BATCH_SIZE = int(os.environ.get("BULK_BATCH_SIZE", "500"))
+
+UNASSIGNED_NAME = "Unassigned"
+UNASSIGNED_ADDRESS = "To be placed by curator"
+
+
+class _RowError(str):
+    """A row that could not even be parsed; the string is the message."""
+
+
+def _parse_line(line: bytes):
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return _RowError(f"Invalid JSON: {e}")
+
+
+async def iter_rows(request: Request):
+    """Yield (index, object) for each submitted row; unparseable rows yield a _RowError."""
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        index = 0
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield index, _parse_line(line)
+                    index += 1
+        if buffer.strip():
+            yield index, _parse_line(buffer)
+        return
+    body = await request.body()
+    if body.lstrip().startswith(b"["):
+        try:
+            rows = json.loads(body)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON array: {e}")
+        for index, row in enumerate(rows):
+            yield index, row
+        return
+    index = 0
+    for line in body.splitlines():
+        if line.strip():
+            yield index, _parse_line(line)
+            index += 1
+
+
+async def _batches(rows):
+    batch = []
+    async for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+class LocationResolver:
+    """Normalized name -> location id, loaded once; new names stay pending until their batch commits."""
+
+    def __init__(self, db: Session):
+        self._ids = {}
+        for loc_id, name in db.query(models.WingLocation.id, models.WingLocation.name).order_by(models.WingLocation.id):
+            self._ids.setdefault(names.normalize_name(name), loc_id)
+        self._pending = {}
+
+    def resolve(self, db: Session, name: str, address=None, lat=None, lon=None):
+        """Return (location_id, created) for a name, creating the location if unknown (flush, no commit)."""
+        key = names.normalize_name(name)
+        loc_id = self._ids.get(key) or self._pending.get(key)
+        if loc_id is not None:
+            return loc_id, False
+        location = models.WingLocation(name=name.strip(), address=address, lat=lat, lon=lon)
+        db.add(location)
+        db.flush()
+        self._pending[key] = location.id
+        return location.id, True
+
+    def commit(self):
+        self._ids.update(self._pending)
+        self._pending = {}
+
+    def rollback(self):
+        self._pending = {}
+
+
+def _validate(batch, model):
+    """Map row index -> validated item, or -> error message for rows that fail validation."""
+    slots = {}
+    for index, raw in batch:
+        if isinstance(raw, _RowError):
+            slots[index] = str(raw)
+            continue
+        try:
+            slots[index] = model.model_validate(raw)
+        except ValidationError as e:
+            slots[index] = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+    return slots
+
+
+def _record(result: schemas.BulkImportResponse, slots, outcome):
+    """Append per-row ids/errors in submission order; outcome maps index -> new id or error message."""
+    for index, slot in slots.items():
+        value = slot if isinstance(slot, str) else outcome.get(index, "Not inserted")
+        if isinstance(value, str):
+            result.ids.append(None)
+            result.errors.append(schemas.BulkRowError(index=index, error=value))
+        else:
+            result.ids.append(value)
+
+
+def insert_review_batch(db: Session, batch, resolver: LocationResolver, result: schemas.BulkImportResponse):
+    """Insert one batch of review rows in a single transaction."""
+    slots = _validate(batch, schemas.WingReviewBulkItem)
+    items = {i: item for i, item in slots.items() if not isinstance(item, str)}
+    explicit = {item.location_id for item in items.values() if item.location_id is not None}
+    known = {
+        loc_id for (loc_id,) in db.query(models.WingLocation.id).filter(models.WingLocation.id.in_(explicit))
+    } if explicit else set()
+    outcome = {}
+    reviews = {}
+    created = 0
+    try:
+        for index, item in items.items():
+            if item.location_id is not None:
+                if item.location_id not in known:
+                    slots[index] = "Location not found"
+                    continue
+                loc_id = item.location_id
+            elif item.location_name and names.normalize_name(item.location_name):
+                loc_id, new = resolver.resolve(
+                    db, item.location_name, item.location_address, item.location_lat, item.location_lon
+                )
+                created += new
+            else:
+                loc_id, new = resolver.resolve(db, UNASSIGNED_NAME, UNASSIGNED_ADDRESS)
+                created += new
+            data = item.model_dump(include={"rating", "comment", "heat", "lat", "lon", *review_attributes.ATTRIBUTES})
+            if item.created_at is not None:
+                created_at = item.created_at
+                if created_at.tzinfo is not None:
+                    created_at = created_at.astimezone(timezone.utc).replace(tzinfo=None)
+                data["created_at"] = created_at
+            reviews[index] = models.WingReview(location_id=loc_id, **data)
+            review_attributes.complete(reviews[index], item.model_fields_set)
+        db.add_all(reviews.values())
+        db.flush()
+        outcome = {index: review.id for index, review in reviews.items()}  # read before commit expires them
+        location_stats.refresh_locations(db, {review.location_id for review in reviews.values()})
+        db.commit()
+    except Exception as e:  # one bad batch shouldn't abort the rest of the import
+        db.rollback()
+        resolver.rollback()
+        outcome = {index: f"Batch failed: {e.__class__.__name__}" for index in items}
+        created = 0
+    else:
+        resolver.commit()
+        result.inserted += len(outcome)
+    _record(result, slots, outcome)
+    result.locations_created += created
+
+
+def insert_location_batch(db: Session, batch, resolver: LocationResolver, result: schemas.BulkImportResponse):
+    """Match or create one batch of location rows in a single transaction."""
+    slots = _validate(batch, schemas.WingLocationCreate)
+    outcome = {}
+    created = 0
+    try:
+        for index, item in slots.items():
+            if isinstance(item, str):
+                continue
+            if not names.normalize_name(item.name):
+                slots[index] = "name: must not be blank"
+                continue
+            outcome[index], new = resolver.resolve(db, item.name, item.address, item.lat, item.lon)
+            created += new
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        resolver.rollback()
+        outcome = {index: f"Batch failed: {e.__class__.__name__}" for index in slots}
+        created = 0
+    else:
+        resolver.commit()
+    _record(result, slots, outcome)
+    result.inserted += created
+    result.locations_created += created
+
+
+async def import_rows(request: Request, db, insert_batch) -> schemas.BulkImportResponse:
+    """Stream the request body through insert_batch, one transaction per batch."""
+    result = schemas.BulkImportResponse(inserted=0, locations_created=0, ids=[], errors=[])
+    resolver = await run_db(db, LocationResolver)
+    async for batch in _batches(iter_rows(request)):
+        await run_db(db, insert_batch, batch, resolver, result)
+    return result
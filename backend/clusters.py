@@ -0,0 +1,233 @@
+"""Map clusters for /locations/clusters.
+
+Locations with coordinates are bucketed into a lat/lon grid whose cells halve
+with each zoom level (CELLS_PER_TILE cells across a map tile's width). The
+finest level, MAX_CLUSTER_ZOOM, is built from the rows; each coarser level
+merges 2x2 cells of the one below, so every zoom's clusters (count, centroid,
+average rating) are precomputed. A request sums nothing: it looks up the
+cells overlapping its bbox. Above MAX_CLUSTER_ZOOM the individual locations
+are returned instead.
+
+The index lives in the worker's memory and is built on first use. After
+that, location_stats reports on commit which locations a write touched (new
+reviews, edits, moves, merges, created locations); the next request re-reads
+just those locations and recomputes the cells they left or joined, and their
+parents up the pyramid. Writes that touch no location, and writes handled by
+other workers, show up after a full rebuild every CLUSTER_INDEX_TTL seconds.
+"""
+import math
+import os
+import threading
+import time
+
+from sqlalchemy.orm import Session
+
+import location_stats
+import models
+
+MAX_CLUSTER_ZOOM = int(os.environ.get("MAX_CLUSTER_ZOOM", "14"))
+CELLS_PER_TILE = 4  # ~64px cells on a 256px tile
+INDEX_TTL = float(os.environ.get("CLUSTER_INDEX_TTL", "60"))
+
+
+def cell_degrees(zoom: int) -> float:
+    return 360.0 / (2 ** zoom * CELLS_PER_TILE)
+
+
+def _cell(lat: float, lon: float, size: float):
+    return math.floor((lat + 90.0) / size), math.floor((lon + 180.0) / size)
+
+
+class _Cell:
+    __slots__ = ("count", "lat_sum", "lon_sum", "rating_sum", "rating_count", "review_count", "location")
+
+    def __init__(self):
+        self.count = 0
+        self.lat_sum = 0.0
+        self.lon_sum = 0.0
+        self.rating_sum = 0.0
+        self.rating_count = 0
+        self.review_count = 0
+        self.location = None  # (id, name) while the cell holds a single location
+
+    def merge(self, other: "_Cell") -> None:
+        self.location = other.location if self.count == 0 else None
+        self.count += other.count
+        self.lat_sum += other.lat_sum
+        self.lon_sum += other.lon_sum
+        self.rating_sum += other.rating_sum
+        self.rating_count += other.rating_count
+        self.review_count += other.review_count
+
+    def as_dict(self) -> dict:
+        loc_id, name = self.location or (None, None)
+        return {
+            "lat": self.lat_sum / self.count,
+            "lon": self.lon_sum / self.count,
+            "count": self.count,
+            "average_rating": self.rating_sum / self.rating_count if self.rating_count else None,
+            "review_count": self.review_count,
+            "id": loc_id,
+            "name": name,
+        }
+
+
+def _ranges(lo: float, hi: float, size: float, offset: float):
+    return math.floor((lo + offset) / size), math.floor((hi + offset) / size)
+
+
+def _lon_spans(min_lon: float, max_lon: float):
+    """A bbox crossing the antimeridian (min_lon > max_lon) is two longitude spans."""
+    if min_lon <= max_lon:
+        return [(min_lon, max_lon)]
+    return [(min_lon, 180.0), (-180.0, max_lon)]
+
+
+def _point(loc_id, name, lat, lon, rating_sum, rating_count, review_count) -> _Cell:
+    point = _Cell()
+    point.count = 1
+    point.lat_sum, point.lon_sum = lat, lon
+    point.rating_sum, point.rating_count = rating_sum or 0.0, rating_count or 0
+    point.review_count = review_count or 0
+    point.location = (loc_id, name)
+    return point
+
+
+def _rows(db: Session, location_ids=None):
+    loc = models.WingLocation
+    stats = models.LocationStats
+    query = (
+        db.query(loc.id, loc.name, loc.lat, loc.lon, stats.rating_sum, stats.rating_count, stats.review_count)
+        .outerjoin(stats, stats.location_id == loc.id)
+        .filter(loc.lat.is_not(None), loc.lon.is_not(None))
+    )
+    if location_ids is not None:
+        query = query.filter(loc.id.in_(location_ids))
+    return query.all()
+
+
+class ClusterIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dirty = set()
+        self._levels = []  # zoom -> {(row, col): _Cell}
+        self._points = {}  # finest (row, col) -> [single-location _Cell]
+        self._cell_of = {}  # location_id -> finest (row, col)
+        self._built_at = None
+
+    def mark_dirty(self, location_ids) -> None:
+        with self._lock:
+            self._dirty.update(location_ids)
+
+    def _build(self, db: Session) -> None:
+        size = cell_degrees(MAX_CLUSTER_ZOOM)
+        finest, points, cell_of = {}, {}, {}
+        for row in _rows(db):
+            point = _point(*row)
+            key = _cell(point.lat_sum, point.lon_sum, size)
+            cell = finest.get(key)
+            if cell is None:
+                cell = finest[key] = _Cell()
+            cell.merge(point)
+            points.setdefault(key, []).append(point)
+            cell_of[point.location[0]] = key
+        levels = [finest]
+        for _ in range(MAX_CLUSTER_ZOOM):
+            coarser = {}
+            for (row, col), cell in levels[-1].items():
+                parent = coarser.get((row // 2, col // 2))
+                if parent is None:
+                    parent = coarser[(row // 2, col // 2)] = _Cell()
+                parent.merge(cell)
+            levels.append(coarser)
+        self._levels = levels[::-1]
+        self._points = points
+        self._cell_of = cell_of
+        self._built_at = time.monotonic()
+
+    def _refresh(self, db: Session, location_ids) -> None:
+        """Re-read the given locations and recompute only the cells they left or joined."""
+        size = cell_degrees(MAX_CLUSTER_ZOOM)
+        changed = set()
+        for loc_id in location_ids:
+            key = self._cell_of.pop(loc_id, None)
+            if key is not None:
+                self._points[key] = [p for p in self._points[key] if p.location[0] != loc_id]
+                changed.add(key)
+        for row in _rows(db, location_ids):
+            point = _point(*row)
+            key = _cell(point.lat_sum, point.lon_sum, size)
+            self._points.setdefault(key, []).append(point)
+            self._cell_of[point.location[0]] = key
+            changed.add(key)
+        for zoom in range(MAX_CLUSTER_ZOOM, -1, -1):
+            level = self._levels[zoom]
+            for key in changed:
+                if zoom == MAX_CLUSTER_ZOOM:
+                    parts = self._points.get(key) or []
+                    if not parts:
+                        self._points.pop(key, None)
+                else:
+                    finer = self._levels[zoom + 1]
+                    row, col = key
+                    children = [(2 * row + dr, 2 * col + dc) for dr in (0, 1) for dc in (0, 1)]
+                    parts = [finer[child] for child in children if child in finer]
+                if parts:
+                    cell = level[key] = _Cell()
+                    for part in parts:
+                        cell.merge(part)
+                else:
+                    level.pop(key, None)
+            changed = {(row // 2, col // 2) for row, col in changed}
+
+    def _sync(self, db: Session) -> None:
+        if self._built_at is None or time.monotonic() - self._built_at > INDEX_TTL:
+            self._dirty.clear()
+            self._build(db)
+        elif self._dirty:
+            dirty, self._dirty = self._dirty, set()
+            self._refresh(db, dirty)
+
+    def query(self, db: Session, min_lon: float, min_lat: float, max_lon: float, max_lat: float, zoom: int):
+        """Clusters (or, above MAX_CLUSTER_ZOOM, single locations) overlapping the bbox, biggest first."""
+        with self._lock:
+            self._sync(db)
+            if zoom > MAX_CLUSTER_ZOOM:
+                cells = self._cells_in(self._points, min_lon, min_lat, max_lon, max_lat, cell_degrees(MAX_CLUSTER_ZOOM))
+                found = [
+                    point
+                    for cell_points in cells
+                    for point in cell_points
+                    if min_lat <= point.lat_sum <= max_lat
+                    and any(lo <= point.lon_sum <= hi for lo, hi in _lon_spans(min_lon, max_lon))
+                ]
+            else:
+                level = self._levels[max(zoom, 0)]
+                found = self._cells_in(level, min_lon, min_lat, max_lon, max_lat, cell_degrees(max(zoom, 0)))
+            result = [cell.as_dict() for cell in found]
+        result.sort(key=lambda c: (-c["count"], c["lat"], c["lon"]))
+        return result
+
+    @staticmethod
+    def _cells_in(grid: dict, min_lon, min_lat, max_lon, max_lat, size: float):
+        row_lo, row_hi = _ranges(min_lat, max_lat, size, 90.0)
+        spans = [_ranges(lo, hi, size, 180.0) for lo, hi in _lon_spans(min_lon, max_lon)]
+        wanted = (row_hi - row_lo + 1) * sum(hi - lo + 1 for lo, hi in spans)
+        if wanted > len(grid):
+            # Big bbox: walking the occupied cells is cheaper than probing every key in range
+            return [
+                cell
+                for (row, col), cell in grid.items()
+                if row_lo <= row <= row_hi and any(lo <= col <= hi for lo, hi in spans)
+            ]
+        return [
+            grid[(row, col)]
+            for row in range(row_lo, row_hi + 1)
+            for lo, hi in spans
+            for col in range(lo, hi + 1)
+            if (row, col) in grid
+        ]
+
+
+index = ClusterIndex()
+location_stats.on_commit(index.mark_dirty)
@@ -0,0 +1,133 @@
+"""Single-flight coalescing of identical concurrent reads, and admission control for heavy queries.
+
+SingleFlight: while a computation for a key is in flight, further callers
+with the same key await that one instead of starting their own. The
+computation runs as its own task, so a caller that goes away does not
+cancel it for the others. response_cache.cached coalesces every cache miss
+on (endpoint, normalized parameters, data version). A thundering herd on a
+shared link therefore costs one query and one serialization; the rest of
+the herd reuses the same body and ETag.
+
+Admission: caps how many heavy queries (distance searches, min_rating
+filters, duplicate grouping) run at once. Excess requests wait for a slot,
+but only HEAVY_QUERY_QUEUE of them and only for HEAVY_QUERY_WAIT seconds;
+past that they get 503 with Retry-After instead of piling up in the
+threadpool. Coalesced followers never take a slot, because only the
+leader's endpoint body runs.
+
+Settings (env): HEAVY_QUERY_CONCURRENCY (default 4; 0 = no limit),
+HEAVY_QUERY_QUEUE (64), HEAVY_QUERY_WAIT (seconds, 5).
+"""
+import asyncio
+import contextlib
+import math
+import os
+
+from fastapi import HTTPException
+
+HEAVY_CONCURRENCY = int(os.environ.get("HEAVY_QUERY_CONCURRENCY", "4"))
+HEAVY_QUEUE = int(os.environ.get("HEAVY_QUERY_QUEUE", "64"))
+HEAVY_WAIT = float(os.environ.get("HEAVY_QUERY_WAIT", "5"))
+
+
+class SingleFlight:
+    def __init__(self):
+        self.leaders = 0
+        self.followers = 0
+        self._flights = {}  # key -> asyncio.Task
+
+    async def do(self, key, fn):
+        """Result of fn() (a coroutine function), shared with concurrent callers of the same key."""
+        task = self._flights.get(key)
+        if task is None:
+            self.leaders += 1
+            task = asyncio.ensure_future(fn())
+            self._flights[key] = task
+            task.add_done_callback(lambda done: self._landed(key, done))
+        else:
+            self.followers += 1
+        return await asyncio.shield(task)
+
+    def _landed(self, key, task) -> None:
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        if not task.cancelled():
+            task.exception()  # retrieved even when every caller went away
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._flights), "leaders": self.leaders, "coalesced": self.followers}
+
+
+class Admission:
+    """Concurrency cap with a bounded, time-limited wait; raises 503 when over it."""
+
+    def __init__(self, limit: int = HEAVY_CONCURRENCY, max_waiting: int = HEAVY_QUEUE, wait: float = HEAVY_WAIT):
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.wait = wait
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+        self._semaphore = None
+        self._loop = None
+
+    def _reject(self):
+        self.rejected += 1
+        raise HTTPException(
+            status_code=503,
+            detail="Too many heavy queries in progress; retry shortly",
+            headers={"Retry-After": str(max(1, math.ceil(self.wait)))},
+        )
+
+    @contextlib.asynccontextmanager
+    async def slot(self, needed: bool = True):
+        """Hold a slot for the block (a no-op when not needed or unlimited)."""
+        if not needed or self.limit <= 0:
+            yield
+            return
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:  # asyncio primitives belong to one event loop
+            self._semaphore, self._loop = asyncio.Semaphore(self.limit), loop
+        if self._semaphore.locked() and self.waiting >= self.max_waiting:
+            self._reject()
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), self.wait)
+        except asyncio.TimeoutError:
+            self._reject()
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        self.admitted += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "waiting": self.waiting,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
+flights = SingleFlight()
+heavy = Admission()
+
+
+def render_metrics() -> str:
+    """Prometheus lines for the coalescing and admission counters (appended to /metrics)."""
+    lines = []
+    for name, kind, help_text, value in (
+        ("wings_coalesced_requests_total", "counter", "Requests served by joining an identical in-flight computation.", flights.followers),
+        ("wings_heavy_queries_active", "gauge", "Heavy queries running now.", heavy.active),
+        ("wings_heavy_queries_waiting", "gauge", "Heavy queries waiting for a slot.", heavy.waiting),
+        ("wings_heavy_queries_rejected_total", "counter", "Heavy queries shed with 503.", heavy.rejected),
+    ):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}", f"{name} {value}"]
+    return "\n".join(lines) + "\n"
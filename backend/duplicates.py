@@ -0,0 +1,220 @@
+"""Fuzzy duplicate-location candidates for /locations/duplicates.
+
+Locations are blocked by cheap keys -- name tokens, a squashed-name prefix
+and a geo grid cell -- so each one is only compared with the few locations
+sharing a key. Candidate pairs are scored by name similarity (plus a bonus
+when both have coordinates within DUPLICATE_RADIUS_METERS) and kept in an
+in-process index. Locations this worker creates, merges away or otherwise
+touches are re-read on the next request (location_stats reports them on
+commit). Other workers' writes are picked up as follows:
+- new locations: anything with an id above the last one seen;
+- deletions: a change in the location count or max(id) triggers a full
+  rebuild;
+- the rest, e.g. a deleted id that SQLite reused for a new location: a full
+  rebuild every DUPLICATE_INDEX_TTL seconds (default 600).
+"""
+import math
+import os
+import re
+import threading
+import time
+from difflib import SequenceMatcher
+
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+import geo
+import location_stats
+import models
+import names
+
+RADIUS_METERS = float(os.environ.get("DUPLICATE_RADIUS_METERS", "150"))
+INDEX_TTL = float(os.environ.get("DUPLICATE_INDEX_TTL", "600"))
+# Pairs scoring below this are not kept, so min_score below it finds nothing extra.
+PAIR_FLOOR = 0.5
+PROXIMITY_BONUS = 0.15
+# Keys shared by more locations than this (e.g. "buffalo") are too common to block on.
+MAX_BLOCK_SIZE = 200
+STOP_TOKENS = {"the", "and", "of", "at", "bar", "grill", "pub", "restaurant", "cafe", "wings", "wing", "pizza", "co", "inc"}
+
+_NON_ALNUM = re.compile(r"[^0-9a-z ]+")
+_CELL_DEGREES = RADIUS_METERS / 111_320.0
+
+
+def squash(name: str) -> str:
+    """Normalized name with punctuation and spaces removed: "Tandy's Top Shelf" -> "tandystopshelf"."""
+    return _NON_ALNUM.sub("", names.normalize_name(name)).replace(" ", "")
+
+
+def tokens(name: str) -> set:
+    return {t for t in _NON_ALNUM.sub("", names.normalize_name(name)).split() if len(t) > 2 and t not in STOP_TOKENS}
+
+
+def _cell(lat, lon):
+    return math.floor(lat / _CELL_DEGREES), math.floor(lon / _CELL_DEGREES)
+
+
+def _name_score(a: str, b: str, tokens_a: set, tokens_b: set) -> float:
+    if a == b:
+        return 1.0
+    ratio = SequenceMatcher(None, a, b).ratio()
+    union = tokens_a | tokens_b
+    jaccard = len(tokens_a & tokens_b) / len(union) if union else 0.0
+    # Same significant words ("The Farm" / "farm") is strong but not identical evidence
+    return max(ratio, 0.9 * jaccard)
+
+
+class _Entry:
+    __slots__ = ("id", "name", "squashed", "tokens", "lat", "lon", "keys")
+
+    def __init__(self, loc_id, name, lat, lon):
+        self.id = loc_id
+        self.name = name
+        self.squashed = squash(name)
+        self.tokens = tokens(name)
+        self.lat = lat
+        self.lon = lon
+        self.keys = {f"t:{t}" for t in self.tokens}
+        if len(self.squashed) >= 4:
+            self.keys.add(f"s:{self.squashed[:4]}")
+        if lat is not None and lon is not None:
+            self.keys.add(("g",) + _cell(lat, lon))
+
+
+class DuplicateIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._blocks = {}
+        self._pairs = {}  # (low_id, high_id) -> score
+        self._max_id = 0
+        self._dirty = set()
+        self._built_at = None
+
+    def mark_dirty(self, location_ids) -> None:
+        with self._lock:
+            self._dirty.update(location_ids)
+
+    def _geo_neighbours(self, entry: _Entry):
+        if entry.lat is None or entry.lon is None:
+            return []
+        row, col = _cell(entry.lat, entry.lon)
+        # Cells are square in degrees, so a radius spans more longitude cells away from the equator.
+        span = math.ceil(1 / max(math.cos(math.radians(entry.lat)), 0.05))
+        return [("g", row + dr, col + dc) for dr in (-1, 0, 1) for dc in range(-span, span + 1)]
+
+    def _score(self, a: _Entry, b: _Entry) -> float:
+        score = _name_score(a.squashed, b.squashed, a.tokens, b.tokens)
+        if None not in (a.lat, a.lon, b.lat, b.lon):
+            if geo.haversine_miles(a.lat, a.lon, b.lat, b.lon) * 1609.344 <= RADIUS_METERS:
+                score = min(1.0, score + PROXIMITY_BONUS)
+        return score
+
+    def _add(self, entry: _Entry) -> None:
+        candidates = set()
+        for key in entry.keys | set(self._geo_neighbours(entry)):
+            block = self._blocks.get(key)
+            if block and len(block) <= MAX_BLOCK_SIZE:
+                candidates |= block
+        for other_id in candidates:
+            score = self._score(entry, self._entries[other_id])
+            if score >= PAIR_FLOOR:
+                self._pairs[(min(entry.id, other_id), max(entry.id, other_id))] = score
+        for key in entry.keys:
+            self._blocks.setdefault(key, set()).add(entry.id)
+        self._entries[entry.id] = entry
+        self._max_id = max(self._max_id, entry.id)
+
+    def _remove(self, location_ids) -> None:
+        removed = set()
+        for location_id in location_ids:
+            entry = self._entries.pop(location_id, None)
+            if entry is None:
+                continue
+            removed.add(location_id)
+            for key in entry.keys:
+                self._blocks.get(key, set()).discard(location_id)
+        if removed:
+            self._pairs = {pair: s for pair, s in self._pairs.items() if not removed.intersection(pair)}
+
+    def discard(self, location_id: int) -> None:
+        """Forget a deleted location (e.g. the source of a merge)."""
+        with self._lock:
+            self._remove([location_id])
+
+    def _build(self, db: Session) -> None:
+        loc = models.WingLocation
+        self._entries, self._blocks, self._pairs, self._max_id = {}, {}, {}, 0
+        for row in db.query(loc.id, loc.name, loc.lat, loc.lon).order_by(loc.id):
+            self._add(_Entry(*row))
+        self._built_at = time.monotonic()
+
+    def _refresh(self, db: Session, location_ids) -> None:
+        """Re-read the given locations: changed ones are re-scored, vanished ones dropped."""
+        loc = models.WingLocation
+        rows = {row.id: row for row in db.query(loc.id, loc.name, loc.lat, loc.lon).filter(loc.id.in_(location_ids))}
+        stale = []
+        for location_id in location_ids:
+            entry, row = self._entries.get(location_id), rows.get(location_id)
+            if entry is not None and row is not None and (entry.name, entry.lat, entry.lon) == tuple(row[1:]):
+                del rows[location_id]  # a review write: nothing the index scores changed
+            elif entry is not None:
+                stale.append(location_id)
+        self._remove(stale)
+        for location_id in sorted(rows):
+            self._add(_Entry(*rows[location_id]))
+
+    def _sync(self, db: Session) -> None:
+        if self._built_at is None or time.monotonic() - self._built_at > INDEX_TTL:
+            self._dirty.clear()
+            self._build(db)
+            return
+        if self._dirty:
+            dirty, self._dirty = self._dirty, set()
+            self._refresh(db, dirty)
+        loc = models.WingLocation
+        new_rows = db.query(loc.id, loc.name, loc.lat, loc.lon).filter(loc.id > self._max_id).order_by(loc.id).all()
+        for row in new_rows:
+            self._add(_Entry(*row))
+        count, max_id = db.query(func.count(loc.id), func.max(loc.id)).one()
+        if count != len(self._entries) or (max_id or 0) != max(self._entries, default=0):
+            self._build(db)
+
+    def groups(self, db: Session, min_score: float):
+        """Connected groups of locations whose pairwise scores reach min_score, best first.
+
+        Returns a list of (score, [location ids]) where score is the group's best pair.
+        """
+        with self._lock:
+            self._sync(db)
+            parent = {}
+
+            def find(x):
+                while parent.get(x, x) != x:
+                    parent[x] = parent.get(parent[x], parent[x])
+                    x = parent[x]
+                return x
+
+            best = {}
+            for (a, b), score in self._pairs.items():
+                if score >= min_score:
+                    ra, rb = find(a), find(b)
+                    if ra != rb:
+                        parent[max(ra, rb)] = min(ra, rb)
+                    best[(a, b)] = score
+            members = {}
+            for a, b in best:
+                for x in (a, b):
+                    members.setdefault(find(x), set()).add(x)
+            top = {}
+            for (a, b), score in best.items():
+                root = find(a)
+                top[root] = max(top.get(root, 0.0), score)
+            names_by_id = {i: self._entries[i].name for ids in members.values() for i in ids}
+        groups = [(top[root], sorted(ids)) for root, ids in members.items()]
+        groups.sort(key=lambda g: (-g[0], names.normalize_name(names_by_id[g[1][0]])))
+        return groups
+
+
+index = DuplicateIndex()
+location_stats.on_commit(index.mark_dirty)
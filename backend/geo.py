@@ -0,0 +1,74 @@
+"""Great-circle helpers for the lat/lon radius searches."""
+import math
+
+import numpy as np
+
+EARTH_RADIUS_MILES = 3958.8
+MILES_PER_DEGREE_LAT = math.pi * EARTH_RADIUS_MILES / 180.0
+
+
+def haversine_miles(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance in miles between two points."""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * math.asin(min(1.0, math.sqrt(a)))
+
+
+def haversine_miles_array(lat: float, lon: float, lats, lons):
+    """haversine_miles from one point to arrays of points (NaN where coordinates are missing)."""
+    phi1, phi2 = np.radians(lat), np.radians(lats)
+    dphi = phi2 - phi1
+    dlmb = np.radians(lons - lon)
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_MILES * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+
+def bounding_box(lat: float, lon: float, radius_miles: float):
+    """Lat/lon box containing every point within radius_miles of (lat, lon).
+
+    Returns (min_lat, max_lat, lon_ranges) where lon_ranges is a list of
+    (min_lon, max_lon) pairs: two when the box crosses the antimeridian, and
+    [(-180, 180)] when it reaches a pole.
+    """
+    dlat = radius_miles / MILES_PER_DEGREE_LAT
+    min_lat, max_lat = lat - dlat, lat + dlat
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), [(-180.0, 180.0)]
+    # Longitude half-width at the circle's tangent points (wider than at lat itself).
+    ratio = math.sin(radius_miles / EARTH_RADIUS_MILES) / math.cos(math.radians(lat))
+    if ratio >= 1:
+        return min_lat, max_lat, [(-180.0, 180.0)]
+    dlon = math.degrees(math.asin(ratio))
+    min_lon, max_lon = lon - dlon, lon + dlon
+    if min_lon < -180:
+        return min_lat, max_lat, [(min_lon + 360, 180.0), (-180.0, max_lon)]
+    if max_lon > 180:
+        return min_lat, max_lat, [(min_lon, 180.0), (-180.0, max_lon - 360)]
+    return min_lat, max_lat, [(min_lon, max_lon)]
+
+
+def parse_bbox(text: str):
+    """Parse "min_lon,min_lat,max_lon,max_lat" into floats; min_lon > max_lon crosses the antimeridian.
+
+    Raises ValueError with a message fit for a 422.
+    """
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in text.split(","))
+    except ValueError:
+        raise ValueError("bbox must be min_lon,min_lat,max_lon,max_lat")
+    if not (-90 <= min_lat <= max_lat <= 90 and -180 <= min_lon <= 180 and -180 <= max_lon <= 180):
+        raise ValueError("bbox is out of range")
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def in_bbox(lat: float, lon: float, bbox) -> bool:
+    """Whether (lat, lon) lies in a parse_bbox() box."""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    if not min_lat <= lat <= max_lat:
+        return False
+    if min_lon <= max_lon:
+        return min_lon <= lon <= max_lon
+    return lon >= min_lon or lon <= max_lon
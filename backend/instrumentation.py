@@ -0,0 +1,313 @@
+"""Per-request SQL and timing instrumentation.
+
+InstrumentationMiddleware opens a RequestStats for each HTTP request (held in
+a ContextVar, which run_db's threadpool calls and AsyncSession.run_sync both
+inherit). Engine events add every SQL statement's count and time to it, and
+the rows fetched from its result (ORM queries and Core selects alike);
+response_cache records the time spent serializing the response. On the way out the middleware adds a Server-Timing
+header and folds the request into per-route totals that /metrics renders in
+the Prometheus text format. Totals are per process: with several uvicorn
+workers each one reports its own.
+
+Settings (env): SLOW_QUERY_MS logs statements slower than this many ms to the
+"wings.slow_query" logger, with their parameters and EXPLAIN QUERY PLAN
+(EXPLAIN on other databases). Unset or 0 disables it.
+"""
+import contextlib
+import logging
+import os
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+
+SLOW_QUERY_MS = float(os.environ.get("SLOW_QUERY_MS", "0") or 0)
+# Upper bounds (seconds) of the request duration histogram buckets.
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Upper bounds of the queries-per-request histogram buckets: a route creeping up these is an N+1.
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+slow_query_log = logging.getLogger("wings.slow_query")
+
+
+class RequestStats:
+    """What one request spent on the database and on serialization."""
+
+    __slots__ = ("queries", "db_seconds", "rows", "serialize_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.rows = 0
+        self.serialize_seconds = 0.0
+
+
+_current: ContextVar[Optional[RequestStats]] = ContextVar("request_stats", default=None)
+
+
+def current() -> Optional[RequestStats]:
+    """Stats of the request being handled, or None outside a request."""
+    return _current.get()
+
+
+@contextlib.contextmanager
+def serializing():
+    """Count the enclosed block as response serialization time."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        stats = _current.get()
+        if stats is not None:
+            stats.serialize_seconds += time.perf_counter() - started
+
+
+# --- SQLAlchemy hooks -----------------------------------------------------
+
+class _RowCountingCursor:
+    """DB-API cursor wrapper adding the rows fetched through it to a RequestStats."""
+
+    def __init__(self, cursor, stats: RequestStats):
+        self._cursor = cursor
+        self._stats = stats
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._stats.rows += 1
+        return row
+
+    def fetchmany(self, *args):
+        rows = self._cursor.fetchmany(*args)
+        self._stats.rows += len(rows)
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        self._stats.rows += len(rows)
+        return rows
+
+    def __iter__(self):
+        return iter(self.fetchone, None)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_started"].pop()
+    stats = _current.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.db_seconds += elapsed
+        if context is not None and cursor.description is not None:
+            # The result is built on context.cursor, so its fetches go through the wrapper
+            context.cursor = _RowCountingCursor(cursor, stats)
+    if SLOW_QUERY_MS and elapsed * 1000 >= SLOW_QUERY_MS and not conn.info.get("explaining"):
+        _log_slow_query(conn, statement, parameters, executemany, elapsed)
+
+
+def _log_slow_query(conn, statement, parameters, executemany, elapsed):
+    plan = None
+    head = statement.lstrip()[:6].upper()
+    if not executemany and head.startswith(("SELECT", "WITH")):
+        prefix = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+        conn.info["explaining"] = True
+        try:
+            # Straight on the DB-API connection so the EXPLAIN itself isn't instrumented
+            cursor = conn.connection.cursor()
+            try:
+                cursor.execute(prefix + statement, parameters)
+                plan = "\n".join(" ".join(str(col) for col in row) for row in cursor.fetchall())
+            finally:
+                cursor.close()
+        except Exception as exc:  # the plan is a nice-to-have; never fail the request over it
+            plan = f"(EXPLAIN failed: {exc})"
+        finally:
+            conn.info["explaining"] = False
+    scope = _scope.get()
+    route = _route_template(scope) if scope is not None else None
+    slow_query_log.warning(
+        "slow query %.1f ms%s\n%s\nparameters: %r%s",
+        elapsed * 1000,
+        f" in {route}" if route else "",
+        statement,
+        parameters,
+        f"\nplan:\n{plan}" if plan else "",
+    )
+
+
+_watched = set()
+
+
+def watch_engine(engine) -> None:
+    """Time and count the statements engine executes (an AsyncEngine's sync_engine for async ones)."""
+    if engine is None or engine in _watched:
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    _watched.add(engine)
+
+
+def watch_app_engines() -> None:
+    """Hook every engine database.py created."""
+    import database
+
+    for engine in (database.engine, database.read_engine):
+        watch_engine(engine)
+    for async_engine in (database.async_engine, database.async_read_engine):
+        if async_engine is not None:
+            watch_engine(async_engine.sync_engine)
+
+
+# --- per-route totals -----------------------------------------------------
+
+class _RouteTotals:
+    __slots__ = ("requests", "seconds", "db_seconds", "queries", "rows", "serialize_seconds",
+                 "duration_buckets", "query_buckets")
+
+    def __init__(self):
+        self.requests = 0
+        self.seconds = 0.0
+        self.db_seconds = 0.0
+        self.queries = 0
+        self.rows = 0
+        self.serialize_seconds = 0.0
+        self.duration_buckets = [0] * len(DURATION_BUCKETS)
+        self.query_buckets = [0] * len(QUERY_BUCKETS)
+
+
+class Metrics:
+    """Thread-safe per (method, route, status) request totals and histograms."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, method: str, route: str, status: int, seconds: float, stats: RequestStats) -> None:
+        with self._lock:
+            totals = self._routes.get((method, route, status))
+            if totals is None:
+                totals = self._routes[(method, route, status)] = _RouteTotals()
+            totals.requests += 1
+            totals.seconds += seconds
+            totals.db_seconds += stats.db_seconds
+            totals.queries += stats.queries
+            totals.rows += stats.rows
+            totals.serialize_seconds += stats.serialize_seconds
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if seconds <= bound:
+                    totals.duration_buckets[i] += 1
+            for i, bound in enumerate(QUERY_BUCKETS):
+                if stats.queries <= bound:
+                    totals.query_buckets[i] += 1
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            routes = sorted(self._routes.items())
+            snapshot = [(key, _copy(totals)) for key, totals in routes]
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        def labels(key, **extra):
+            method, route, status = key
+            pairs = [("method", method), ("route", route), ("status", str(status))] + list(extra.items())
+            return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+        family("wings_http_requests_total", "counter", "HTTP requests handled.")
+        for key, t in snapshot:
+            lines.append(f"wings_http_requests_total{labels(key)} {t.requests}")
+        family("wings_http_request_duration_seconds", "histogram", "Time from request to the end of the response body.")
+        for key, t in snapshot:
+            for bound, count in zip(DURATION_BUCKETS, t.duration_buckets):
+                lines.append(f"wings_http_request_duration_seconds_bucket{labels(key, le=repr(bound))} {count}")
+            lines.append(f'wings_http_request_duration_seconds_bucket{labels(key, le="+Inf")} {t.requests}')
+            lines.append(f"wings_http_request_duration_seconds_sum{labels(key)} {t.seconds:.6f}")
+            lines.append(f"wings_http_request_duration_seconds_count{labels(key)} {t.requests}")
+        family("wings_db_queries_per_request", "histogram", "SQL statements executed per request.")
+        for key, t in snapshot:
+            for bound, count in zip(QUERY_BUCKETS, t.query_buckets):
+                lines.append(f"wings_db_queries_per_request_bucket{labels(key, le=str(bound))} {count}")
+            lines.append(f'wings_db_queries_per_request_bucket{labels(key, le="+Inf")} {t.requests}')
+            lines.append(f"wings_db_queries_per_request_sum{labels(key)} {t.queries}")
+            lines.append(f"wings_db_queries_per_request_count{labels(key)} {t.requests}")
+        family("wings_db_query_seconds_total", "counter", "Time spent executing SQL statements.")
+        for key, t in snapshot:
+            lines.append(f"wings_db_query_seconds_total{labels(key)} {t.db_seconds:.6f}")
+        family("wings_db_rows_fetched_total", "counter", "Rows fetched from SQL query results.")
+        for key, t in snapshot:
+            lines.append(f"wings_db_rows_fetched_total{labels(key)} {t.rows}")
+        family("wings_serialize_seconds_total", "counter", "Time spent validating and serializing response bodies.")
+        for key, t in snapshot:
+            lines.append(f"wings_serialize_seconds_total{labels(key)} {t.serialize_seconds:.6f}")
+        return "\n".join(lines) + "\n"
+
+
+def _copy(totals: _RouteTotals) -> _RouteTotals:
+    copy = _RouteTotals()
+    for name in _RouteTotals.__slots__:
+        value = getattr(totals, name)
+        setattr(copy, name, list(value) if isinstance(value, list) else value)
+    return copy
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+metrics = Metrics()
+
+# ASGI scope of the current request; routing fills in its "route" (for the slow-query log).
+_scope: ContextVar[Optional[dict]] = ContextVar("request_scope", default=None)
+
+
+def _route_template(scope) -> str:
+    route = scope.get("route")
+    # Label by template ("/locations/by-id/{location_id}"), never by raw path, to keep label cardinality bounded
+    return getattr(route, "path", None) or "unmatched"
+
+
+class InstrumentationMiddleware:
+    """ASGI middleware: per-request stats, a Server-Timing header and the /metrics totals."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        stats = RequestStats()
+        stats_token = _current.set(stats)
+        scope_token = _scope.set(scope)
+        started = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                elapsed = (time.perf_counter() - started) * 1000
+                timing = (
+                    f'db;dur={stats.db_seconds * 1000:.1f};desc="{stats.queries} queries, {stats.rows} rows", '
+                    f"serialize;dur={stats.serialize_seconds * 1000:.1f}, app;dur={elapsed:.1f}"
+                )
+                message = {**message, "headers": list(message.get("headers", [])) + [(b"server-timing", timing.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            metrics.record(scope["method"], _route_template(scope), status, time.perf_counter() - started, stats)
+            _current.reset(stats_token)
+            _scope.reset(scope_token)
@@ -0,0 +1,276 @@
+"""In-process fan-out of change events to live subscribers (WebSocket and SSE; see routers/live.py).
+
+Write endpoints call the publish helpers below after they commit. Events are
+queued to one publisher task. It drains the queue, looks up fresh summaries
+for all affected locations in one query, encodes each event to JSON once and
+hands the same string to every matching subscriber. Events:
+
+  review.created / review.updated
+      {"type", "review": WingReview, "location": summary}; an update that moved
+      the review also carries "previous_location": summary of the old one
+  location.created   {"type", "location": summary}
+  location.merged    {"type", "from_id", "into_id", "reviews_moved", "location": summary of into_id}
+  bulk               {"type", "entity": "reviews" | "locations", "count"}; sent to everyone
+  resync             the subscriber fell behind and events were dropped, or an
+                     event failed to build; refetch
+
+A summary is {id, name, lat, lon, review_count, average_rating, average_heat},
+or null when the location no longer exists. It is enough for a client to
+patch a list or a detail page without refetching.
+
+A subscriber follows any mix of: everything, a set of location ids, and
+bounding boxes (matched against the event locations' coordinates). An idle
+subscriber is a small object and a bounded queue; there is no task per
+subscriber here. A subscriber whose queue fills (LIVE_QUEUE_SIZE events) has it
+cleared and gets a single resync event, so a slow client never holds up the
+others or grows memory.
+
+With several uvicorn workers each worker's hub sees only the writes that
+worker handled, as with response_cache.
+
+Settings (env): LIVE_QUEUE_SIZE (default 256), LIVE_MAX_SUBSCRIBERS (10000;
+further connections are refused), LIVE_HEARTBEAT (seconds between SSE
+keep-alive comments, default 20).
+"""
+import asyncio
+import json
+import logging
+import os
+
+from sqlalchemy import func, select
+from starlette.concurrency import run_in_threadpool
+
+import geo
+import location_stats
+import models, schemas
+from database import read_engine
+
+QUEUE_SIZE = int(os.environ.get("LIVE_QUEUE_SIZE", "256"))
+MAX_SUBSCRIBERS = int(os.environ.get("LIVE_MAX_SUBSCRIBERS", "10000"))
+HEARTBEAT = float(os.environ.get("LIVE_HEARTBEAT", "20"))
+MAX_BOXES = 16  # per subscriber
+
+RESYNC = json.dumps({"type": "resync"})
+
+log = logging.getLogger(__name__)
+
+
+class HubFull(Exception):
+    pass
+
+
+def parse_subscription(locations=None, bbox=None, everything=False) -> dict:
+    """Normalize a subscription: locations as ids or "1,2,3", bbox as one or more bbox strings.
+
+    Raises ValueError with a message fit for a 422 (or a WebSocket error frame).
+    """
+    if isinstance(locations, str):
+        locations = [part for part in locations.split(",") if part.strip()]
+    try:
+        location_ids = frozenset(int(i) for i in locations or ())
+    except (TypeError, ValueError):
+        raise ValueError("locations must be location ids")
+    if isinstance(bbox, str):
+        bbox = [bbox]
+    if not isinstance(bbox, (list, tuple, type(None))) or len(bbox or ()) > MAX_BOXES:
+        raise ValueError(f"bbox must be a list of at most {MAX_BOXES} bbox strings")
+    boxes = tuple(geo.parse_bbox(str(box)) for box in bbox or ())
+    return {"everything": bool(everything), "location_ids": location_ids, "boxes": boxes}
+
+
+class Subscriber:
+    """One connection's subscription and its queue of encoded events."""
+
+    __slots__ = ("queue", "everything", "location_ids", "boxes", "resyncs")
+
+    def __init__(self, queue_size: int):
+        self.queue = asyncio.Queue(queue_size)
+        self.everything = False
+        self.location_ids = frozenset()
+        self.boxes = ()
+        self.resyncs = 0
+
+    def deliver(self, message: str) -> None:
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.resync()  # fallen behind: drop the backlog, the client refetches instead
+
+    def resync(self) -> None:
+        while not self.queue.empty():
+            self.queue.get_nowait()
+        self.queue.put_nowait(RESYNC)
+        self.resyncs += 1
+
+
+def _summaries(location_ids) -> dict:
+    """{location_id: summary dict} for the locations that still exist."""
+    loc = models.WingLocation
+    stats = models.LocationStats
+    stmt = (
+        select(
+            loc.id,
+            loc.name,
+            loc.lat,
+            loc.lon,
+            func.coalesce(stats.review_count, 0).label("review_count"),
+            location_stats.average("rating").label("average_rating"),
+            location_stats.average("heat").label("average_heat"),
+        )
+        .outerjoin(stats, stats.location_id == loc.id)
+        .where(loc.id.in_(location_ids))
+    )
+    with read_engine.connect() as conn:
+        return {row.id: row._asdict() for row in conn.execute(stmt)}
+
+
+class Hub:
+    def __init__(self, queue_size: int = QUEUE_SIZE, max_subscribers: int = MAX_SUBSCRIBERS):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self.published = 0
+        self.delivered = 0
+        self._subscribers = set()
+        self._everything = set()
+        self._by_location = {}  # location_id -> set of Subscriber
+        self._spatial = set()  # subscribers with boxes
+        self._pending = None
+        self._loop = None
+        self._task = None
+
+    # --- subscriptions (event loop only) --------------------------------------
+
+    def subscribe(self, everything=False, location_ids=frozenset(), boxes=()) -> Subscriber:
+        if len(self._subscribers) >= self.max_subscribers:
+            raise HubFull
+        subscriber = Subscriber(self.queue_size)
+        self._subscribers.add(subscriber)
+        self.update(subscriber, everything, location_ids, boxes)
+        return subscriber
+
+    def update(self, subscriber: Subscriber, everything=False, location_ids=frozenset(), boxes=()) -> None:
+        """Replace a subscriber's subscription."""
+        self._unindex(subscriber)
+        subscriber.everything, subscriber.location_ids, subscriber.boxes = everything, location_ids, boxes
+        if everything:
+            self._everything.add(subscriber)
+        for location_id in location_ids:
+            self._by_location.setdefault(location_id, set()).add(subscriber)
+        if boxes:
+            self._spatial.add(subscriber)
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._unindex(subscriber)
+        self._subscribers.discard(subscriber)
+
+    def _unindex(self, subscriber: Subscriber) -> None:
+        self._everything.discard(subscriber)
+        self._spatial.discard(subscriber)
+        for location_id in subscriber.location_ids:
+            followers = self._by_location.get(location_id)
+            if followers is not None:
+                followers.discard(subscriber)
+                if not followers:
+                    del self._by_location[location_id]
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "everything": len(self._everything),
+            "spatial": len(self._spatial),
+            "locations_followed": len(self._by_location),
+            "published": self.published,
+            "delivered": self.delivered,
+            "resyncs": sum(s.resyncs for s in self._subscribers),
+        }
+
+    # --- publishing -------------------------------------------------------------
+
+    def publish(self, event: dict, summarize=None, match_ids=()) -> None:
+        """Queue an event. summarize: {event key: location_id} to fill with summaries;
+        match_ids: extra location ids whose followers get it. Without summarize or
+        match_ids it goes to every subscriber. Call from the event loop."""
+        if not self._subscribers:
+            return
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:  # asyncio queues belong to one event loop
+            self._pending, self._loop = asyncio.Queue(), loop
+        if self._task is None or self._task.done():
+            # A restarted publisher picks up whatever is still queued
+            self._task = loop.create_task(self._run())
+        self._pending.put_nowait((event, summarize or {}, match_ids))
+
+    async def _run(self) -> None:
+        while True:
+            batch = [await self._pending.get()]
+            while not self._pending.empty():
+                batch.append(self._pending.get_nowait())
+            ids = {i for _, summarize, _ in batch for i in summarize.values() if i is not None}
+            try:
+                summaries = await run_in_threadpool(_summaries, ids) if ids else {}
+            except Exception:
+                log.exception("live: summarizing %d location(s) failed", len(ids))
+                summaries = {}  # still deliver; clients refetch what they need
+            for event, summarize, match_ids in batch:
+                try:
+                    self._dispatch(event, summarize, match_ids, summaries)
+                except Exception:
+                    # Who should have had it is unknown, so everyone refetches
+                    log.exception("live: dropping %s event", event.get("type"))
+                    for subscriber in self._subscribers:
+                        subscriber.resync()
+
+    def _dispatch(self, event: dict, summarize: dict, match_ids, summaries: dict) -> None:
+        self.published += 1
+        for key, location_id in summarize.items():
+            event[key] = summaries.get(location_id)
+        if not summarize and not match_ids:
+            targets = set(self._subscribers)
+        else:
+            targets = set(self._everything)
+            for location_id in (*summarize.values(), *match_ids):
+                targets |= self._by_location.get(location_id, set())
+            points = [
+                (s["lat"], s["lon"]) for s in (event[key] for key in summarize)
+                if s and s["lat"] is not None and s["lon"] is not None
+            ]
+            if points:
+                for subscriber in self._spatial - targets:
+                    if any(geo.in_bbox(lat, lon, box) for box in subscriber.boxes for lat, lon in points):
+                        targets.add(subscriber)
+        if not targets:
+            return
+        message = json.dumps(event, default=str)
+        for subscriber in targets:
+            subscriber.deliver(message)
+        self.delivered += len(targets)
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+hub = Hub()
+
+
+def review_changed(kind: str, review, previous_location_id=None) -> None:
+    """review.created / review.updated for a review (ORM object or schemas.WingReview), after commit."""
+    summarize = {"location": review.location_id}
+    if previous_location_id is not None and previous_location_id != review.location_id:
+        summarize["previous_location"] = previous_location_id
+    hub.publish({"type": f"review.{kind}", "review": schemas.WingReview.model_validate(review).model_dump(mode="json")}, summarize)
+
+
+def location_created(location_id: int) -> None:
+    hub.publish({"type": "location.created"}, {"location": location_id})
+
+
+def locations_merged(from_id: int, into_id: int, reviews_moved: int) -> None:
+    event = {"type": "location.merged", "from_id": from_id, "into_id": into_id, "reviews_moved": reviews_moved}
+    hub.publish(event, {"location": into_id}, match_ids=(from_id,))
+
+
+def bulk(entity: str, count: int) -> None:
+    if count:
+        hub.publish({"type": "bulk", "entity": entity, "count": count})
@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""Materialized per-location review aggregates (location_stats and location_daily_stats).
+
+Review write paths keep the tables current inside their own transaction:
+add_review() applies one new review as a delta, refresh_locations() recomputes
+the rows for a handful of locations (edits, moves, merges). Read paths use
+stats_for() and the average() expressions instead of grouping wing_reviews.
+location_daily_stats holds the same sums per (location, day of created_at);
+window_totals() adds up the days of a time window for the leaderboard.
+
+If the table ever drifts (manual SQL, restored backup), rebuild it. Run from backend dir:
+   python3 location_stats.py
+   Or in Docker: docker compose exec backend python3 location_stats.py
+"""
+from sqlalchemy import case, delete, event, func, insert, or_, select
+from sqlalchemy.orm import Session
+
+import models
+import review_attributes
+
+# Review columns aggregated as <field>_sum / <field>_count (nulls are not counted, like AVG).
+STAT_FIELDS = ("rating", "heat") + review_attributes.SCORED
+# The subset also bucketed per day in location_daily_stats.
+DAILY_FIELDS = ("rating", "heat")
+# Session.info key: ids of locations whose stats this transaction changed, or that it created or deleted
+TOUCHED_KEY = "location_stats_touched"
+_commit_listeners = []
+
+
+def _touch(db: Session, location_ids) -> None:
+    db.info.setdefault(TOUCHED_KEY, set()).update(location_ids)
+
+
+def on_commit(listener) -> None:
+    """Call listener(location_ids) after every commit that touched some locations (in-memory indexes)."""
+    _commit_listeners.append(listener)
+
+
+@event.listens_for(Session, "after_flush")
+def _after_flush(session, flush_context):
+    changed = [
+        obj.id for obj in list(session.new) + list(session.deleted) if isinstance(obj, models.WingLocation)
+    ]
+    if changed:
+        _touch(session, changed)
+
+
+@event.listens_for(Session, "after_commit")
+def _after_commit(session):
+    touched = session.info.pop(TOUCHED_KEY, None)
+    if touched:
+        for listener in _commit_listeners:
+            listener(touched)
+
+
+@event.listens_for(Session, "after_rollback")
+def _after_rollback(session):
+    session.info.pop(TOUCHED_KEY, None)
+
+
+def average(field: str):
+    """SQL expression for the average of a review field, NULL when there are no values."""
+    stats = models.LocationStats
+    return getattr(stats, f"{field}_sum") / func.nullif(getattr(stats, f"{field}_count"), 0)
+
+
+def _aggregate_select(location_ids=None):
+    """SELECT producing location_stats rows from wing_reviews (optionally for some locations)."""
+    review = models.WingReview
+    columns = [review.location_id]
+    for field in STAT_FIELDS:
+        col = getattr(review, field)
+        columns.append(func.coalesce(func.sum(col), 0))
+        columns.append(func.count(col))
+    columns.append(func.count(review.id))
+    columns.append(func.max(review.created_at))
+    stmt = select(*columns).where(review.location_id.is_not(None))
+    if location_ids is not None:
+        stmt = stmt.where(review.location_id.in_(location_ids))
+    return stmt.group_by(review.location_id)
+
+
+def _stats_columns():
+    names = ["location_id"]
+    for field in STAT_FIELDS:
+        names += [f"{field}_sum", f"{field}_count"]
+    return names + ["review_count", "last_review_at"]
+
+
+def _review_day():
+    # date() reads both stored datetime layouts ("T" and " " separators)
+    return func.date(models.WingReview.created_at)
+
+
+def _daily_select(location_ids=None):
+    """SELECT producing location_daily_stats rows from wing_reviews (optionally for some locations)."""
+    review = models.WingReview
+    columns = [review.location_id, _review_day()]
+    for field in DAILY_FIELDS:
+        col = getattr(review, field)
+        columns.append(func.coalesce(func.sum(col), 0))
+        columns.append(func.count(col))
+    columns.append(func.count(review.id))
+    stmt = select(*columns).where(review.location_id.is_not(None), review.created_at.is_not(None))
+    if location_ids is not None:
+        stmt = stmt.where(review.location_id.in_(location_ids))
+    return stmt.group_by(review.location_id, _review_day())
+
+
+def _daily_columns():
+    names = ["location_id", "day"]
+    for field in DAILY_FIELDS:
+        names += [f"{field}_sum", f"{field}_count"]
+    return names + ["review_count"]
+
+
+def _add_daily(db: Session, review: models.WingReview) -> None:
+    daily = models.LocationDailyStats
+    day = review.created_at.date()
+    values = {daily.review_count: daily.review_count + 1}
+    for field in DAILY_FIELDS:
+        value = getattr(review, field)
+        if value is not None:
+            values[getattr(daily, f"{field}_sum")] = getattr(daily, f"{field}_sum") + value
+            values[getattr(daily, f"{field}_count")] = getattr(daily, f"{field}_count") + 1
+    updated = (
+        db.query(daily)
+        .filter(daily.location_id == review.location_id, daily.day == day)
+        .update(values, synchronize_session=False)
+    )
+    if updated:
+        return
+    row = {"location_id": review.location_id, "day": day, "review_count": 1}
+    for field in DAILY_FIELDS:
+        value = getattr(review, field)
+        row[f"{field}_sum"] = value if value is not None else 0.0
+        row[f"{field}_count"] = 1 if value is not None else 0
+    db.execute(insert(daily).values(**row))
+
+
+def add_review(db: Session, review: models.WingReview) -> None:
+    """Fold one newly inserted review into its location's stats row (no commit)."""
+    stats = models.LocationStats
+    values = {}
+    for field in STAT_FIELDS:
+        value = getattr(review, field)
+        if value is None:
+            continue
+        values[getattr(stats, f"{field}_sum")] = getattr(stats, f"{field}_sum") + value
+        values[getattr(stats, f"{field}_count")] = getattr(stats, f"{field}_count") + 1
+    values[stats.review_count] = stats.review_count + 1
+    if review.created_at is not None:
+        values[stats.last_review_at] = case(
+            (or_(stats.last_review_at.is_(None), stats.last_review_at < review.created_at), review.created_at),
+            else_=stats.last_review_at,
+        )
+    if review.created_at is not None:
+        _add_daily(db, review)
+    _touch(db, [review.location_id])
+    updated = (
+        db.query(stats)
+        .filter(stats.location_id == review.location_id)
+        .update(values, synchronize_session=False)
+    )
+    if updated:
+        return
+    row = {"location_id": review.location_id, "review_count": 1, "last_review_at": review.created_at}
+    for field in STAT_FIELDS:
+        value = getattr(review, field)
+        row[f"{field}_sum"] = value if value is not None else 0.0
+        row[f"{field}_count"] = 1 if value is not None else 0
+    db.execute(insert(stats).values(**row))
+
+
+def refresh_locations(db: Session, location_ids) -> None:
+    """Recompute stats rows for the given locations from wing_reviews (no commit)."""
+    ids = sorted({i for i in location_ids if i is not None})
+    if not ids:
+        return
+    _touch(db, ids)
+    stats = models.LocationStats
+    daily = models.LocationDailyStats
+    db.execute(delete(stats).where(stats.location_id.in_(ids)))
+    db.execute(insert(stats).from_select(_stats_columns(), _aggregate_select(ids)))
+    db.execute(delete(daily).where(daily.location_id.in_(ids)))
+    db.execute(insert(daily).from_select(_daily_columns(), _daily_select(ids)))
+
+
+def rebuild(db: Session) -> int:
+    """Recompute both tables from wing_reviews (no commit). Returns the location_stats row count."""
+    stats = models.LocationStats
+    db.execute(delete(stats))
+    db.execute(insert(stats).from_select(_stats_columns(), _aggregate_select()))
+    db.execute(delete(models.LocationDailyStats))
+    db.execute(insert(models.LocationDailyStats).from_select(_daily_columns(), _daily_select()))
+    return db.query(func.count(stats.location_id)).scalar()
+
+
+def stats_for(db: Session, location_ids) -> dict:
+    """Map location_id -> LocationStats row for the given ids (missing ids have no reviews)."""
+    ids = list({i for i in location_ids if i is not None})
+    if not ids:
+        return {}
+    rows = db.query(models.LocationStats).filter(models.LocationStats.location_id.in_(ids)).all()
+    return {row.location_id: row for row in rows}
+
+
+def window_totals(since=None, until=None):
+    """Subquery of per-location (location_id, <field>_sum, <field>_count..., review_count) for reviews
+    created between the dates since and until (inclusive), summed from the daily buckets.
+    since=None is all time, read from location_stats (which also counts reviews without created_at)."""
+    if since is None:
+        stats = models.LocationStats
+        columns = [stats.location_id]
+        for field in DAILY_FIELDS:
+            columns += [getattr(stats, f"{field}_sum"), getattr(stats, f"{field}_count")]
+        return select(*columns, stats.review_count).subquery()
+    daily = models.LocationDailyStats
+    columns = [daily.location_id]
+    for field in DAILY_FIELDS:
+        columns.append(func.sum(getattr(daily, f"{field}_sum")).label(f"{field}_sum"))
+        columns.append(func.sum(getattr(daily, f"{field}_count")).label(f"{field}_count"))
+    columns.append(func.sum(daily.review_count).label("review_count"))
+    stmt = select(*columns).where(daily.day >= since)
+    if until is not None:
+        stmt = stmt.where(daily.day <= until)
+    return stmt.group_by(daily.location_id).subquery()
+
+
+def row_average(row, field: str):
+    """Average of a field from a LocationStats row (None when absent or no values)."""
+    if row is None:
+        return None
+    count = getattr(row, f"{field}_count")
+    if not count:
+        return None
+    return float(getattr(row, f"{field}_sum")) / count
+
+
+def main():
+    from database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        count = rebuild(db)
+        db.commit()
+    finally:
+        db.close()
+    print(f"Done. Rebuilt location_stats and location_daily_stats for {count} location(s).")
+
+
+if __name__ == "__main__":
+    main()
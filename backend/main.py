@@ -1,33 +1,35 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from sqlalchemy import text
-from routers import locations, reviews
-import models
-from database import engine
+from fastapi.responses import PlainTextResponse
+from routers import export, live as live_router, locations, reviews
+import coalesce
+import instrumentation
+import live
+import response_cache
+import snapshots
+import write_queue
 from fastapi.middleware.cors import CORSMiddleware
 
-# Create database tables
-models.Base.metadata.create_all(bind=engine)
-
+# The schema is managed by Alembic migrations (backend/migrations); run
+# "alembic upgrade head" once per deploy, before starting the app.
 
-def _ensure_review_lat_lon():
-    """Add lat, lon to wing_reviews if missing (e.g. after deploy or old DB)."""
-    with engine.connect() as conn:
-        r = conn.execute(text("PRAGMA table_info(wing_reviews)"))
-        cols = [row[1] for row in r]
-        if "lat" not in cols:
-            conn.execute(text("ALTER TABLE wing_reviews ADD COLUMN lat REAL"))
-            conn.commit()
-        if "lon" not in cols:
-            conn.execute(text("ALTER TABLE wing_reviews ADD COLUMN lon REAL"))
-            conn.commit()
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Scheduled snapshots (no-op unless SNAPSHOT_INTERVAL_HOURS is set; see snapshots.py)
+    snapshots.scheduler.start()
+    yield
+    snapshots.scheduler.stop()
+    write_queue.writer.stop()  # commit reviews still queued (REVIEW_WRITE_QUEUE)
+    await live.hub.stop()
 
-_ensure_review_lat_lon()
 
 app = FastAPI(
     title="Chicken Wing Rating API",
     description="API for rating and reviewing chicken wings and locations.",
-    version="1.1.0"
+    version="1.1.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -36,11 +38,36 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Server-Timing"],
 )
+# Outermost, so its timings cover CORS and routing too
+app.add_middleware(instrumentation.InstrumentationMiddleware)
+instrumentation.watch_app_engines()
 
 app.include_router(locations.router, prefix="/locations", tags=["Locations"])
 app.include_router(reviews.router, prefix="/reviews", tags=["Reviews"])
+app.include_router(export.router, prefix="/export", tags=["Export"])
+app.include_router(live_router.router, prefix="/live", tags=["Live"])
 
 @app.get("/")
 def read_root():
-    return {"message": "Welcome to the Chicken Wing Rating API!"}
\ No newline at end of file
+    return {"message": "Welcome to the Chicken Wing Rating API!"}
+
+
+@app.get("/cache/stats")
+def read_cache_stats():
+    """Hit/miss counters for the in-process response cache, with coalescing and admission counters."""
+    return {**response_cache.cache.stats(), "coalescing": coalesce.flights.stats(), "heavy_queries": coalesce.heavy.stats()}
+
+
+@app.get("/live/stats")
+def read_live_stats():
+    """Subscriber and event counters for the live feed hub."""
+    return live.hub.stats()
+
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    """Per-route request, SQL and serialization totals in the Prometheus text format."""
+    body = instrumentation.metrics.render() + coalesce.render_metrics()
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
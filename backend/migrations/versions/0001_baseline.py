@@ -0,0 +1,137 @@
+"""Baseline: the schema as of the first migration.
+
+Databases created before migrations existed may already have some of this
+(and may lack columns the old one-off scripts added), so every step checks
+what is there first. Replaces create_all and the startup / one-off
+ALTER TABLE scripts (add_created_at.py, add_review_lat_lon.py, heat column).
+The SQLite FTS5 tables and their sync triggers are written out here as they
+were at this revision; search_index.py tracks the current ones.
+
+Downgrading drops every table the baseline creates, data included: take a
+snapshot first (python3 snapshots.py create).
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+FTS_TABLES = ("locations_fts", "reviews_fts")
+FTS_TRIGGERS = (
+    "wing_locations_fts_ai", "wing_locations_fts_ad", "wing_locations_fts_au",
+    "wing_reviews_fts_ai", "wing_reviews_fts_ad", "wing_reviews_fts_au",
+)
+FTS_SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS locations_fts USING fts5(
+        name, address, content='wing_locations', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS reviews_fts USING fts5(
+        comment, content='wing_reviews', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    """CREATE TRIGGER IF NOT EXISTS wing_locations_fts_ai AFTER INSERT ON wing_locations BEGIN
+        INSERT INTO locations_fts(rowid, name, address) VALUES (new.id, new.name, new.address);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS wing_locations_fts_ad AFTER DELETE ON wing_locations BEGIN
+        INSERT INTO locations_fts(locations_fts, rowid, name, address) VALUES ('delete', old.id, old.name, old.address);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS wing_locations_fts_au AFTER UPDATE OF name, address ON wing_locations BEGIN
+        INSERT INTO locations_fts(locations_fts, rowid, name, address) VALUES ('delete', old.id, old.name, old.address);
+        INSERT INTO locations_fts(rowid, name, address) VALUES (new.id, new.name, new.address);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS wing_reviews_fts_ai AFTER INSERT ON wing_reviews BEGIN
+        INSERT INTO reviews_fts(rowid, comment) VALUES (new.id, new.comment);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS wing_reviews_fts_ad AFTER DELETE ON wing_reviews BEGIN
+        INSERT INTO reviews_fts(reviews_fts, rowid, comment) VALUES ('delete', old.id, old.comment);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS wing_reviews_fts_au AFTER UPDATE OF comment ON wing_reviews BEGIN
+        INSERT INTO reviews_fts(reviews_fts, rowid, comment) VALUES ('delete', old.id, old.comment);
+        INSERT INTO reviews_fts(rowid, comment) VALUES (new.id, new.comment);
+    END""",
+]
+
+
+def _create_index_if_missing(inspector, name, table, columns):
+    if name not in {ix["name"] for ix in inspector.get_indexes(table)}:
+        op.create_index(name, table, columns)
+
+
+def upgrade():
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = set(inspector.get_table_names())
+
+    if "wing_locations" not in tables:
+        op.create_table(
+            "wing_locations",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("name", sa.String()),
+            sa.Column("address", sa.String()),
+            sa.Column("lat", sa.Float()),
+            sa.Column("lon", sa.Float()),
+        )
+    if "wing_reviews" not in tables:
+        op.create_table(
+            "wing_reviews",
+            sa.Column("id", sa.Integer(), primary_key=True),
+            sa.Column("location_id", sa.Integer(), sa.ForeignKey("wing_locations.id")),
+            sa.Column("rating", sa.Float()),
+            sa.Column("comment", sa.String()),
+            sa.Column("heat", sa.Integer(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.Column("lat", sa.Float(), nullable=True),
+            sa.Column("lon", sa.Float(), nullable=True),
+        )
+    else:
+        columns = {col["name"] for col in inspector.get_columns("wing_reviews")}
+        for name, type_ in (("created_at", sa.DateTime()), ("heat", sa.Integer()), ("lat", sa.Float()), ("lon", sa.Float())):
+            if name not in columns:
+                op.add_column("wing_reviews", sa.Column(name, type_, nullable=True))
+
+    inspector = sa.inspect(bind)
+    _create_index_if_missing(inspector, "ix_wing_locations_id", "wing_locations", ["id"])
+    _create_index_if_missing(inspector, "ix_wing_locations_name", "wing_locations", ["name"])
+    _create_index_if_missing(inspector, "ix_wing_locations_lat_lon", "wing_locations", ["lat", "lon"])
+    _create_index_if_missing(inspector, "ix_wing_reviews_id", "wing_reviews", ["id"])
+
+    if "location_stats" not in tables:
+        op.create_table(
+            "location_stats",
+            sa.Column("location_id", sa.Integer(), sa.ForeignKey("wing_locations.id", ondelete="CASCADE"), primary_key=True),
+            sa.Column("rating_sum", sa.Float(), nullable=False),
+            sa.Column("rating_count", sa.Integer(), nullable=False),
+            sa.Column("heat_sum", sa.Float(), nullable=False),
+            sa.Column("heat_count", sa.Integer(), nullable=False),
+            sa.Column("review_count", sa.Integer(), nullable=False),
+            sa.Column("last_review_at", sa.DateTime(), nullable=True),
+        )
+        # Written out rather than calling location_stats.rebuild(), which tracks the latest model.
+        op.execute(
+            "INSERT INTO location_stats (location_id, rating_sum, rating_count, heat_sum, heat_count, review_count, last_review_at) "
+            "SELECT location_id, COALESCE(SUM(rating), 0), COUNT(rating), COALESCE(SUM(heat), 0), COUNT(heat), COUNT(id), MAX(created_at) "
+            "FROM wing_reviews WHERE location_id IS NOT NULL GROUP BY location_id"
+        )
+
+    if bind.dialect.name == "sqlite":
+        for statement in FTS_SCHEMA:
+            op.execute(statement)
+        for name in FTS_TABLES:
+            if name not in tables:  # index the rows that are already there
+                op.execute(f"INSERT INTO {name}({name}) VALUES ('rebuild')")
+
+
+def downgrade():
+    if op.get_bind().dialect.name == "sqlite":
+        for name in FTS_TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {name}")
+        for name in FTS_TABLES:
+            op.execute(f"DROP TABLE IF EXISTS {name}")
+    op.drop_table("location_stats")
+    op.drop_table("wing_reviews")
+    op.drop_table("wing_locations")
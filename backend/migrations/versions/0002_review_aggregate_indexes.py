@@ -0,0 +1,26 @@
+"""Composite indexes for the per-location review aggregates.
+
+(location_id, created_at) serves "latest review per location" and
+(location_id, rating, heat) covers the rating/heat sums, so refreshing
+location_stats for a location reads only the index.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18
+"""
+from alembic import op
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_wing_reviews_location_created", "wing_reviews", ["location_id", "created_at"])
+    op.create_index("ix_wing_reviews_location_rating_heat", "wing_reviews", ["location_id", "rating", "heat"])
+
+
+def downgrade():
+    op.drop_index("ix_wing_reviews_location_rating_heat", table_name="wing_reviews")
+    op.drop_index("ix_wing_reviews_location_created", table_name="wing_reviews")
@@ -0,0 +1,84 @@
+"""Typed rating-form attributes on wing_reviews, with per-location averages.
+
+style, presentation, count_wing, count_drum, cooking_style, size, cost, sauce
+and doneness were only in the comment text. They become columns, and the
+scored ones get <field>_sum / <field>_count in location_stats. The covering
+index for the stats refresh is widened to the new stat columns, and
+(style, location_id) serves the style filter.
+
+Existing rows still have the values only in their comments; fill them with
+   python3 backfill.py --all
+which also refreshes location_stats as it goes.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+ATTRIBUTE_COLUMNS = (
+    ("style", sa.String()),
+    ("presentation", sa.Integer()),
+    ("count_wing", sa.Integer()),
+    ("count_drum", sa.Integer()),
+    ("cooking_style", sa.Integer()),
+    ("size", sa.Integer()),
+    ("cost", sa.Float()),
+    ("sauce", sa.Integer()),
+    ("doneness", sa.Integer()),
+)
+SCORED = ("presentation", "size", "sauce", "doneness", "cost")
+# wing_reviews' full-text sync triggers as created by 0001
+REVIEW_FTS_TRIGGERS = [
+    """CREATE TRIGGER IF NOT EXISTS wing_reviews_fts_ai AFTER INSERT ON wing_reviews BEGIN
+        INSERT INTO reviews_fts(rowid, comment) VALUES (new.id, new.comment);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS wing_reviews_fts_ad AFTER DELETE ON wing_reviews BEGIN
+        INSERT INTO reviews_fts(reviews_fts, rowid, comment) VALUES ('delete', old.id, old.comment);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS wing_reviews_fts_au AFTER UPDATE OF comment ON wing_reviews BEGIN
+        INSERT INTO reviews_fts(reviews_fts, rowid, comment) VALUES ('delete', old.id, old.comment);
+        INSERT INTO reviews_fts(rowid, comment) VALUES (new.id, new.comment);
+    END""",
+]
+
+
+def upgrade():
+    with op.batch_alter_table("wing_reviews") as batch:
+        for name, type_ in ATTRIBUTE_COLUMNS:
+            batch.add_column(sa.Column(name, type_, nullable=True))
+    with op.batch_alter_table("location_stats") as batch:
+        for name in SCORED:
+            batch.add_column(sa.Column(f"{name}_sum", sa.Float(), nullable=False, server_default="0"))
+            batch.add_column(sa.Column(f"{name}_count", sa.Integer(), nullable=False, server_default="0"))
+
+    op.drop_index("ix_wing_reviews_location_rating_heat", table_name="wing_reviews")
+    op.create_index(
+        "ix_wing_reviews_location_stats",
+        "wing_reviews",
+        ["location_id", "rating", "heat", "presentation", "size", "sauce", "doneness", "cost", "created_at"],
+    )
+    op.create_index("ix_wing_reviews_style_location", "wing_reviews", ["style", "location_id"])
+
+
+def downgrade():
+    op.drop_index("ix_wing_reviews_style_location", table_name="wing_reviews")
+    op.drop_index("ix_wing_reviews_location_stats", table_name="wing_reviews")
+    op.create_index("ix_wing_reviews_location_rating_heat", "wing_reviews", ["location_id", "rating", "heat"])
+    with op.batch_alter_table("location_stats") as batch:
+        for name in reversed(SCORED):
+            batch.drop_column(f"{name}_count")
+            batch.drop_column(f"{name}_sum")
+    with op.batch_alter_table("wing_reviews") as batch:
+        for name, _ in reversed(ATTRIBUTE_COLUMNS):
+            batch.drop_column(name)
+    # On SQLite the batch drop recreates wing_reviews, which drops its FTS triggers
+    if op.get_bind().dialect.name == "sqlite":
+        for statement in REVIEW_FTS_TRIGGERS:
+            op.execute(statement)
@@ -0,0 +1,45 @@
+"""Per-location daily review buckets (location_daily_stats) for windowed leaderboards.
+
+Populated here from wing_reviews; afterwards the review write paths keep it
+current together with location_stats.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "location_daily_stats",
+        sa.Column("location_id", sa.Integer(), sa.ForeignKey("wing_locations.id", ondelete="CASCADE"), primary_key=True),
+        sa.Column("day", sa.Date(), primary_key=True),
+        sa.Column("rating_sum", sa.Float(), nullable=False),
+        sa.Column("rating_count", sa.Integer(), nullable=False),
+        sa.Column("heat_sum", sa.Float(), nullable=False),
+        sa.Column("heat_count", sa.Integer(), nullable=False),
+        sa.Column("review_count", sa.Integer(), nullable=False),
+    )
+    op.create_index(
+        "ix_location_daily_stats_day",
+        "location_daily_stats",
+        ["day", "location_id", "rating_sum", "rating_count", "heat_sum", "heat_count", "review_count"],
+    )
+    op.execute(
+        "INSERT INTO location_daily_stats (location_id, day, rating_sum, rating_count, heat_sum, heat_count, review_count) "
+        "SELECT location_id, date(created_at), COALESCE(SUM(rating), 0), COUNT(rating), COALESCE(SUM(heat), 0), COUNT(heat), COUNT(id) "
+        "FROM wing_reviews WHERE location_id IS NOT NULL AND created_at IS NOT NULL "
+        "GROUP BY location_id, date(created_at)"
+    )
+
+
+def downgrade():
+    op.drop_index("ix_location_daily_stats_day", table_name="location_daily_stats")
+    op.drop_table("location_daily_stats")
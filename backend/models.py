@@ -1,5 +1,5 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Date, DateTime, Index
 from sqlalchemy.orm import relationship
 from database import Base
 
@@ -11,6 +11,9 @@ class WingLocation(Base):
     lat = Column(Float)
     lon = Column(Float)
     reviews = relationship("WingReview", back_populates="location")
+    __table_args__ = (
+        Index("ix_wing_locations_lat_lon", "lat", "lon"),  # bounding-box prefilter for radius search
+    )
 
 class WingReview(Base):
     __tablename__ = "wing_reviews"
@@ -22,4 +25,63 @@ class WingReview(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=True)
     lat = Column(Float, nullable=True)  # optional coords when location unassigned (curator can set later)
     lon = Column(Float, nullable=True)
-    location = relationship("WingLocation", back_populates="reviews") 
\ No newline at end of file
+    # Rating form attributes (see review_attributes.py)
+    style = Column(String, nullable=True)  # normalized, e.g. "buffalo"
+    presentation = Column(Integer, nullable=True)
+    count_wing = Column(Integer, nullable=True)
+    count_drum = Column(Integer, nullable=True)
+    cooking_style = Column(Integer, nullable=True)
+    size = Column(Integer, nullable=True)
+    cost = Column(Float, nullable=True)
+    sauce = Column(Integer, nullable=True)
+    doneness = Column(Integer, nullable=True)
+    location = relationship("WingLocation", back_populates="reviews")
+    __table_args__ = (
+        # Per-location aggregates (location_stats refresh, latest review) read only these indexes
+        Index("ix_wing_reviews_location_created", "location_id", "created_at"),
+        Index(
+            "ix_wing_reviews_location_stats",
+            "location_id", "rating", "heat", "presentation", "size", "sauce", "doneness", "cost", "created_at",
+        ),
+        Index("ix_wing_reviews_style_location", "style", "location_id"),  # style filter
+    )
+
+class LocationStats(Base):
+    """Per-location review aggregates, maintained by the review write paths (see location_stats.py)."""
+    __tablename__ = "location_stats"
+    location_id = Column(Integer, ForeignKey("wing_locations.id", ondelete="CASCADE"), primary_key=True)
+    rating_sum = Column(Float, nullable=False, default=0.0)
+    rating_count = Column(Integer, nullable=False, default=0)
+    heat_sum = Column(Float, nullable=False, default=0.0)
+    heat_count = Column(Integer, nullable=False, default=0)
+    presentation_sum = Column(Float, nullable=False, default=0.0)
+    presentation_count = Column(Integer, nullable=False, default=0)
+    size_sum = Column(Float, nullable=False, default=0.0)
+    size_count = Column(Integer, nullable=False, default=0)
+    sauce_sum = Column(Float, nullable=False, default=0.0)
+    sauce_count = Column(Integer, nullable=False, default=0)
+    doneness_sum = Column(Float, nullable=False, default=0.0)
+    doneness_count = Column(Integer, nullable=False, default=0)
+    cost_sum = Column(Float, nullable=False, default=0.0)
+    cost_count = Column(Integer, nullable=False, default=0)
+    review_count = Column(Integer, nullable=False, default=0)
+    last_review_at = Column(DateTime, nullable=True)
+
+
+class LocationDailyStats(Base):
+    """Per-location review sums bucketed by day of created_at; windows add up a range of days."""
+    __tablename__ = "location_daily_stats"
+    location_id = Column(Integer, ForeignKey("wing_locations.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    rating_sum = Column(Float, nullable=False, default=0.0)
+    rating_count = Column(Integer, nullable=False, default=0)
+    heat_sum = Column(Float, nullable=False, default=0.0)
+    heat_count = Column(Integer, nullable=False, default=0)
+    review_count = Column(Integer, nullable=False, default=0)
+    __table_args__ = (
+        # Window sums scan one day range and read only this index
+        Index(
+            "ix_location_daily_stats_day",
+            "day", "location_id", "rating_sum", "rating_count", "heat_sum", "heat_count", "review_count",
+        ),
+    )
@@ -0,0 +1,8 @@
+"""Location name normalization shared by duplicate detection and bulk import."""
+
+
+def normalize_name(name: str) -> str:
+    """Normalize for duplicate detection: lowercase, strip, collapse spaces."""
+    if not name:
+        return ""
+    return " ".join(name.lower().strip().split())
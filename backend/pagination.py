@@ -0,0 +1,107 @@
+"""Opaque keyset-pagination cursors.
+
+A cursor records the sort key values of the last row on a page (always
+ending with the row id, so keys are unique). The next page is an index seek
+"after" those values instead of an OFFSET scan, and it doesn't shift when
+rows are added ahead of it.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import NamedTuple
+
+from fastapi import HTTPException
+from sqlalchemy import and_, false, or_, true
+
+
+class SortKey(NamedTuple):
+    """One ORDER BY term. Descending keys sort NULLs last, ascending keys NULLs first."""
+    column: object
+    descending: bool = False
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and set(value) == {"dt"} and isinstance(value["dt"], str):
+        return datetime.fromisoformat(value["dt"])
+    if value is None or isinstance(value, (str, int, float)) and not isinstance(value, bool):
+        return value
+    raise ValueError("unsupported cursor value")
+
+
+def encode_cursor(sort: str, values) -> str:
+    """Token for the page following a row whose sort key values are `values`."""
+    payload = {"s": sort or "", "v": [_encode_value(v) for v in values]}
+    raw = json.dumps(payload, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def value_types(keys) -> list:
+    """Python type of each sort key's values (from its column type), for decode_cursor()."""
+    types = []
+    for key in keys:
+        try:
+            types.append(key.column.type.python_type)
+        except NotImplementedError:  # untyped expression: any cursor value
+            types.append(object)
+    return types
+
+
+def _matches(value, expected) -> bool:
+    if value is None or expected is object:
+        return True
+    if expected is float:
+        return isinstance(value, (int, float))  # JSON writes 2.0 as 2.0, but a key can compute an int 0
+    return isinstance(value, expected)
+
+
+def decode_cursor(token: str, sort: str, types) -> list:
+    """Sort key values from a cursor token, one per entry of `types` (each value is of that type or None);
+    400 if it is malformed, forged or for another sort.
+
+    Values are only ever str, int, float, None or datetime, so a forged token
+    can't smuggle other types into a bind parameter or a comparison.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        payload = json.loads(raw)
+        values = [_decode_value(v) for v in payload["v"]]
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    if payload.get("s") != (sort or ""):
+        raise HTTPException(status_code=400, detail="Cursor does not match this sort order")
+    if len(values) != len(types) or not all(map(_matches, values, types)):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return values
+
+
+def order_by(keys):
+    """ORDER BY clauses for the given sort keys."""
+    return [
+        key.column.desc().nullslast() if key.descending else key.column.asc().nullsfirst()
+        for key in keys
+    ]
+
+
+def _equal(column, value):
+    return column.is_(None) if value is None else column == value
+
+
+def _after(key: SortKey, value):
+    if key.descending:
+        return false() if value is None else or_(key.column < value, key.column.is_(None))
+    return key.column.is_not(None) if value is None else key.column > value
+
+
+def after(keys, values):
+    """WHERE clause selecting rows that sort strictly after the given key values."""
+    clauses = []
+    for i, (key, value) in enumerate(zip(keys, values)):
+        prefix = [_equal(k.column, v) for k, v in zip(keys[:i], values[:i])]
+        clauses.append(and_(true(), *prefix, _after(key, value)))
+    return or_(*clauses)
@@ -0,0 +1,247 @@
+"""In-process response cache for read endpoints, with ETag / If-None-Match support.
+
+Entries are keyed on the request path plus the endpoint's validated
+parameters, so parameter order, omitted defaults and spellings like lat=40
+vs lat=40.0 share an entry. Entries hold the serialized JSON body. Concurrent
+misses on the same key are coalesced into one computation (coalesce.py),
+which opens its own database session instead of borrowing the first caller's
+request-scoped one, so it survives that caller going away. Every write
+endpoint calls invalidate() after commit, which bumps the data version and
+drops all entries. With several
+uvicorn workers a write only invalidates its own worker, so the TTL bounds
+how long the others can serve stale data.
+
+Settings (env): RESPONSE_CACHE_SIZE (entries, default 512; 0 disables),
+RESPONSE_CACHE_TTL (seconds, default 30).
+"""
+import contextlib
+import functools
+import hashlib
+import inspect
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from fastapi import Request, Response
+from fastapi import params as params_module
+from pydantic import TypeAdapter
+from starlette.concurrency import run_in_threadpool
+
+import coalesce
+import instrumentation
+
+# Response headers worth replaying from a cached entry.
+_KEPT_HEADERS = ("x-next-cursor",)
+
+
+class ResponseCache:
+    """Thread-safe LRU of (etag, body, headers) with a TTL and a data version."""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == self.version and entry[1] > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, version: int, value) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            if version != self.version:
+                return  # a write landed while this response was being computed
+            self._entries[key] = (version, time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else None,
+                "not_modified": self.not_modified,
+                "evictions": self.evictions,
+            }
+
+
+cache = ResponseCache(
+    max_entries=int(os.environ.get("RESPONSE_CACHE_SIZE", "512")),
+    ttl_seconds=float(os.environ.get("RESPONSE_CACHE_TTL", "30")),
+)
+
+
+def invalidate() -> None:
+    """Call after committing any write that changes what read endpoints return."""
+    cache.invalidate()
+
+
+class Trusted:
+    """An endpoint result already shaped like its response model: JSON-ready dicts (or a list of
+    them) built from DB rows selected as exactly the model's fields. serialize() dumps it as is."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+
+_PLAIN = TypeAdapter(Any)
+
+
+def serialize(adapter: TypeAdapter, result) -> bytes:
+    """JSON body for result: ORM objects and dicts are validated into the response model first,
+    Trusted results skip that (hydrating and validating models costs more than the query)."""
+    with instrumentation.serializing():
+        if isinstance(result, Trusted):
+            return _PLAIN.dump_json(result.value)
+        return adapter.dump_json(adapter.validate_python(result, from_attributes=True))
+
+
+@functools.lru_cache(maxsize=None)
+def _adapter(response_model) -> TypeAdapter:
+    return TypeAdapter(response_model)
+
+
+def json_response(response_model, result) -> Response:
+    """Response for an uncached endpoint, serialized as cached() does (FastAPI would validate a
+    Trusted result's dicts against response_model again)."""
+    return Response(content=serialize(_adapter(response_model), result), media_type="application/json")
+
+
+def _hashable(value):
+    return tuple(value) if isinstance(value, list) else value
+
+
+def _cache_key(request: Request, kwargs: dict, names):
+    return (request.url.path, tuple((name, _hashable(kwargs.get(name))) for name in names))
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [part.strip() for part in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+def _respond(request: Request, etag: str, body: bytes, headers: dict) -> Response:
+    headers = {**headers, "ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, etag):
+        cache.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def cached(response_model):
+    """Decorator for GET endpoints: serve cached JSON, answer If-None-Match with 304.
+
+    The endpoint keeps its signature (a request/response parameter is added for
+    FastAPI if it doesn't declare one) and its return value is serialized with
+    response_model, exactly once per cache miss; concurrent identical misses on
+    an async endpoint share that one call (coalesce.SingleFlight). That call gets
+    fresh sessions from the endpoint's generator dependencies (get_read_db,
+    get_db), closed when it finishes, not the sessions of the request that
+    started it.
+    """
+    adapter = _adapter(response_model)
+
+    def decorate(endpoint):
+        signature = inspect.signature(endpoint)
+        params = list(signature.parameters.values())
+        takes_request = "request" in signature.parameters
+        takes_response = "response" in signature.parameters
+        # The parameters that select the result: everything but injected dependencies and request/response
+        key_names = sorted(
+            p.name for p in params
+            if p.name not in ("request", "response") and not isinstance(p.default, params_module.Depends)
+        )
+        # Session dependencies, re-entered by a shared computation for its own lifetime
+        sessions = {
+            p.name: contextlib.asynccontextmanager(p.default.dependency)
+            for p in params
+            if isinstance(p.default, params_module.Depends) and inspect.isasyncgenfunction(p.default.dependency)
+        }
+        extra = []
+        if not takes_request:
+            extra.append(inspect.Parameter("request", inspect.Parameter.KEYWORD_ONLY, annotation=Request))
+        if not takes_response:
+            extra.append(inspect.Parameter("response", inspect.Parameter.KEYWORD_ONLY, annotation=Response))
+
+        def split(kwargs):
+            request = kwargs["request"] if takes_request else kwargs.pop("request")
+            response = kwargs["response"] if takes_response else kwargs.pop("response")
+            return request, response
+
+        def store(response, version, key, result):
+            body = serialize(adapter, result)
+            etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+            headers = {name: response.headers[name] for name in _KEPT_HEADERS if name in response.headers}
+            entry = (etag, body, headers)
+            cache.put(key, version, entry)
+            return entry
+
+        if inspect.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def wrapper(**kwargs):
+                request, response = split(kwargs)
+                key = _cache_key(request, kwargs, key_names)
+                hit = cache.get(key)
+                if hit is not None:
+                    return _respond(request, *hit)
+                version = cache.version
+
+                async def compute():
+                    async with contextlib.AsyncExitStack() as stack:
+                        own = {name: await stack.enter_async_context(session()) for name, session in sessions.items()}
+                        result = await endpoint(**{**kwargs, **own})
+                        # serialized before the sessions close: it may still load attributes
+                        return await run_in_threadpool(store, response, version, key, result)
+
+                entry = await coalesce.flights.do((key, version), compute)
+                return _respond(request, *entry)
+        else:
+            @functools.wraps(endpoint)
+            def wrapper(**kwargs):
+                request, response = split(kwargs)
+                key = _cache_key(request, kwargs, key_names)
+                hit = cache.get(key)
+                if hit is not None:
+                    return _respond(request, *hit)
+                version = cache.version
+                return _respond(request, *store(response, version, key, endpoint(**kwargs)))
+
+        wrapper.__signature__ = signature.replace(parameters=params + extra)
+        return wrapper
+
+    return decorate
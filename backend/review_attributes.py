@@ -0,0 +1,97 @@
+"""Structured review attributes from the Dart rating form (style, sauce, doneness, ...).
+
+The importer used to flatten these into WingReview.comment as "key: value"
+lines; they are columns now. Creates call complete() so a review whose
+attributes only appear in its comment still gets them, edits call rederive()
+so attributes read from a comment follow it when it changes, and backfill.py
+registers the same converters for rows written before the columns existed.
+A field the client sent is never overridden by the comment, and a null it
+sent stays null.
+"""
+import re
+from typing import Optional
+
+# Review columns holding form attributes (heat predates them and has its own column).
+ATTRIBUTES = ("style", "presentation", "count_wing", "count_drum", "cooking_style", "size", "cost", "sauce", "doneness")
+# Attributes averaged per location in location_stats (filters: min_<name>, max_cost).
+SCORED = ("presentation", "size", "sauce", "doneness", "cost")
+
+_LINE = re.compile(r"(?m)^[ \t]*([A-Za-z_]+)[ \t]*:[ \t]*(.*?)[ \t]*$")
+
+
+def normalize_style(value: Optional[str]) -> Optional[str]:
+    """"Buffalo " -> "buffalo"; blank -> None (style filters compare normalized values)."""
+    if value is None:
+        return None
+    return value.strip().lower() or None
+
+
+def parse_cost(value: str) -> Optional[float]:
+    # The form's default is "0.00", which means no price was entered
+    return float(value) or None
+
+
+def parse_entered(value: str) -> Optional[int]:
+    # Likewise the form's default 0 for presentation and the piece counts
+    return int(value) or None
+
+
+# Attributes whose 0 is the form's "not entered", whether typed or in a comment
+ZERO_IS_UNSET = ("presentation", "count_wing", "count_drum", "cost")
+
+CONVERTERS = {
+    "heat": int,
+    "style": normalize_style,
+    "presentation": parse_entered,
+    "count_wing": parse_entered,
+    "count_drum": parse_entered,
+    "cooking_style": int,
+    "size": int,
+    "cost": parse_cost,
+    "sauce": int,
+    "doneness": int,
+}
+
+
+def parse_comment(comment: Optional[str]) -> dict:
+    """Attribute values found in "key: value" comment lines (one pass; unknown keys ignored)."""
+    found = {}
+    if not comment:
+        return found
+    for key, raw in _LINE.findall(comment):
+        convert = CONVERTERS.get(key.lower())
+        if convert is None or raw in ("", "None", "null") or key.lower() in found:
+            continue
+        try:
+            value = convert(raw)
+        except ValueError:
+            continue
+        if value is not None:
+            found[key.lower()] = value
+    return found
+
+
+def _normalize(review) -> None:
+    for name in ZERO_IS_UNSET:
+        if getattr(review, name) == 0:
+            setattr(review, name, None)
+    review.style = normalize_style(review.style)
+
+
+def complete(review, given) -> None:
+    """New review: fill the attributes (and heat) not in `given` (the payload's fields_set) from its comment."""
+    for name, value in parse_comment(review.comment).items():
+        if name not in given:
+            setattr(review, name, value)
+    _normalize(review)
+
+
+def rederive(review, old_comment: Optional[str], given) -> None:
+    """Edited review: if the comment changed, attributes not in `given` that matched the old comment
+    take the new comment's values (None when the line is gone); other values are kept."""
+    if "comment" in given and review.comment != old_comment:
+        old, new = parse_comment(old_comment), parse_comment(review.comment)
+        for name in CONVERTERS:
+            if name not in given and getattr(review, name) == old.get(name):
+                setattr(review, name, new.get(name))
+    _normalize(review)
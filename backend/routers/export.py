@@ -0,0 +1,116 @@
+"""Streaming dataset exports: /export/reviews and /export/locations as NDJSON or CSV.
+
+Rows are read in id order from one read-only connection with yield_per, so
+the export runs in constant memory however large the table is. Each batch is
+encoded into a single chunk. Starlette iterates the sync generator in the
+threadpool, so a long export does not hold up the event loop.
+
+Incremental pulls: pass after_id (the last id already received) and/or since
+(reviews: created_at, locations: last_review_at from location_stats).
+"""
+import csv
+import io
+import os
+from datetime import datetime
+from typing import Any
+
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter
+from sqlalchemy import func, select
+
+import models
+from database import read_engine
+
+router = APIRouter()
+
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", "1000"))
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+_JSON = TypeAdapter(Any)
+
+
+def _ndjson_chunks(columns, batches):
+    for rows in batches:
+        yield b"".join(_JSON.dump_json(dict(zip(columns, row))) + b"\n" for row in rows)
+
+
+def _csv_value(value):
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _csv_chunks(columns, batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows([_csv_value(v) for v in row] for row in rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()  # header only: nothing matched
+
+
+def _stream(stmt, name: str, fmt: str) -> StreamingResponse:
+    columns = list(stmt.selected_columns.keys())
+
+    def batches():
+        with read_engine.connect() as conn:
+            result = conn.execution_options(yield_per=EXPORT_BATCH_SIZE).execute(stmt)
+            for partition in result.partitions():
+                yield partition
+
+    encode = _csv_chunks if fmt == "csv" else _ndjson_chunks
+    return StreamingResponse(
+        encode(columns, batches()),
+        media_type=MEDIA_TYPES[fmt],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{fmt}"'},
+    )
+
+
+@router.get("/reviews")
+def export_reviews(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    since: datetime = Query(None, description="Only reviews created at or after this time"),
+    after_id: int = Query(None, description="Only reviews with a greater id (the last id of a previous export)"),
+):
+    """Every wing_reviews column, in id order."""
+    table = models.WingReview.__table__
+    stmt = select(*table.c).order_by(table.c.id)
+    if since is not None:
+        stmt = stmt.where(table.c.created_at >= since)
+    if after_id is not None:
+        stmt = stmt.where(table.c.id > after_id)
+    return _stream(stmt, "reviews", format)
+
+
+@router.get("/locations")
+def export_locations(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    since: datetime = Query(None, description="Only locations reviewed at or after this time"),
+    after_id: int = Query(None, description="Only locations with a greater id (the last id of a previous export)"),
+):
+    """wing_locations columns with review_count, average_rating and last_review_at, in id order."""
+    loc = models.WingLocation.__table__
+    stats = models.LocationStats.__table__
+    average = stats.c.rating_sum / func.nullif(stats.c.rating_count, 0)
+    stmt = (
+        select(
+            *loc.c,
+            func.coalesce(stats.c.review_count, 0).label("review_count"),
+            average.label("average_rating"),
+            stats.c.last_review_at,
+        )
+        .select_from(loc.outerjoin(stats, stats.c.location_id == loc.c.id))
+        .order_by(loc.c.id)
+    )
+    if since is not None:
+        stmt = stmt.where(stats.c.last_review_at >= since)
+    if after_id is not None:
+        stmt = stmt.where(loc.c.id > after_id)
+    return _stream(stmt, "locations", format)
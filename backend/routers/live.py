@@ -0,0 +1,105 @@
+"""Live change feed (events are described in live.py): /live/ws (WebSocket) and /live/events (SSE).
+
+Both take the initial subscription as query parameters: locations=1,2,3,
+bbox=min_lon,min_lat,max_lon,max_lat (repeatable) and all=true. A WebSocket
+client can replace its subscription at any time by sending
+{"locations": [...], "bbox": [...], "all": false}. Each event is one text
+frame, or one SSE "data:" line; SSE also sends a keep-alive comment every
+LIVE_HEARTBEAT seconds. EventSource reconnects on its own, but events sent
+while it was disconnected are lost, so clients should refetch after a
+reconnect.
+"""
+import asyncio
+import json
+
+from fastapi import APIRouter, HTTPException, Query, WebSocket, WebSocketDisconnect, WebSocketException, status
+from fastapi.responses import StreamingResponse
+
+import live
+
+router = APIRouter()
+
+
+def _subscription(locations, bbox, everything):
+    try:
+        return live.parse_subscription(locations, bbox, everything)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+
+
+@router.get("/events")
+async def live_events(
+    locations: str = Query(None, description="Comma-separated location ids to follow"),
+    bbox: list[str] = Query(None, description="min_lon,min_lat,max_lon,max_lat; repeat for several boxes"),
+    all: bool = Query(False, description="Every event"),
+):
+    """Server-sent events stream of the subscribed changes."""
+    subscription = _subscription(locations, bbox, all)
+    try:
+        subscriber = live.hub.subscribe(**subscription)
+    except live.HubFull:
+        raise HTTPException(status_code=503, detail="Too many live subscribers", headers={"Retry-After": "30"})
+
+    async def stream():
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscriber.queue.get(), live.HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield b": keep-alive\n\n"
+                    continue
+                yield f"data: {message}\n\n".encode()
+        finally:
+            live.hub.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/ws")
+async def live_socket(
+    websocket: WebSocket,
+    locations: str = Query(None),
+    bbox: list[str] = Query(None),
+    all: bool = Query(False),
+):
+    try:
+        subscription = live.parse_subscription(locations, bbox, all)
+    except ValueError as exc:
+        raise WebSocketException(code=status.WS_1008_POLICY_VIOLATION, reason=str(exc))
+    try:
+        subscriber = live.hub.subscribe(**subscription)
+    except live.HubFull:
+        raise WebSocketException(code=status.WS_1013_TRY_AGAIN_LATER, reason="Too many live subscribers")
+    await websocket.accept()
+
+    async def send():
+        while True:
+            await websocket.send_text(await subscriber.queue.get())
+
+    sender = asyncio.create_task(send())
+    try:
+        while True:
+            text = await websocket.receive_text()
+            try:
+                try:
+                    message = json.loads(text)
+                except ValueError:
+                    raise ValueError("messages must be JSON")
+                if not isinstance(message, dict):
+                    raise ValueError("a subscription must be a JSON object")
+                live.hub.update(
+                    subscriber,
+                    **live.parse_subscription(message.get("locations"), message.get("bbox"), message.get("all")),
+                )
+            except ValueError as exc:
+                await websocket.send_text(json.dumps({"type": "error", "detail": str(exc)}))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        live.hub.unsubscribe(subscriber)
@@ -1,74 +1,193 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import os
+from datetime import date, datetime, timedelta
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import func, or_
+from sqlalchemy import String, func, or_, type_coerce
+import bulk_import
+import clusters
+import coalesce
+import duplicates
+import geo
+import live
+import location_stats
 import models, schemas
-from database import SessionLocal
+import names
+import pagination
+import response_cache
+import review_attributes
+import search_index
+import similarity
+from database import get_db, get_read_db, run_db
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# sort_by values that order by a per-location average (highest first)
+AVERAGE_SORTS = ("rating", "heat", "presentation", "size", "sauce", "doneness")
+
 
 def _attach_rating_stats(locations, db: Session):
-    """Attach average_rating, average_heat and review_count to each location."""
+    """Attach average_<field> for each stat field, review_count and last_review_at from location_stats."""
     if not locations:
         return
-    stats = db.query(
-        models.WingReview.location_id,
-        func.avg(models.WingReview.rating).label("avg_rating"),
-        func.avg(models.WingReview.heat).label("avg_heat"),
-        func.count(models.WingReview.id).label("review_count"),
-    ).group_by(models.WingReview.location_id).all()
-    stats_dict = {
-        loc_id: (float(avg_r) if avg_r is not None else None, float(avg_h) if avg_h is not None else None, int(cnt))
-        for loc_id, avg_r, avg_h, cnt in stats
-    }
+    stats = location_stats.stats_for(db, [loc.id for loc in locations])
     for loc in locations:
-        avg_rating, avg_heat, review_count = stats_dict.get(loc.id, (None, None, 0))
-        loc.average_rating = avg_rating
-        loc.average_heat = avg_heat
-        loc.review_count = review_count
+        _apply_stats(loc, stats.get(loc.id))
 
 
-def _attach_last_review_at(locations, db: Session):
-    """Attach last_review_at (max created_at) to each location for sorting."""
-    if not locations:
-        return
-    rows = db.query(
-        models.WingReview.location_id,
-        func.max(models.WingReview.created_at).label("last_review_at"),
-    ).group_by(models.WingReview.location_id).all()
-    last_at = {loc_id: last for loc_id, last in rows}
-    for loc in locations:
-        loc.last_review_at = last_at.get(loc.id)
+def _apply_stats(loc, row):
+    """Set the _attach_rating_stats fields on one location from its LocationStats row (or None)."""
+    for field in location_stats.STAT_FIELDS:
+        setattr(loc, f"average_{field}", location_stats.row_average(row, field))
+    loc.review_count = row.review_count if row else 0
+    loc.last_review_at = row.last_review_at if row else None
+
+
+# include= values for /by-id/{id}
+LOCATION_INCLUDES = ("stats", "reviews")
+# Most ids accepted by one batch-get request
+BATCH_GET_MAX = int(os.environ.get("BATCH_GET_MAX", "1000"))
+
+
+@router.get("/by-id/{location_id}", response_model=schemas.LocationDetail)
+@response_cache.cached(schemas.LocationDetail)
+async def read_location(
+    location_id: int,
+    include: str = Query("stats", description="Comma-separated: stats (averages; the default), reviews"),
+    reviews_limit: int = Query(500, ge=1, le=5000, description="Most reviews returned with include=reviews, newest first"),
+    db: Session = Depends(get_read_db),
+):
+    """Get a single location by ID. Declared before list so path is matched first.
 
+    include=reviews,stats returns the location, its stats and its reviews from one joined
+    query, so the detail page needs a single round trip.
+    """
+    includes = {part.strip() for part in include.split(",") if part.strip()}
+    if not includes <= set(LOCATION_INCLUDES):
+        raise HTTPException(status_code=422, detail=f"include accepts {', '.join(LOCATION_INCLUDES)}")
+    return await run_db(db, _read_location, location_id, includes, reviews_limit)
 
-@router.get("/by-id/{location_id}", response_model=schemas.WingLocation)
-def read_location(location_id: int, db: Session = Depends(get_db)):
-    """Get a single location by ID. Declared before list so path is matched first."""
-    location = db.query(models.WingLocation).filter(models.WingLocation.id == location_id).first()
-    if not location:
+
+def _read_location(db: Session, location_id: int, includes=frozenset({"stats"}), reviews_limit: int = 500):
+    entities = [models.WingLocation]
+    if "stats" in includes:
+        entities.append(models.LocationStats)
+    if "reviews" in includes:
+        entities.append(models.WingReview)
+    query = db.query(*entities).filter(models.WingLocation.id == location_id)
+    if "stats" in includes:
+        query = query.outerjoin(models.LocationStats, models.LocationStats.location_id == models.WingLocation.id)
+    if "reviews" in includes:
+        query = (
+            query.outerjoin(models.WingReview, models.WingReview.location_id == models.WingLocation.id)
+            .order_by(models.WingReview.created_at.desc(), models.WingReview.id.desc())
+            .limit(reviews_limit)
+        )
+    else:
+        query = query.limit(1)
+    rows = [row if len(entities) > 1 else (row,) for row in query.all()]
+    if not rows:
         raise HTTPException(status_code=404, detail="Location not found")
-    _attach_rating_stats([location], db)
-    return location
+    location = rows[0][0]
+    if "stats" in includes:
+        _apply_stats(location, rows[0][1])
+    detail = schemas.WingLocation.model_validate(location).model_dump()
+    # A dict rather than the ORM object, whose reviews relationship would lazy-load every review
+    detail["reviews"] = [row[-1] for row in rows if row[-1] is not None] if "reviews" in includes else None
+    return detail
+
+
+@router.get("/by-id/{location_id}/similar", response_model=list[schemas.SimilarLocation])
+@response_cache.cached(list[schemas.SimilarLocation])
+async def read_similar_locations(
+    location_id: int,
+    k: int = Query(10, ge=1, le=100, description="Number of locations to return"),
+    metric: str = Query("cosine", pattern="^(cosine|euclidean)$", description="cosine, or weighted euclidean distance"),
+    max_distance: float = Query(None, gt=0, description="Only locations within this many miles of this one"),
+    min_reviews: int = Query(1, ge=1, description="Minimum reviews a similar location must have"),
+    db: Session = Depends(get_read_db),
+):
+    """Locations whose review profile (averages and cooking styles) is closest to this one's, best first."""
+    return await run_db(db, _read_similar_locations, location_id, k, metric, max_distance, min_reviews)
+
+
+def _read_similar_locations(db: Session, location_id: int, k, metric, max_distance, min_reviews):
+    neighbours = similarity.index.query(db, location_id, k, metric, max_distance, min_reviews)
+    if neighbours is None:
+        if not db.query(models.WingLocation.id).filter(models.WingLocation.id == location_id).first():
+            raise HTTPException(status_code=404, detail="Location not found")
+        return []  # no reviews yet, so nothing to compare
+    found = {loc.id: loc for loc in _batch_get_locations(db, [loc_id for loc_id, _, _ in neighbours])}
+    locations = []
+    for loc_id, score, distance in neighbours:
+        loc = found.get(loc_id)
+        if loc is None:
+            continue  # deleted since the index last refreshed
+        loc.similarity = score
+        loc.distance = distance
+        locations.append(loc)
+    return locations
+
+
+@router.post("/batch-get", response_model=list[schemas.WingLocation])
+async def batch_get_locations(body: schemas.BatchGetRequest, db: Session = Depends(get_read_db)):
+    """Locations with their stats for a list of ids, in request order (unknown ids skipped), in one query."""
+    if len(body.ids) > BATCH_GET_MAX:
+        raise HTTPException(status_code=422, detail=f"At most {BATCH_GET_MAX} ids per request")
+    return await run_db(db, _batch_get_locations, body.ids)
+
+
+def _batch_get_locations(db: Session, ids):
+    if not ids:
+        return []
+    rows = (
+        db.query(models.WingLocation, models.LocationStats)
+        .outerjoin(models.LocationStats, models.LocationStats.location_id == models.WingLocation.id)
+        .filter(models.WingLocation.id.in_(set(ids)))
+        .all()
+    )
+    found = {}
+    for loc, stats in rows:
+        _apply_stats(loc, stats)
+        found[loc.id] = loc
+    return [found[i] for i in dict.fromkeys(ids) if i in found]
 
 
 @router.get("/", response_model=list[schemas.WingLocation])
-def read_locations(
+@response_cache.cached(list[schemas.WingLocation])
+async def read_locations(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=5000, description="Page size"),
     search: str = Query(None, description="Search by location name or address"),
     ids: str = Query(None, description="Comma-separated location IDs to fetch (e.g. ids=1,2,3)"),
     lat: float = Query(None, description="Latitude for distance search"),
     lon: float = Query(None, description="Longitude for distance search"),
     max_distance: float = Query(20, description="Max distance in miles when lat/lon provided"),
     min_rating: float = Query(None, description="Minimum average rating (0-10)"),
-    sort_by: str = Query(None, description="Sort: rating, name, reviews, heat, date_created, recently_reviewed"),
-    db: Session = Depends(get_db)
+    min_sauce: float = Query(None, description="Minimum average sauce score"),
+    min_doneness: float = Query(None, description="Minimum average doneness score"),
+    min_presentation: float = Query(None, description="Minimum average presentation score"),
+    min_size: float = Query(None, description="Minimum average size score"),
+    max_cost: float = Query(None, description="Maximum average price"),
+    style: str = Query(None, description="Only locations with a review of this wing style (e.g. buffalo)"),
+    sort_by: str = Query(None, description="Sort: rating, name, reviews, heat, presentation, size, sauce, doneness, date_created, recently_reviewed, distance, relevance (default with search)"),
+    cursor: str = Query(None, description="next_cursor from the previous page (X-Next-Cursor header); replaces skip"),
+    db: Session = Depends(get_read_db)
+):
+    heavy = (lat is not None and lon is not None) or min_rating is not None
+    async with coalesce.heavy.slot(heavy):
+        return await run_db(
+            db, _read_locations, response,
+            skip=skip, limit=limit, search=search, ids=ids, lat=lat, lon=lon, max_distance=max_distance,
+            min_rating=min_rating, min_sauce=min_sauce, min_doneness=min_doneness, min_presentation=min_presentation,
+            min_size=min_size, max_cost=max_cost, style=style, sort_by=sort_by, cursor=cursor,
+        )
+
+
+def _read_locations(
+    db: Session, response: Response, *, skip, limit, search, ids, lat, lon, max_distance, min_rating,
+    min_sauce, min_doneness, min_presentation, min_size, max_cost, style, sort_by, cursor
 ):
     query = db.query(models.WingLocation)
 
@@ -77,7 +196,13 @@ def read_locations(
         if id_list:
             query = query.filter(models.WingLocation.id.in_(id_list))
 
-    if search:
+    relevance = None
+    fts_query = search_index.match_query(search) if search else None
+    if fts_query and search_index.available(db):
+        hits = search_index.matches(search_index.locations_fts, fts_query)
+        query = query.join(hits, models.WingLocation.id == hits.c.rowid)
+        relevance = hits.c.rank
+    elif search:
         term = f"%{search.strip()}%"
         query = query.filter(
             or_(
@@ -86,152 +211,262 @@ def read_locations(
             )
         )
 
+    # Average filters read the one-row-per-location stats table, never the reviews
+    averages = []
     if min_rating is not None and min_rating > 0:
-        subq = (
-            db.query(models.WingReview.location_id)
-            .group_by(models.WingReview.location_id)
-            .having(func.avg(models.WingReview.rating) >= min_rating)
-            .subquery()
-        )
-        query = query.filter(models.WingLocation.id.in_(subq))
+        averages.append(location_stats.average("rating") >= min_rating)
+    for field, minimum in (
+        ("sauce", min_sauce), ("doneness", min_doneness), ("presentation", min_presentation), ("size", min_size)
+    ):
+        if minimum is not None:
+            averages.append(location_stats.average(field) >= minimum)
+    if max_cost is not None:
+        averages.append(location_stats.average("cost") <= max_cost)
+    if averages:
+        rated = db.query(models.LocationStats.location_id).filter(*averages)
+        query = query.filter(models.WingLocation.id.in_(rated))
+
+    style = review_attributes.normalize_style(style)
+    if style:
+        # Covered by ix_wing_reviews_style_location
+        styled = db.query(models.WingReview.location_id).filter(models.WingReview.style == style)
+        query = query.filter(models.WingLocation.id.in_(styled))
 
     if lat is not None and lon is not None:
-        distance_expr = 3958.8 * func.acos(
-            func.cos(func.radians(lat)) *
-            func.cos(func.radians(models.WingLocation.lat)) *
-            func.cos(func.radians(models.WingLocation.lon) - func.radians(lon)) +
-            func.sin(func.radians(lat)) *
-            func.sin(func.radians(models.WingLocation.lat))
-        )
-        query = query.add_columns(distance_expr.label("distance"))
-        # Fetch enough candidates to filter by max_distance then sort (no limit yet)
-        results = query.order_by("distance").limit(500).all()
+        query = _near(query, lat, lon, max_distance)
         locations = []
-        for loc, dist in results:
-            d = float(dist) if dist is not None else None
-            if d is None:
-                continue  # skip locations with no coordinates
+        for loc in query.all():
+            d = geo.haversine_miles(lat, lon, loc.lat, loc.lon)
             if max_distance is not None and d > max_distance:
                 continue
             loc.distance = d
             locations.append(loc)
         _attach_rating_stats(locations, db)
-        if sort_by == "recently_reviewed":
-            _attach_last_review_at(locations, db)
-            locations.sort(
-                key=lambda loc: (
-                    loc.last_review_at is None,
-                    -(loc.last_review_at.timestamp() if loc.last_review_at else 0),
-                    (loc.name or "").lower(),
-                )
-            )
-        elif sort_by == "rating":
-            locations.sort(key=lambda loc: (-(loc.average_rating or 0), loc.name or ""))
-        elif sort_by == "heat":
-            locations.sort(key=lambda loc: (-(loc.average_heat or 0), loc.name or ""))
-        elif sort_by == "reviews":
-            locations.sort(key=lambda loc: (-(loc.review_count or 0), loc.name or ""))
-        elif sort_by == "date_created":
-            locations.sort(key=lambda loc: (-loc.id, loc.name or ""))
+        sort_key, key_types = _distance_sort_key(sort_by)
+        locations.sort(key=sort_key)
+        if cursor:
+            last = tuple(pagination.decode_cursor(cursor, sort_by, key_types))
+            try:
+                page = [loc for loc in locations if sort_key(loc) > last][:limit + 1]
+            except TypeError:  # a forged null where the key never has one
+                raise HTTPException(status_code=400, detail="Invalid cursor")
         else:
-            locations.sort(key=lambda loc: (loc.name or "").lower())
-        return locations[skip : skip + limit]
+            page = locations[skip : skip + limit + 1]
+        if len(page) > limit:
+            page = page[:limit]
+            response.headers["X-Next-Cursor"] = pagination.encode_cursor(sort_by, sort_key(page[-1]))
+        return page
+
+    keys = _db_sort_keys(sort_by, relevance)
+    if sort_by in ("recently_reviewed", "reviews") + AVERAGE_SORTS:
+        query = query.outerjoin(models.LocationStats, models.WingLocation.id == models.LocationStats.location_id)
+    query = query.add_columns(*[key.column for key in keys]).order_by(*pagination.order_by(keys))
+    if cursor:
+        last = pagination.decode_cursor(cursor, sort_by, pagination.value_types(keys))
+        query = query.filter(pagination.after(keys, last))
+    else:
+        query = query.offset(skip)
+    rows = query.limit(limit + 1).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = pagination.encode_cursor(sort_by, rows[-1][1:])
+    locations = [row[0] for row in rows]
+    _attach_rating_stats(locations, db)
+    return locations
 
+
+def _near(query, lat: float, lon: float, max_distance):
+    """Bounding-box prefilter on the (lat, lon) index; callers check exact distance on the survivors."""
+    query = query.filter(models.WingLocation.lat.is_not(None), models.WingLocation.lon.is_not(None))
+    if max_distance is None:
+        return query
+    min_lat, max_lat, lon_ranges = geo.bounding_box(lat, lon, max_distance)
+    return query.filter(
+        models.WingLocation.lat.between(min_lat, max_lat),
+        or_(*[models.WingLocation.lon.between(lo, hi) for lo, hi in lon_ranges]),
+    )
+
+
+def _db_sort_keys(sort_by: str, relevance=None):
+    """Keyset sort keys for the SQL path; every order ends with id so keys are unique."""
+    loc = models.WingLocation
+    stats = models.LocationStats
+    if relevance is not None and sort_by in (None, "relevance"):
+        return [pagination.SortKey(relevance), pagination.SortKey(loc.id)]
+    if sort_by == "date_created":
+        return [pagination.SortKey(loc.id, descending=True)]
+    by_name = [pagination.SortKey(loc.name), pagination.SortKey(loc.id)]
     if sort_by == "recently_reviewed":
-        last_review_subq = (
-            db.query(
-                models.WingReview.location_id,
-                func.max(models.WingReview.created_at).label("last_review_at"),
-            )
-            .group_by(models.WingReview.location_id)
-            .subquery()
-        )
-        query = query.outerjoin(last_review_subq, models.WingLocation.id == last_review_subq.c.location_id)
-        query = query.order_by(last_review_subq.c.last_review_at.desc().nullslast(), models.WingLocation.name)
-    elif sort_by == "date_created":
-        query = query.order_by(models.WingLocation.id.desc())
-    elif sort_by == "rating":
-        stats = (
-            db.query(
-                models.WingReview.location_id,
-                func.avg(models.WingReview.rating).label("avg_rating"),
-                func.avg(models.WingReview.heat).label("avg_heat"),
-                func.count(models.WingReview.id).label("review_count"),
-            )
-            .group_by(models.WingReview.location_id)
-            .subquery()
-        )
-        query = query.outerjoin(stats, models.WingLocation.id == stats.c.location_id)
-        query = query.order_by(stats.c.avg_rating.desc().nullslast(), models.WingLocation.name)
-    elif sort_by == "heat":
-        stats = (
-            db.query(
-                models.WingReview.location_id,
-                func.avg(models.WingReview.rating).label("avg_rating"),
-                func.avg(models.WingReview.heat).label("avg_heat"),
-                func.count(models.WingReview.id).label("review_count"),
-            )
-            .group_by(models.WingReview.location_id)
-            .subquery()
-        )
-        query = query.outerjoin(stats, models.WingLocation.id == stats.c.location_id)
-        query = query.order_by(stats.c.avg_heat.desc().nullslast(), models.WingLocation.name)
-    elif sort_by == "reviews":
-        stats = (
-            db.query(
-                models.WingReview.location_id,
-                func.avg(models.WingReview.rating).label("avg_rating"),
-                func.avg(models.WingReview.heat).label("avg_heat"),
-                func.count(models.WingReview.id).label("review_count"),
-            )
-            .group_by(models.WingReview.location_id)
-            .subquery()
-        )
-        query = query.outerjoin(stats, models.WingLocation.id == stats.c.location_id)
-        query = query.order_by(stats.c.review_count.desc().nullslast(), models.WingLocation.name)
+        # Compare the stored text as-is: older rows mix "T" and " " datetime separators
+        return [pagination.SortKey(type_coerce(stats.last_review_at, String), descending=True)] + by_name
+    if sort_by in AVERAGE_SORTS:
+        return [pagination.SortKey(location_stats.average(sort_by), descending=True)] + by_name
+    if sort_by == "reviews":
+        return [pagination.SortKey(stats.review_count, descending=True)] + by_name
+    # default (e.g. name or unrecognized): by name
+    return by_name
+
+
+def _distance_sort_key(sort_by: str):
+    """(key, value types): Python sort key for the distance path; tuples end with id and are JSON-safe for cursors."""
+    if sort_by == "recently_reviewed":
+        return lambda loc: (
+            int(loc.last_review_at is None),
+            -(loc.last_review_at.timestamp() if loc.last_review_at else 0),
+            (loc.name or "").lower(),
+            loc.id,
+        ), (int, float, str, int)
+    if sort_by in AVERAGE_SORTS:
+        return lambda loc: (-(getattr(loc, f"average_{sort_by}") or 0), loc.name or "", loc.id), (float, str, int)
+    if sort_by == "reviews":
+        return lambda loc: (-(loc.review_count or 0), loc.name or "", loc.id), (int, str, int)
+    if sort_by == "date_created":
+        return lambda loc: (-loc.id,), (int,)
+    if sort_by == "distance":
+        return lambda loc: (loc.distance, loc.id), (float, int)
+    return lambda loc: ((loc.name or "").lower(), loc.id), (str, int)
+
+
+# Leaderboard windows: days back from (and including) the end date; None = all time
+LEADERBOARD_WINDOWS = {"7d": 7, "30d": 30, "year": 365, "all": None}
+
+
+@router.get("/leaderboard", response_model=list[schemas.LeaderboardEntry])
+@response_cache.cached(list[schemas.LeaderboardEntry])
+async def read_leaderboard(
+    window: str = Query("30d", pattern="^(7d|30d|year|all)$", description="Reviews created in the last 7d, 30d, year, or all"),
+    by: str = Query("rating", pattern="^(rating|heat)$", description="Field to rank by"),
+    min_reviews: int = Query(1, ge=1, description="Minimum rated reviews in the window"),
+    prior_weight: float = Query(5, ge=0, description="Pseudo-reviews at the window's overall average added to every location"),
+    lat: float = Query(None, description="Latitude to restrict to a radius"),
+    lon: float = Query(None, description="Longitude to restrict to a radius"),
+    max_distance: float = Query(20, description="Radius in miles when lat/lon provided"),
+    as_of: date = Query(None, description="Last day of the window (default today, UTC)"),
+    skip: int = 0,
+    limit: int = Query(20, ge=1, le=500),
+    db: Session = Depends(get_read_db),
+):
+    """Best locations over a time window by Bayesian average.
+
+    score = (prior_weight * window_mean + sum) / (prior_weight + count), so a
+    location with a couple of 10s ranks below one with many 9s. Windows are
+    summed from the per-day buckets in location_daily_stats.
+    """
+    return await run_db(
+        db, _read_leaderboard, window, by, min_reviews, prior_weight, lat, lon, max_distance, as_of, skip, limit
+    )
+
+
+def _read_leaderboard(db: Session, window, by, min_reviews, prior_weight, lat, lon, max_distance, as_of, skip, limit):
+    days = LEADERBOARD_WINDOWS[window]
+    until = as_of or datetime.utcnow().date()
+    since = until - timedelta(days=days - 1) if days else None
+    totals = location_stats.window_totals(since, until if since else None)
+    total_sum = totals.c[f"{by}_sum"]
+    total_count = totals.c[f"{by}_count"]
+
+    mean = db.query(func.sum(total_sum) / func.nullif(func.sum(total_count), 0)).select_from(totals).scalar()
+    if mean is None:
+        return []
+    score = (prior_weight * mean + total_sum) / (prior_weight + total_count)
+    query = (
+        db.query(models.WingLocation, score, total_sum, total_count, totals.c.review_count)
+        .join(totals, models.WingLocation.id == totals.c.location_id)
+        .filter(total_count >= min_reviews)
+        .order_by(score.desc(), total_count.desc(), models.WingLocation.id)
+    )
+    if lat is not None and lon is not None:
+        ranked = []
+        for row in _near(query, lat, lon, max_distance):
+            distance = geo.haversine_miles(lat, lon, row[0].lat, row[0].lon)
+            if max_distance is None or distance <= max_distance:
+                row[0].distance = distance
+                ranked.append(row)
+        rows = ranked[skip : skip + limit]
     else:
-        # default (e.g. name or unrecognized): by name
-        query = query.order_by(models.WingLocation.name)
+        rows = query.offset(skip).limit(limit).all()
 
-    locations = query.offset(skip).limit(limit).all()
+    locations = []
+    for rank, (loc, loc_score, loc_sum, loc_count, review_count) in enumerate(rows, start=skip + 1):
+        loc.rank = rank
+        loc.score = loc_score
+        loc.window_average = loc_sum / loc_count if loc_count else None
+        loc.window_review_count = review_count
+        locations.append(loc)
     _attach_rating_stats(locations, db)
     return locations
 
 
-def _normalize_name(name: str) -> str:
-    """Normalize for duplicate detection: lowercase, strip, collapse spaces."""
-    if not name:
-        return ""
-    return " ".join(name.lower().strip().split())
+@router.get("/clusters", response_model=list[schemas.LocationCluster])
+@response_cache.cached(list[schemas.LocationCluster])
+async def read_clusters(
+    bbox: str = Query(..., description="min_lon,min_lat,max_lon,max_lat (min_lon > max_lon crosses the antimeridian)"),
+    zoom: int = Query(..., ge=0, le=22, description="Map zoom level"),
+    db: Session = Depends(get_read_db),
+):
+    """Locations in a map viewport, grouped into grid clusters with count, centroid and average rating.
+
+    Above zoom clusters.MAX_CLUSTER_ZOOM every location is its own entry.
+    """
+    try:
+        min_lon, min_lat, max_lon, max_lat = geo.parse_bbox(bbox)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc))
+    return await run_db(db, clusters.index.query, min_lon, min_lat, max_lon, max_lat, zoom)
 
 
 @router.get("/duplicates", response_model=list[schemas.LocationDuplicateGroup])
-def read_duplicate_groups(db: Session = Depends(get_db)):
-    """Find locations that share the same normalized name (potential duplicates)."""
-    locations = db.query(models.WingLocation).all()
-    _attach_rating_stats(locations, db)
-    by_key = {}
-    for loc in locations:
-        key = _normalize_name(loc.name)
-        if not key:
-            continue
-        entry = schemas.LocationDuplicateEntry(
-            id=loc.id,
-            name=loc.name,
-            address=loc.address,
-            review_count=getattr(loc, "review_count", 0) or 0,
-        )
-        by_key.setdefault(key, []).append(entry)
-    return [
-        schemas.LocationDuplicateGroup(normalized_name=key, locations=group)
-        for key, group in sorted(by_key.items())
-        if len(group) > 1
-    ]
+@response_cache.cached(list[schemas.LocationDuplicateGroup])
+async def read_duplicate_groups(
+    min_score: float = Query(0.8, ge=0, le=1, description="Minimum name-similarity score (1 = same normalized name)"),
+    skip: int = 0,
+    limit: int = 100,
+    db: Session = Depends(get_read_db),
+):
+    """Find groups of locations with similar names or nearby coordinates (potential duplicates)."""
+    async with coalesce.heavy.slot():
+        return await run_db(db, _read_duplicate_groups, min_score, skip, limit)
+
+
+def _read_duplicate_groups(db: Session, min_score: float, skip: int, limit: int):
+    groups = duplicates.index.groups(db, min_score)[skip : skip + limit]
+    ids = [loc_id for _, members in groups for loc_id in members]
+    if not ids:
+        return []
+    locations = {loc.id: loc for loc in db.query(models.WingLocation).filter(models.WingLocation.id.in_(ids))}
+    stats = location_stats.stats_for(db, ids)
+    result = []
+    for score, members in groups:
+        entries = [
+            schemas.LocationDuplicateEntry(
+                id=loc_id,
+                name=locations[loc_id].name,
+                address=locations[loc_id].address,
+                review_count=stats[loc_id].review_count if loc_id in stats else 0,
+            )
+            for loc_id in members
+            if loc_id in locations
+        ]
+        if len(entries) > 1:
+            result.append(schemas.LocationDuplicateGroup(
+                normalized_name=names.normalize_name(entries[0].name),
+                score=round(score, 3),
+                locations=entries,
+            ))
+    return result
 
 
 @router.post("/merge", response_model=schemas.LocationMergeResponse)
-def merge_locations(body: schemas.LocationMergeRequest, db: Session = Depends(get_db)):
+async def merge_locations(body: schemas.LocationMergeRequest, db: Session = Depends(get_db)):
     """Move all reviews from one location into another, then delete the source location."""
+    result = await run_db(db, _merge_locations, body)
+    duplicates.index.discard(body.from_id)
+    response_cache.invalidate()
+    live.locations_merged(body.from_id, body.into_id, result.reviews_moved)
+    return result
+
+
+def _merge_locations(db: Session, body: schemas.LocationMergeRequest):
     if body.from_id == body.into_id:
         raise HTTPException(status_code=400, detail="from_id and into_id must be different")
     source = db.query(models.WingLocation).filter(models.WingLocation.id == body.from_id).first()
@@ -244,15 +479,36 @@ def merge_locations(body: schemas.LocationMergeRequest, db: Session = Depends(ge
         {"location_id": body.into_id},
         synchronize_session=False,
     )
+    location_stats.refresh_locations(db, [body.from_id, body.into_id])
     db.delete(source)
     db.commit()
     return schemas.LocationMergeResponse(reviews_moved=count, location_deleted=body.from_id)
 
 
+@router.post("/bulk", response_model=schemas.BulkImportResponse)
+async def bulk_create_locations(request: Request, db: Session = Depends(get_db)):
+    """Match or create many locations from an NDJSON or JSON array body of WingLocationCreate rows.
+
+    ids[i] is the existing location with the same normalized name, or the newly created one.
+    """
+    result = await bulk_import.import_rows(request, db, bulk_import.insert_location_batch)
+    response_cache.invalidate()
+    live.bulk("locations", result.locations_created)
+    return result
+
+
 @router.post("/", response_model=schemas.WingLocation)
-def create_location(location: schemas.WingLocationCreate, db: Session = Depends(get_db)):
-    db_location = models.WingLocation(**location.dict())
+async def create_location(location: schemas.WingLocationCreate, db: Session = Depends(get_db)):
+    db_location = await run_db(db, _create_location, location)
+    response_cache.invalidate()
+    live.location_created(db_location.id)
+    return db_location
+
+
+def _create_location(db: Session, location: schemas.WingLocationCreate):
+    db_location = models.WingLocation(**location.model_dump())
     db.add(db_location)
     db.commit()
     db.refresh(db_location)
-    return db_location 
\ No newline at end of file
+    return db_location
+ 
\ No newline at end of file
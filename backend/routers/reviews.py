@@ -1,113 +1,200 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+import auto_assign
+import bulk_import
+import live
+import location_stats
 import models, schemas
-from database import SessionLocal
+import pagination
+import response_cache
+import review_attributes
+import search_index
+import write_queue
+from database import get_db, get_read_db, run_db
+from routers.locations import BATCH_GET_MAX
 
 router = APIRouter()
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# wing_reviews columns in the response; the list endpoints select only these plus the location's name/address
+REVIEW_FIELDS = tuple(schemas.WingReview.model_fields)
+
+
+def _review_select():
+    """Core select of the WingReviewWithLocation fields, location joined; no ORM objects are hydrated."""
+    review = models.WingReview.__table__
+    location = models.WingLocation.__table__
+    return select(
+        *[review.c[name] for name in REVIEW_FIELDS],
+        location.c.name.label("location_name"),
+        location.c.address.label("location_address"),
+    ).select_from(review.outerjoin(location, location.c.id == review.c.location_id))
+
+
+def _trusted(rows):
+    """_review_select() rows as response dicts, serialized without building or validating models."""
+    return response_cache.Trusted([row._asdict() for row in rows])
+
 
 @router.get("/", response_model=list[schemas.WingReviewWithLocation])
-def read_reviews(
+@response_cache.cached(list[schemas.WingReviewWithLocation])
+async def read_reviews(
+    response: Response,
     skip: int = 0,
-    limit: int = 100,
+    limit: int = Query(100, ge=1, le=5000, description="Page size"),
     location_id: int = Query(None, description="Filter by location"),
-    db: Session = Depends(get_db),
+    cursor: str = Query(None, description="next_cursor from the previous page (X-Next-Cursor header); replaces skip"),
+    db: Session = Depends(get_read_db),
 ):
-    query = db.query(models.WingReview)
+    return await run_db(db, _read_reviews, response, skip, limit, location_id, cursor)
+
+
+def _read_reviews(db: Session, response: Response, skip, limit, location_id, cursor):
+    review = models.WingReview.__table__
+    stmt = _review_select()
     if location_id is not None:
-        query = query.filter(models.WingReview.location_id == location_id)
-    reviews = query.offset(skip).limit(limit).all()
-    if not reviews:
+        stmt = stmt.where(review.c.location_id == location_id)
+    stmt = stmt.order_by(review.c.id)
+    if cursor:
+        (last_id,) = pagination.decode_cursor(cursor, "id", [int])
+        stmt = stmt.where(review.c.id > last_id)
+    else:
+        stmt = stmt.offset(skip)
+    rows = db.execute(stmt.limit(limit + 1)).all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        response.headers["X-Next-Cursor"] = pagination.encode_cursor("id", [rows[-1].id])
+    return _trusted(rows)
+
+
+@router.get("/search", response_model=list[schemas.WingReviewWithLocation])
+async def search_reviews(
+    q: str = Query(..., description="Words to find in review comments (prefix match, ranked)"),
+    location_id: int = Query(None, description="Filter by location"),
+    limit: int = 50,
+    db: Session = Depends(get_read_db),
+):
+    return await run_db(db, _search_reviews, q, location_id, limit)
+
+
+def _search_reviews(db: Session, q, location_id, limit):
+    fts_query = search_index.match_query(q)
+    if not fts_query:
         return []
-    loc_ids = {r.location_id for r in reviews}
-    locations = db.query(models.WingLocation).filter(models.WingLocation.id.in_(loc_ids)).all()
-    loc_map = {loc.id: {"name": loc.name, "address": loc.address} for loc in locations}
-    return [
-        {
-            "id": r.id,
-            "location_id": r.location_id,
-            "rating": r.rating,
-            "comment": r.comment,
-            "heat": getattr(r, "heat", None),
-            "created_at": getattr(r, "created_at", None),
-            "lat": getattr(r, "lat", None),
-            "lon": getattr(r, "lon", None),
-            "location_name": loc_map.get(r.location_id, {}).get("name"),
-            "location_address": loc_map.get(r.location_id, {}).get("address"),
-        }
-        for r in reviews
-    ]
+    review = models.WingReview.__table__
+    stmt = _review_select()
+    if search_index.available(db):
+        hits = search_index.matches(search_index.reviews_fts, fts_query)
+        stmt = stmt.join(hits, review.c.id == hits.c.rowid).order_by(hits.c.rank, review.c.id)
+    else:
+        stmt = stmt.where(review.c.comment.ilike(f"%{q.strip()}%")).order_by(review.c.id)
+    if location_id is not None:
+        stmt = stmt.where(review.c.location_id == location_id)
+    rows = db.execute(stmt.limit(limit)).all()
+    return response_cache.json_response(list[schemas.WingReviewWithLocation], _trusted(rows))
+
 
 @router.get("/by-id/{review_id}", response_model=schemas.WingReviewWithLocation)
-def read_review(review_id: int, db: Session = Depends(get_db)):
-    review = db.query(models.WingReview).filter(models.WingReview.id == review_id).first()
-    if not review:
+@response_cache.cached(schemas.WingReviewWithLocation)
+async def read_review(review_id: int, db: Session = Depends(get_read_db)):
+    return await run_db(db, _read_review, review_id)
+
+
+def _read_review(db: Session, review_id: int):
+    row = db.execute(_review_select().where(models.WingReview.__table__.c.id == review_id)).first()
+    if not row:
         raise HTTPException(status_code=404, detail="Review not found")
-    location = db.query(models.WingLocation).filter(models.WingLocation.id == review.location_id).first()
-    return {
-        "id": review.id,
-        "location_id": review.location_id,
-        "rating": review.rating,
-        "comment": review.comment,
-        "heat": getattr(review, "heat", None),
-        "created_at": getattr(review, "created_at", None),
-        "lat": getattr(review, "lat", None),
-        "lon": getattr(review, "lon", None),
-        "location_name": location.name if location else None,
-        "location_address": location.address if location else None,
-    }
+    return response_cache.Trusted(row._asdict())
+
+
+@router.post("/batch-get", response_model=list[schemas.WingReviewWithLocation])
+async def batch_get_reviews(body: schemas.BatchGetRequest, db: Session = Depends(get_read_db)):
+    """Reviews with their location name/address for a list of ids, in request order (unknown ids skipped)."""
+    if len(body.ids) > BATCH_GET_MAX:
+        raise HTTPException(status_code=422, detail=f"At most {BATCH_GET_MAX} ids per request")
+    return await run_db(db, _batch_get_reviews, body.ids)
+
+
+def _batch_get_reviews(db: Session, ids):
+    rows = db.execute(_review_select().where(models.WingReview.__table__.c.id.in_(set(ids)))).all() if ids else []
+    found = {row.id: row for row in rows}
+    reviews = _trusted(found[i] for i in dict.fromkeys(ids) if i in found)
+    return response_cache.json_response(list[schemas.WingReviewWithLocation], reviews)
+
 
 @router.patch("/by-id/{review_id}", response_model=schemas.WingReview)
-def update_review(review_id: int, update: schemas.WingReviewUpdate, db: Session = Depends(get_db)):
+async def update_review(review_id: int, update: schemas.WingReviewUpdate, db: Session = Depends(get_db)):
+    review, previous_location_id = await run_db(db, _update_review, review_id, update)
+    response_cache.invalidate()
+    live.review_changed("updated", review, previous_location_id)
+    return review
+
+
+def _update_review(db: Session, review_id: int, update: schemas.WingReviewUpdate):
     review = db.query(models.WingReview).filter(models.WingReview.id == review_id).first()
     if not review:
         raise HTTPException(status_code=404, detail="Review not found")
-    data = update.dict(exclude_unset=True)
+    data = update.model_dump(exclude_unset=True)
+    previous_location_id = review.location_id
+    previous_comment = review.comment
     if "location_id" in data:
         location = db.query(models.WingLocation).filter(models.WingLocation.id == data["location_id"]).first()
         if not location:
             raise HTTPException(status_code=404, detail="Location not found")
     for key, value in data.items():
         setattr(review, key, value)
+    review_attributes.rederive(review, previous_comment, data.keys())
+    db.flush()
+    location_stats.refresh_locations(db, [previous_location_id, review.location_id])
     db.commit()
     db.refresh(review)
-    return review
+    return review, previous_location_id
 
 
-def _get_or_create_unassigned_location(db: Session) -> models.WingLocation:
-    """Get or create the single 'Unassigned' location for reviews without a known place."""
-    loc = db.query(models.WingLocation).filter(models.WingLocation.name == "Unassigned").first()
-    if loc:
-        return loc
-    loc = models.WingLocation(
-        name="Unassigned",
-        address="To be placed by curator",
-    )
-    db.add(loc)
-    db.commit()
-    db.refresh(loc)
-    return loc
+@router.post("/auto-assign", response_model=schemas.AutoAssignResponse)
+async def auto_assign_reviews(
+    apply: bool = Query(False, description="Move the proposals at or above min_confidence (default: only propose)"),
+    max_distance: float = Query(auto_assign.DEFAULT_MAX_DISTANCE, gt=0, le=5, description="Miles from the review's coordinates"),
+    min_confidence: float = Query(auto_assign.DEFAULT_MIN_CONFIDENCE, ge=0, le=1),
+    limit: int = Query(None, ge=1, description="Examine at most this many Unassigned reviews"),
+    db: Session = Depends(get_db),
+):
+    """Propose (or apply, in one transaction) the nearest known location for each Unassigned review with coordinates."""
+    result = await run_db(db, auto_assign.run, max_distance, min_confidence, apply, limit)
+    if result.applied:
+        response_cache.invalidate()
+        live.bulk("reviews", result.applied)
+    return result
 
 
 @router.post("/", response_model=schemas.WingReview)
-def create_review(review: schemas.WingReviewCreate, db: Session = Depends(get_db)):
-    data = review.dict()
-    location_id = data.get("location_id")
-    if location_id is not None:
-        location = db.query(models.WingLocation).filter(models.WingLocation.id == location_id).first()
-        if not location:
-            raise HTTPException(status_code=404, detail="Location not found")
+async def create_review(review: schemas.WingReviewCreate, db: Session = Depends(get_db)):
+    if write_queue.ENABLED:
+        db_review = await write_queue.writer.submit(review)
     else:
-        location = _get_or_create_unassigned_location(db)
-        data["location_id"] = location.id
-    db_review = models.WingReview(**data)
-    db.add(db_review)
+        db_review = await run_db(db, _create_review, review)
+    response_cache.invalidate()
+    live.review_changed("created", db_review)
+    return db_review
+
+
+def _create_review(db: Session, review: schemas.WingReviewCreate):
+    (result,) = write_queue.insert_reviews(db, [review])
+    if isinstance(result, HTTPException):
+        raise result
     db.commit()
-    db.refresh(db_review)
-    return db_review
\ No newline at end of file
+    return result
+
+
+@router.post("/bulk", response_model=schemas.BulkImportResponse)
+async def bulk_create_reviews(request: Request, db: Session = Depends(get_db)):
+    """Insert many reviews from an NDJSON (application/x-ndjson) or JSON array body.
+
+    Each row is a WingReviewBulkItem; rows with location_name are matched to an
+    existing location by normalized name or create one. Per-row failures are
+    reported in errors without aborting the import.
+    """
+    result = await bulk_import.import_rows(request, db, bulk_import.insert_review_batch)
+    response_cache.invalidate()
+    live.bulk("reviews", result.inserted)
+    return result
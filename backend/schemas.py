@@ -1,5 +1,5 @@
 from datetime import datetime
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional
 
 class WingLocationBase(BaseModel):
@@ -16,9 +16,34 @@ class WingLocation(WingLocationBase):
     distance: Optional[float] = None
     average_rating: Optional[float] = None
     average_heat: Optional[float] = None
+    average_presentation: Optional[float] = None
+    average_size: Optional[float] = None
+    average_sauce: Optional[float] = None
+    average_doneness: Optional[float] = None
+    average_cost: Optional[float] = None
     review_count: Optional[int] = None
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
+
+
+class LeaderboardEntry(WingLocation):
+    rank: int
+    score: float  # Bayesian average of the ranked field over the window
+    window_average: Optional[float] = None  # plain average over the window
+    window_review_count: int
+
+
+class SimilarLocation(WingLocation):
+    similarity: float  # cosine similarity, or 1 / (1 + weighted distance), of the feature vectors
+
+
+class LocationCluster(BaseModel):
+    lat: float  # centroid of the clustered locations
+    lon: float
+    count: int
+    average_rating: Optional[float] = None
+    review_count: int
+    id: Optional[int] = None  # set (with name) when the cluster is a single location
+    name: Optional[str] = None
 
 
 class LocationMergeRequest(BaseModel):
@@ -40,12 +65,22 @@ class LocationDuplicateEntry(BaseModel):
 
 class LocationDuplicateGroup(BaseModel):
     normalized_name: str
+    score: Optional[float] = None  # best pairwise similarity in the group (0-1)
     locations: list[LocationDuplicateEntry]
 
 class WingReviewBase(BaseModel):
     rating: float
     comment: Optional[str] = None
     heat: Optional[int] = None  # 0-10
+    style: Optional[str] = None  # e.g. "buffalo"
+    presentation: Optional[int] = None
+    count_wing: Optional[int] = None
+    count_drum: Optional[int] = None
+    cooking_style: Optional[int] = None
+    size: Optional[int] = None
+    cost: Optional[float] = None  # price paid
+    sauce: Optional[int] = None
+    doneness: Optional[int] = None
 
 class WingReviewCreate(WingReviewBase):
     location_id: Optional[int] = None  # omit to use Unassigned (curator sets later)
@@ -53,11 +88,63 @@ class WingReviewCreate(WingReviewBase):
     lon: Optional[float] = None
 
 
+class WingReviewBulkItem(WingReviewBase):
+    """One row for POST /reviews/bulk: give location_id, or location_name to match/create by name."""
+    location_id: Optional[int] = None
+    location_name: Optional[str] = None
+    location_address: Optional[str] = None
+    location_lat: Optional[float] = None
+    location_lon: Optional[float] = None
+    lat: Optional[float] = None
+    lon: Optional[float] = None
+    created_at: Optional[datetime] = None
+
+
+class BulkRowError(BaseModel):
+    index: int  # 0-based position of the row in the submitted array / NDJSON lines
+    error: str
+
+
+class BulkImportResponse(BaseModel):
+    inserted: int
+    locations_created: int
+    ids: list[Optional[int]]  # per submitted row; None where the row failed
+    errors: list[BulkRowError]
+
+
+class AutoAssignment(BaseModel):
+    review_id: int
+    location_id: int  # proposed location: the nearest within max_distance
+    location_name: str
+    distance: float  # miles from the review's coordinates
+    confidence: float  # 0-1; see auto_assign.py
+    runner_up_id: Optional[int] = None  # next nearest location in range, if any
+    runner_up_distance: Optional[float] = None
+    applied: bool
+
+
+class AutoAssignResponse(BaseModel):
+    examined: int  # Unassigned reviews with coordinates
+    without_coordinates: int  # Unassigned reviews that can't be placed automatically
+    proposed: int
+    applied: int
+    assignments: list[AutoAssignment]  # most confident first
+
+
 class WingReviewUpdate(BaseModel):
     location_id: Optional[int] = None
     rating: Optional[float] = None
     comment: Optional[str] = None
     heat: Optional[int] = None
+    style: Optional[str] = None
+    presentation: Optional[int] = None
+    count_wing: Optional[int] = None
+    count_drum: Optional[int] = None
+    cooking_style: Optional[int] = None
+    size: Optional[int] = None
+    cost: Optional[float] = None
+    sauce: Optional[int] = None
+    doneness: Optional[int] = None
     lat: Optional[float] = None
     lon: Optional[float] = None
 
@@ -68,9 +155,16 @@ class WingReview(WingReviewBase):
     created_at: Optional[datetime] = None
     lat: Optional[float] = None
     lon: Optional[float] = None
-    class Config:
-        orm_mode = True
+    model_config = ConfigDict(from_attributes=True)
 
 class WingReviewWithLocation(WingReview):
     location_name: Optional[str] = None
-    location_address: Optional[str] = None 
\ No newline at end of file
+    location_address: Optional[str] = None
+
+
+class LocationDetail(WingLocation):
+    reviews: Optional[list[WingReview]] = None  # with include=reviews, newest first
+
+
+class BatchGetRequest(BaseModel):
+    ids: list[int] 
\ No newline at end of file
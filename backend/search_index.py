@@ -0,0 +1,69 @@
+"""SQLite FTS5 full-text index over location name/address and review comments.
+
+The FTS tables use external content (no copy of the text) and are kept current
+by triggers on wing_locations and wing_reviews, so every write path -- ORM,
+bulk UPDATE, maintenance scripts -- updates them without extra code. The
+migrations create them (each revision with its own copy of the DDL); _SCHEMA
+is the current definition, which tests/test_migrations.py checks the
+migrated database against. On other databases available() is False and
+callers fall back to ILIKE.
+"""
+import re
+
+from sqlalchemy import Float, Integer, column, literal_column, select, table
+from sqlalchemy.orm import Session
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+locations_fts = table("locations_fts", column("rowid", Integer), column("rank", Float))
+reviews_fts = table("reviews_fts", column("rowid", Integer), column("rank", Float))
+
+_SCHEMA = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS locations_fts USING fts5(
+        name, address, content='wing_locations', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS reviews_fts USING fts5(
+        comment, content='wing_reviews', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    """CREATE TRIGGER IF NOT EXISTS wing_locations_fts_ai AFTER INSERT ON wing_locations BEGIN
+        INSERT INTO locations_fts(rowid, name, address) VALUES (new.id, new.name, new.address);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS wing_locations_fts_ad AFTER DELETE ON wing_locations BEGIN
+        INSERT INTO locations_fts(locations_fts, rowid, name, address) VALUES ('delete', old.id, old.name, old.address);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS wing_locations_fts_au AFTER UPDATE OF name, address ON wing_locations BEGIN
+        INSERT INTO locations_fts(locations_fts, rowid, name, address) VALUES ('delete', old.id, old.name, old.address);
+        INSERT INTO locations_fts(rowid, name, address) VALUES (new.id, new.name, new.address);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS wing_reviews_fts_ai AFTER INSERT ON wing_reviews BEGIN
+        INSERT INTO reviews_fts(rowid, comment) VALUES (new.id, new.comment);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS wing_reviews_fts_ad AFTER DELETE ON wing_reviews BEGIN
+        INSERT INTO reviews_fts(reviews_fts, rowid, comment) VALUES ('delete', old.id, old.comment);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS wing_reviews_fts_au AFTER UPDATE OF comment ON wing_reviews BEGIN
+        INSERT INTO reviews_fts(reviews_fts, rowid, comment) VALUES ('delete', old.id, old.comment);
+        INSERT INTO reviews_fts(rowid, comment) VALUES (new.id, new.comment);
+    END""",
+]
+
+
+def available(db: Session) -> bool:
+    return db.get_bind().dialect.name == "sqlite"
+
+
+def match_query(search: str) -> str | None:
+    """FTS5 query requiring every typed word as a prefix, e.g. 'tandy top' -> '"tandy"* "top"*'."""
+    tokens = _TOKEN.findall(search or "")
+    if not tokens:
+        return None
+    return " ".join(f'"{token}"*' for token in tokens)
+
+
+def matches(fts, query: str):
+    """Subquery of (rowid, rank) for rows matching an FTS5 query; lower rank is more relevant."""
+    return (
+        select(fts.c.rowid.label("rowid"), fts.c.rank.label("rank"))
+        .where(literal_column(fts.name).op("MATCH")(query))
+        .subquery()
+    )
@@ -0,0 +1,181 @@
+"""Similar locations ("places like this one"): nearest neighbours over per-location feature vectors.
+
+Every location with reviews is one row of a NumPy matrix. Its features are
+the location_stats averages (rating, heat, presentation, size, sauce,
+doneness, cost) and the share of its reviews in each cooking style. Columns
+are standardized (z-scores; a missing average counts as the mean) and scaled
+by sqrt(FEATURE_WEIGHTS), so a query is one vectorized pass over the matrix:
+cosine similarity, or a weighted Euclidean distance turned into 1 / (1 + d).
+The optional radius uses a vectorized haversine on the same rows.
+
+The matrix is built on first use. After that, rows are refreshed
+incrementally. location_stats records which locations each transaction
+touched, and on commit those ids are marked dirty here. The next query
+re-reads just those rows. Writes handled by other workers show up after a
+full rebuild every SIMILAR_INDEX_TTL seconds (default 600). Column means and
+standard deviations are only recomputed on full rebuilds.
+"""
+import os
+import threading
+import time
+import warnings
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+import geo
+import location_stats
+import models
+
+COOKING_STYLES = (0, 1, 2, 3, 4)  # the rating form's cooking_style choices
+FEATURES = location_stats.STAT_FIELDS + tuple(f"cooking_style_{c}" for c in COOKING_STYLES)
+FEATURE_WEIGHTS = {"rating": 2.0, "heat": 1.5, "cost": 0.5}  # others 1
+METRICS = ("cosine", "euclidean")
+INDEX_TTL = float(os.environ.get("SIMILAR_INDEX_TTL", "600"))
+
+
+def _rows(db: Session, location_ids=None):
+    """{location_id: (raw feature list with NaN for missing, review_count, lat, lon)} for reviewed locations."""
+    stats = models.LocationStats
+    loc = models.WingLocation
+    query = db.query(stats, loc.lat, loc.lon).join(loc, loc.id == stats.location_id).filter(stats.review_count > 0)
+    styles = db.query(
+        models.WingReview.location_id, models.WingReview.cooking_style, func.count()
+    ).filter(models.WingReview.cooking_style.in_(COOKING_STYLES))
+    if location_ids is not None:
+        query = query.filter(stats.location_id.in_(location_ids))
+        styles = styles.filter(models.WingReview.location_id.in_(location_ids))
+    shares = {}
+    for location_id, style, count in styles.group_by(models.WingReview.location_id, models.WingReview.cooking_style):
+        shares.setdefault(location_id, {})[style] = count
+    result = {}
+    for row, lat, lon in query:
+        averages = [location_stats.row_average(row, field) for field in location_stats.STAT_FIELDS]
+        counts = shares.get(row.location_id, {})
+        styled = sum(counts.values())
+        cooking = [counts.get(c, 0) / styled if styled else None for c in COOKING_STYLES]
+        raw = [np.nan if v is None else v for v in averages + cooking]
+        result[row.location_id] = (raw, row.review_count, np.nan if lat is None else lat, np.nan if lon is None else lon)
+    return result
+
+
+class SimilarityIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dirty = set()
+        self._built_at = None
+        self._ids = np.empty(0, dtype=np.int64)
+        self._row = {}  # location_id -> row index
+        self._raw = np.empty((0, len(FEATURES)))
+        self._x = np.empty((0, len(FEATURES)))  # standardized, weighted
+        self._norms = np.empty(0)
+        self._counts = np.empty(0, dtype=np.int64)  # review_count; 0 marks a removed row
+        self._lat = np.empty(0)
+        self._lon = np.empty(0)
+        self._mean = np.zeros(len(FEATURES))
+        self._scale = np.ones(len(FEATURES))
+        self._weights = np.sqrt([FEATURE_WEIGHTS.get(f, 1.0) for f in FEATURES])
+
+    def mark_dirty(self, location_ids) -> None:
+        with self._lock:
+            self._dirty.update(location_ids)
+
+    def _standardize(self, raw):
+        x = (raw - self._mean) / self._scale
+        return np.nan_to_num(x, nan=0.0) * self._weights
+
+    def _build(self, db: Session) -> None:
+        rows = _rows(db)
+        self._ids = np.fromiter(rows, dtype=np.int64, count=len(rows))
+        self._row = {location_id: i for i, location_id in enumerate(rows)}
+        self._raw = np.array([r[0] for r in rows.values()], dtype=float).reshape(len(rows), len(FEATURES))
+        self._counts = np.array([r[1] for r in rows.values()], dtype=np.int64)
+        self._lat = np.array([r[2] for r in rows.values()], dtype=float)
+        self._lon = np.array([r[3] for r in rows.values()], dtype=float)
+        if len(rows):
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore", RuntimeWarning)  # all-NaN columns (no reviews score that field)
+                self._mean = np.nan_to_num(np.nanmean(self._raw, axis=0))
+                std = np.nan_to_num(np.nanstd(self._raw, axis=0))
+            self._scale = np.where(std > 0, std, 1.0)
+        self._x = self._standardize(self._raw)
+        self._norms = np.linalg.norm(self._x, axis=1)
+        self._built_at = time.monotonic()
+
+    def _refresh(self, db: Session, location_ids) -> None:
+        """Re-read the given locations' rows; new ones are appended, vanished ones zeroed out."""
+        rows = _rows(db, location_ids)
+        new = [location_id for location_id in rows if location_id not in self._row]
+        if new:
+            start = len(self._ids)
+            self._ids = np.concatenate([self._ids, np.array(new, dtype=np.int64)])
+            for offset, location_id in enumerate(new):
+                self._row[location_id] = start + offset
+            grow = len(new)
+            self._raw = np.vstack([self._raw, np.full((grow, len(FEATURES)), np.nan)])
+            self._x = np.vstack([self._x, np.zeros((grow, len(FEATURES)))])
+            self._norms = np.concatenate([self._norms, np.zeros(grow)])
+            self._counts = np.concatenate([self._counts, np.zeros(grow, dtype=np.int64)])
+            self._lat = np.concatenate([self._lat, np.full(grow, np.nan)])
+            self._lon = np.concatenate([self._lon, np.full(grow, np.nan)])
+        for location_id in location_ids:
+            i = self._row.get(location_id)
+            if i is None:
+                continue
+            if location_id not in rows:  # no reviews left, or the location was merged away
+                self._counts[i] = 0
+                continue
+            raw, count, lat, lon = rows[location_id]
+            self._raw[i] = raw
+            self._x[i] = self._standardize(self._raw[i])
+            self._norms[i] = np.linalg.norm(self._x[i])
+            self._counts[i] = count
+            self._lat[i], self._lon[i] = lat, lon
+
+    def _sync(self, db: Session) -> None:
+        if self._built_at is None or time.monotonic() - self._built_at > INDEX_TTL:
+            self._dirty.clear()
+            self._build(db)
+        elif self._dirty:
+            dirty, self._dirty = self._dirty, set()
+            self._refresh(db, dirty)
+
+    def query(self, db: Session, location_id: int, k: int = 10, metric: str = "cosine",
+              max_distance: float = None, min_reviews: int = 1):
+        """[(location_id, similarity, distance_miles or None)] best first; None when the location has no vector."""
+        with self._lock:
+            self._sync(db)
+            i = self._row.get(location_id)
+            if i is None or self._counts[i] == 0:
+                return None
+            dots = self._x @ self._x[i]
+            if metric == "cosine":
+                with np.errstate(all="ignore"):
+                    scores = dots / (self._norms * self._norms[i])
+                scores = np.nan_to_num(scores, nan=0.0)
+            else:  # |a - b|^2 = |a|^2 + |b|^2 - 2 a.b, reusing the norms
+                squared = self._norms ** 2 + self._norms[i] ** 2 - 2 * dots
+                scores = 1.0 / (1.0 + np.sqrt(np.maximum(squared, 0.0)))
+            candidates = self._counts >= min_reviews
+            candidates[i] = False
+            distances = None
+            if max_distance is not None and not np.isnan(self._lat[i]):
+                with np.errstate(invalid="ignore"):
+                    distances = geo.haversine_miles_array(self._lat[i], self._lon[i], self._lat, self._lon)
+                    candidates &= distances <= max_distance
+            elif max_distance is not None:
+                return []  # no coordinates to measure a radius from
+            pool = np.flatnonzero(candidates)
+            if len(pool) > k:
+                pool = pool[np.argpartition(-scores[pool], k - 1)[:k]]
+            pool = pool[np.lexsort((self._ids[pool], -scores[pool]))]
+            return [
+                (int(self._ids[j]), float(scores[j]), None if distances is None else float(distances[j]))
+                for j in pool
+            ]
+
+
+index = SimilarityIndex()
+
+location_stats.on_commit(index.mark_dirty)
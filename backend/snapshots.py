@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""Online, compressed snapshots of the SQLite database, with retention and restore.
+
+A snapshot copies the live database with SQLite's online backup API. Under
+WAL (the app's default) the copy is one step: a single read transaction,
+which writers never wait on, so review writes carry on during the copy.
+Stepping would not help here, because every write from another connection
+restarts an incremental backup. In rollback-journal mode a reader does block
+commits, so the copy goes SNAPSHOT_PAGES pages per step, pausing
+SNAPSHOT_STEP_PAUSE seconds between steps. If writes restart it more than
+SNAPSHOT_MAX_RESTARTS times, it finishes in one step.
+
+The copy is checked with PRAGMA quick_check, gzipped to
+SNAPSHOT_DIR/wings-<UTC timestamp>.db.gz, and all but the newest SNAPSHOT_KEEP
+snapshots are deleted.
+
+In-process schedule: with SNAPSHOT_INTERVAL_HOURS set, the app takes a
+snapshot when the newest one is older than that. A lock file in SNAPSHOT_DIR
+makes sure only one uvicorn worker takes it.
+
+Run from backend dir (or: docker compose exec backend python3 snapshots.py ...):
+   python3 snapshots.py create
+   python3 snapshots.py list
+   python3 snapshots.py verify snapshots/wings-20260118T030000Z.db.gz
+   python3 snapshots.py restore snapshots/wings-20260118T030000Z.db.gz --yes
+
+restore verifies the snapshot, then writes it into DB_PATH with the backup
+API, so open connections see the restored data and never a half-copied file.
+Restart the app afterwards so the response caches start empty.
+
+Settings (env): SNAPSHOT_DIR (default: "snapshots" next to the database),
+SNAPSHOT_KEEP (7), SNAPSHOT_INTERVAL_HOURS (unset/0 = no schedule),
+SNAPSHOT_PAGES (1024), SNAPSHOT_STEP_PAUSE (0.005), SNAPSHOT_MAX_RESTARTS (20).
+"""
+import argparse
+import fcntl
+import gzip
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+import database
+
+KEEP = int(os.environ.get("SNAPSHOT_KEEP", "7"))
+INTERVAL_HOURS = float(os.environ.get("SNAPSHOT_INTERVAL_HOURS") or 0)
+PAGES_PER_STEP = int(os.environ.get("SNAPSHOT_PAGES", "1024"))
+STEP_PAUSE = float(os.environ.get("SNAPSHOT_STEP_PAUSE", "0.005"))
+MAX_RESTARTS = int(os.environ.get("SNAPSHOT_MAX_RESTARTS", "20"))
+PREFIX, SUFFIX = "wings-", ".db.gz"
+
+log = logging.getLogger(__name__)
+
+
+def database_path() -> str:
+    if not database._is_sqlite:
+        raise SystemExit("Snapshots are for SQLite; back up other databases with their own tools")
+    return os.path.abspath(database.engine.url.database)
+
+
+def snapshot_dir() -> str:
+    return os.environ.get("SNAPSHOT_DIR") or os.path.join(os.path.dirname(database_path()), "snapshots")
+
+
+class _Restarted(Exception):
+    pass
+
+
+def _copy(source: sqlite3.Connection, target: sqlite3.Connection, pages: int, pause: float) -> None:
+    restarts = 0
+    last_remaining = None
+
+    def progress(status, remaining, total):
+        nonlocal restarts, last_remaining
+        if last_remaining is not None and remaining > last_remaining:
+            restarts += 1
+            if restarts > MAX_RESTARTS:
+                raise _Restarted
+        last_remaining = remaining
+        if pause:
+            time.sleep(pause)  # let writers in between steps
+
+    if source.execute("PRAGMA journal_mode").fetchone()[0] == "wal":
+        pages = -1
+    try:
+        source.backup(target, pages=pages, progress=progress)
+    except _Restarted:
+        source.backup(target, pages=-1)
+
+
+def _connect_source(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, timeout=30)
+    busy = database.SQLITE_PRAGMAS.get("busy_timeout")
+    if busy:
+        conn.execute(f"PRAGMA busy_timeout={busy}")
+    return conn
+
+
+def _check(conn: sqlite3.Connection, full: bool = False) -> None:
+    result = conn.execute(f"PRAGMA {'integrity_check' if full else 'quick_check'}").fetchall()
+    if result != [("ok",)]:
+        raise RuntimeError("; ".join(row[0] for row in result[:5]))
+
+
+def create(directory: str = None, pages: int = PAGES_PER_STEP, pause: float = STEP_PAUSE, keep: int = KEEP) -> str:
+    """Take a snapshot; returns its path."""
+    directory = directory or snapshot_dir()
+    os.makedirs(directory, exist_ok=True)
+    started = time.perf_counter()
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+    final = os.path.join(directory, f"{PREFIX}{stamp}{SUFFIX}")
+    with tempfile.TemporaryDirectory(dir=directory) as tmp:
+        copy_path = os.path.join(tmp, "copy.db")
+        source = _connect_source(database_path())
+        target = sqlite3.connect(copy_path)
+        try:
+            _copy(source, target, pages, pause)
+            target.execute("PRAGMA journal_mode=DELETE")  # self-contained file, no -wal needed
+            _check(target)
+        finally:
+            target.close()
+            source.close()
+        partial = os.path.join(tmp, "copy.db.gz")
+        with open(copy_path, "rb") as src, gzip.open(partial, "wb", compresslevel=6) as dst:
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        os.replace(partial, final)
+    prune(directory, keep)
+    log.info("snapshot %s (%.1f MB) in %.1fs", final, os.path.getsize(final) / 1e6, time.perf_counter() - started)
+    return final
+
+
+def list_snapshots(directory: str = None) -> list:
+    """Snapshot paths, oldest first (the timestamped names sort chronologically)."""
+    directory = directory or snapshot_dir()
+    if not os.path.isdir(directory):
+        return []
+    names = sorted(n for n in os.listdir(directory) if n.startswith(PREFIX) and n.endswith(SUFFIX))
+    return [os.path.join(directory, n) for n in names]
+
+
+def prune(directory: str = None, keep: int = KEEP) -> list:
+    """Delete all but the newest `keep` snapshots; returns the deleted paths."""
+    if keep <= 0:
+        return []
+    old = list_snapshots(directory)[:-keep]
+    for path in old:
+        os.remove(path)
+    return old
+
+
+def _unpacked(path: str, tmp: str) -> str:
+    copy_path = os.path.join(tmp, "restore.db")
+    with gzip.open(path, "rb") as src, open(copy_path, "wb") as dst:
+        shutil.copyfileobj(src, dst, 1024 * 1024)
+    return copy_path
+
+
+def verify(path: str) -> dict:
+    """Full integrity check of a snapshot; returns its row counts and schema revision."""
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(_unpacked(path, tmp))
+        try:
+            _check(conn, full=True)
+            info = {
+                table: conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ("wing_locations", "wing_reviews")
+            }
+            revision = conn.execute("SELECT version_num FROM alembic_version").fetchone()
+            info["alembic_revision"] = revision[0] if revision else None
+        finally:
+            conn.close()
+    return info
+
+
+def restore(path: str) -> dict:
+    """Verify a snapshot, then copy it over DB_PATH through the backup API (one write transaction).
+
+    Returns verify()'s summary of the restored snapshot."""
+    info = verify(path)
+    with tempfile.TemporaryDirectory() as tmp:
+        source = sqlite3.connect(_unpacked(path, tmp))
+        target = sqlite3.connect(database_path(), timeout=60)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
+    log.info("restored %s into %s: %s", path, database_path(), info)
+    return info
+
+
+# --- in-process schedule ----------------------------------------------------
+
+def _due(directory: str, interval_seconds: float) -> bool:
+    existing = list_snapshots(directory)
+    return not existing or time.time() - os.path.getmtime(existing[-1]) >= interval_seconds
+
+
+def run_if_due(interval_seconds: float) -> bool:
+    """Take a snapshot if the newest is older than the interval and no other worker is taking one."""
+    directory = snapshot_dir()
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, ".lock"), "w") as lock:
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        if not _due(directory, interval_seconds):
+            return False
+        create(directory)
+        return True
+
+
+class Scheduler:
+    """Daemon thread calling run_if_due every few minutes while the app runs."""
+
+    def __init__(self, interval_hours: float = INTERVAL_HOURS):
+        self.interval_seconds = interval_hours * 3600
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self) -> None:
+        if self.interval_seconds <= 0 or not database._is_sqlite or self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="snapshots", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        poll = min(self.interval_seconds, 300)
+        while not self._stop.wait(poll):
+            try:
+                run_if_due(self.interval_seconds)
+            except Exception:  # keep the schedule alive; the next poll retries
+                log.exception("scheduled snapshot failed")
+
+
+scheduler = Scheduler()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Online snapshots of the SQLite database.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    create_cmd = sub.add_parser("create", help="take a snapshot now")
+    create_cmd.add_argument("--dir", help="snapshot directory (default SNAPSHOT_DIR)")
+    create_cmd.add_argument("--keep", type=int, default=KEEP, help="snapshots to keep (0 = keep all)")
+    create_cmd.add_argument("--pages", type=int, default=PAGES_PER_STEP, help="pages per backup step (-1 = one step)")
+    list_cmd = sub.add_parser("list", help="list snapshots")
+    list_cmd.add_argument("--dir")
+    verify_cmd = sub.add_parser("verify", help="integrity-check a snapshot")
+    verify_cmd.add_argument("path")
+    restore_cmd = sub.add_parser("restore", help="replace the database with a snapshot")
+    restore_cmd.add_argument("path")
+    restore_cmd.add_argument("--yes", action="store_true", help="confirm overwriting DB_PATH")
+    args = parser.parse_args(argv)
+
+    if args.command == "create":
+        started = time.perf_counter()
+        path = create(args.dir, pages=args.pages, keep=args.keep)
+        print(f"Snapshot {path} ({os.path.getsize(path) / 1e6:.1f} MB) in {time.perf_counter() - started:.1f}s")
+    elif args.command == "list":
+        for path in list_snapshots(args.dir):
+            print(f"{path}  {os.path.getsize(path) / 1e6:.1f} MB")
+    elif args.command == "verify":
+        try:
+            print(f"{args.path}: ok {verify(args.path)}")
+        except (RuntimeError, sqlite3.DatabaseError, OSError, EOFError) as exc:
+            raise SystemExit(f"{args.path}: FAILED {exc}")
+    elif args.command == "restore":
+        if not args.yes:
+            parser.error(f"restore overwrites {database_path()}; pass --yes to confirm")
+        print(f"Restored {args.path} into {database_path()}: {restore(args.path)}")
+
+
+if __name__ == "__main__":
+    main()
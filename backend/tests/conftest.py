@@ -0,0 +1,41 @@
+"""Test setup: a fresh, migrated SQLite database per session; no network, no fixtures data.
+
+Run from the backend dir:
+   pip install -r requirements-dev.txt
+   python -m pytest -q tests
+
+DB_PATH must be set before any backend module is imported (database.py reads it at import).
+"""
+import os
+import sys
+import tempfile
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+os.environ["DB_PATH"] = os.path.join(tempfile.mkdtemp(prefix="wings-tests-"), "wings.db")
+os.environ.pop("DATABASE_URL", None)
+os.environ.pop("SNAPSHOT_INTERVAL_HOURS", None)
+
+import pytest
+from alembic import command
+from alembic.config import Config
+
+command.upgrade(Config(os.path.join(BACKEND, "alembic.ini")), "head")
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def location(client):
+    """A fresh location (dict) with coordinates."""
+    response = client.post("/locations/", json={"name": "Test Wings", "address": "1 Main St", "lat": 40.0, "lon": -75.0})
+    assert response.status_code == 200
+    return response.json()
@@ -0,0 +1,87 @@
+import pytest
+
+import auto_assign
+import geo
+import models
+from database import SessionLocal
+
+# Two locations 0.069 miles apart, well inside the default 0.1 mile range of each other
+HOME = (60.0, 100.0)
+NEXT_DOOR = (60.001, 100.0)
+
+
+@pytest.fixture
+def spots(client):
+    ids = {}
+    for name, (lat, lon) in (("Home", HOME), ("Next Door", NEXT_DOOR)):
+        ids[name] = client.post("/locations/", json={"name": f"Assign {name}", "lat": lat, "lon": lon}).json()["id"]
+    yield ids
+    # leave nothing at these coordinates behind for the next test
+    with SessionLocal() as db:
+        for model in (models.WingReview, models.WingLocation):
+            db.query(model).filter(model.lat.between(59.9, 60.1)).update({"lat": None, "lon": None})
+        db.commit()
+
+
+def _unassigned_review(client, lat, lon):
+    r = client.post("/reviews/", json={"rating": 7, "lat": lat, "lon": lon})
+    assert r.status_code == 200
+    return r.json()["id"]
+
+
+def _expected_confidence(lat, lon, max_distance=auto_assign.DEFAULT_MAX_DISTANCE):
+    d1, d2 = sorted(geo.haversine_miles(lat, lon, *spot) for spot in (HOME, NEXT_DOOR))
+    separation = 1.0 if d2 > max_distance else 1 - d1 / d2
+    return round((1 - d1 / max_distance) * separation, 4)
+
+
+def test_confidence(client, spots):
+    points = {
+        "on_top": (60.0, 100.0),         # at Home: confidence 1
+        "near": (60.0002, 100.0),        # closer to Home, Next Door in range
+        "alone": (59.9995, 100.0),       # Next Door out of range: no runner-up
+        "between": (60.0005, 100.0),     # equidistant: about 0
+        "far": (60.01, 100.0),           # nothing in range
+    }
+    ids = {name: _unassigned_review(client, *point) for name, point in points.items()}
+    _unassigned_review(client, None, None)
+
+    result = client.post("/reviews/auto-assign").json()
+    proposals = {p["review_id"]: p for p in result["assignments"] if p["review_id"] in ids.values()}
+    assert ids["far"] not in proposals
+    assert result["without_coordinates"] >= 1 and result["applied"] == 0
+    for name in ("on_top", "near", "alone", "between"):
+        p = proposals[ids[name]]
+        assert p["confidence"] == pytest.approx(_expected_confidence(*points[name]), abs=1e-4)
+        assert not p["applied"]
+    assert proposals[ids["on_top"]]["confidence"] == 1.0
+    assert proposals[ids["on_top"]]["runner_up_id"] == spots["Next Door"]
+    assert proposals[ids["alone"]]["runner_up_id"] is None
+    assert proposals[ids["alone"]]["location_id"] == spots["Home"]
+    assert proposals[ids["between"]]["confidence"] < 0.01
+    confidences = [p["confidence"] for p in result["assignments"]]
+    assert confidences == sorted(confidences, reverse=True)
+
+
+def test_apply_skips_low_confidence_and_curated_reviews(client, spots):
+    sure = _unassigned_review(client, 60.0, 100.0)
+    near = _unassigned_review(client, 59.9995, 100.0)
+    unsure = _unassigned_review(client, 60.0005, 100.0)
+
+    with SessionLocal() as db:
+        proposals, _, _ = auto_assign.propose(db)
+        db.rollback()
+        proposals = [p for p in proposals if p["review_id"] in (sure, near, unsure)]
+        # a curator places one of them before the proposals are applied
+        client.patch(f"/reviews/by-id/{near}", json={"location_id": spots["Next Door"]})
+        assert auto_assign.apply(db, proposals, min_confidence=0.5) == 1
+
+    applied = {p["review_id"]: p["applied"] for p in proposals}
+    assert applied == {sure: True, near: False, unsure: False}
+    with SessionLocal() as db:
+        placed = {r.id: r.location_id for r in db.query(models.WingReview).filter(models.WingReview.id.in_(applied))}
+        stats = {loc_id: db.get(models.LocationStats, loc_id).review_count for loc_id in spots.values()}
+        unassigned = db.get(models.WingLocation, placed[unsure])
+    assert placed[sure] == spots["Home"] and placed[near] == spots["Next Door"]
+    assert unassigned.name == auto_assign.UNASSIGNED_NAME
+    assert stats == {spots["Home"]: 1, spots["Next Door"]: 1}
@@ -0,0 +1,49 @@
+import clusters
+
+BBOX = (-75.5, 39.5, -74.5, 40.5)
+
+
+def _clusters(client, zoom):
+    r = client.get("/locations/clusters", params={"bbox": ",".join(map(str, BBOX)), "zoom": zoom})
+    assert r.status_code == 200
+    return r.json()
+
+
+def _fresh(zoom):
+    from database import SessionLocal
+
+    index = clusters.ClusterIndex()
+    with SessionLocal() as db:
+        return index.query(db, *BBOX, zoom)
+
+
+def _same(a, b):
+    assert len(a) == len(b)
+    for x, y in zip(a, b):
+        assert x.keys() == y.keys()
+        for k in x:
+            assert x[k] == y[k] or abs(x[k] - y[k]) < 1e-9, k
+
+
+def test_writes_update_cells_without_rebuild(client, location, monkeypatch):
+    _clusters(client, 3)  # build
+    builds = []
+    build = clusters.ClusterIndex._build
+    monkeypatch.setattr(clusters.ClusterIndex, "_build", lambda self, db: (builds.append(self is clusters.index), build(self, db)))
+
+    client.post("/reviews/", json={"location_id": location["id"], "rating": 9})
+    other = client.post("/locations/", json={"name": "Cluster Neighbour", "lat": 40.0001, "lon": -75.0001}).json()
+    client.post("/reviews/", json={"location_id": other["id"], "rating": 3})
+    far = client.post("/locations/", json={"name": "Cluster Far", "lat": 40.3, "lon": -74.7}).json()
+
+    for zoom in (3, 10, clusters.MAX_CLUSTER_ZOOM, clusters.MAX_CLUSTER_ZOOM + 1):
+        _same(_clusters(client, zoom), _fresh(zoom))
+    spots = {c["id"]: c for c in _clusters(client, clusters.MAX_CLUSTER_ZOOM + 1)}
+    assert spots[other["id"]]["average_rating"] == 3
+    assert far["id"] in spots
+
+    client.post("/locations/merge", json={"from_id": far["id"], "into_id": other["id"]})
+    for zoom in (0, 8, clusters.MAX_CLUSTER_ZOOM + 1):
+        _same(_clusters(client, zoom), _fresh(zoom))
+    assert far["id"] not in {c["id"] for c in _clusters(client, clusters.MAX_CLUSTER_ZOOM + 1)}
+    assert not any(builds)
@@ -0,0 +1,64 @@
+import asyncio
+
+from fastapi import Depends, Request, Response
+from sqlalchemy import text
+
+import coalesce
+import response_cache
+from database import ReadSessionLocal, get_read_db, run_db
+
+
+def _request(path):
+    return Request({"type": "http", "method": "GET", "path": path, "query_string": b"", "headers": []})
+
+
+def test_follower_gets_result_after_leader_cancels():
+    gate = asyncio.Event()
+    used = []
+
+    @response_cache.cached(list[int])
+    async def endpoint(n: int, db=Depends(get_read_db)):
+        used.append(db)
+        await gate.wait()
+        return await run_db(db, lambda session: [session.execute(text("SELECT :n"), {"n": n}).scalar()])
+
+    async def scenario():
+        leader_db, follower_db = ReadSessionLocal(), ReadSessionLocal()
+        call = dict(n=41, request=_request("/coalesce-test"))
+        leader = asyncio.create_task(endpoint(db=leader_db, response=Response(), **call))
+        await asyncio.sleep(0.01)
+        follower = asyncio.create_task(endpoint(db=follower_db, response=Response(), **call))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        leader_db.close()  # what FastAPI's dependency teardown does when the leader's request ends
+        await asyncio.sleep(0.01)
+        gate.set()
+        try:
+            return await asyncio.wait_for(follower, 5), leader.cancelled(), {leader_db, follower_db}
+        finally:
+            follower_db.close()
+
+    followers = coalesce.flights.followers
+    response, leader_cancelled, request_sessions = asyncio.run(scenario())
+    assert leader_cancelled
+    assert response.status_code == 200 and response.body == b"[41]"
+    assert coalesce.flights.followers == followers + 1
+    assert len(used) == 1 and used[0] not in request_sessions
+    assert not used[0].in_transaction()  # the flight's own session, closed when it finished
+
+
+def test_single_flight_shares_one_call():
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "done"
+
+    async def scenario():
+        flight = coalesce.SingleFlight()
+        return await asyncio.gather(*(flight.do("k", fn) for _ in range(5))), flight.stats()
+
+    results, stats = asyncio.run(scenario())
+    assert results == ["done"] * 5 and calls == [1]
+    assert stats == {"in_flight": 0, "leaders": 1, "coalesced": 4}
@@ -0,0 +1,54 @@
+import os
+import sqlite3
+
+import duplicates
+from database import SessionLocal
+
+
+def _groups(index, min_score=0.8):
+    with SessionLocal() as db:
+        return index.groups(db, min_score)
+
+
+def _members(groups):
+    return {loc_id for _, ids in groups for loc_id in ids}
+
+
+def _create(client, name, lat=42.9, lon=-78.87):
+    return client.post("/locations/", json={"name": name, "lat": lat, "lon": lon}).json()["id"]
+
+
+def test_local_writes_refresh_the_index(client):
+    index = duplicates.index
+    a = _create(client, "Zebulon's Wing Shack")
+    b = _create(client, "Zebulons Wing Shack")
+    assert {a, b} <= _members(_groups(index))
+
+    client.post("/locations/merge", json={"from_id": b, "into_id": a})
+    assert b not in _members(_groups(index))
+    c = _create(client, "Totally Different Tacos")  # SQLite hands b's id out again
+    assert c == b
+    assert a not in _members(_groups(index))  # not paired with b's stale name
+    d = _create(client, "Zebulon's Wing Shack!")
+    assert {a, d} <= _members(_groups(index))
+
+
+def test_other_workers_deletes_and_reused_ids(client, monkeypatch):
+    index = duplicates.DuplicateIndex()  # not hooked to this process's commits, like another worker's
+    a = _create(client, "Quimby Hot Wings")
+    b = _create(client, "Quimby's Hot Wings")
+    assert {a, b} <= _members(_groups(index))
+
+    db_path = os.environ["DB_PATH"]
+    with sqlite3.connect(db_path) as conn:  # bypasses the ORM, so no commit hook sees it
+        conn.execute("DELETE FROM wing_locations WHERE id = ?", (b,))
+    assert b not in _members(_groups(index))  # max(id) moved
+
+    c = _create(client, "Quimby Hot Wings Downtown")
+    assert {a, c} <= _members(_groups(index, 0.7))
+    with sqlite3.connect(db_path) as conn:  # same count, same max(id): only the TTL rebuild notices
+        conn.execute("DELETE FROM wing_locations WHERE id = ?", (c,))
+        conn.execute("INSERT INTO wing_locations (id, name) VALUES (?, 'Unrelated Pizza Place')", (c,))
+    assert c in _members(_groups(index, 0.7))
+    monkeypatch.setattr(duplicates, "INDEX_TTL", 0.0)
+    assert c not in _members(_groups(index, 0.7))
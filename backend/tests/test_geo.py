@@ -0,0 +1,72 @@
+import math
+
+import pytest
+
+import geo
+
+
+def test_bounding_box_splits_at_the_antimeridian():
+    min_lat, max_lat, lon_ranges = geo.bounding_box(-17.0, 179.9, 20)
+    assert min_lat < -17.0 < max_lat
+    (east_lo, east_hi), (west_lo, west_hi) = lon_ranges
+    assert east_lo < 179.9 and east_hi == 180.0
+    assert west_lo == -180.0 and -180.0 < west_hi < -179.5
+
+    _, _, lon_ranges = geo.bounding_box(-17.0, -179.9, 20)
+    assert lon_ranges[0][1] == 180.0 and lon_ranges[1][0] == -180.0
+    assert 179.5 < lon_ranges[0][0] < 180.0
+
+
+@pytest.mark.parametrize("lat", [89.9, -89.9])
+def test_bounding_box_covers_every_longitude_at_a_pole(lat):
+    min_lat, max_lat, lon_ranges = geo.bounding_box(lat, 10.0, 50)
+    assert lon_ranges == [(-180.0, 180.0)]
+    assert -90.0 <= min_lat and max_lat <= 90.0
+    assert max_lat == 90.0 if lat > 0 else min_lat == -90.0
+
+
+def _destination(lat, lon, bearing, miles):
+    phi, lmb, theta = math.radians(lat), math.radians(lon), math.radians(bearing)
+    delta = miles / geo.EARTH_RADIUS_MILES
+    phi2 = math.asin(math.sin(phi) * math.cos(delta) + math.cos(phi) * math.sin(delta) * math.cos(theta))
+    lmb2 = lmb + math.atan2(math.sin(theta) * math.sin(delta) * math.cos(phi), math.cos(delta) - math.sin(phi) * math.sin(phi2))
+    return math.degrees(phi2), math.degrees(lmb2)
+
+
+@pytest.mark.parametrize("lat", [0.0, 45.0, 70.0, -60.0])
+def test_bounding_box_contains_the_circle(lat):
+    radius = 300
+    min_lat, max_lat, [(min_lon, max_lon)] = geo.bounding_box(lat, 0.0, radius)
+    for bearing in range(0, 360, 5):
+        plat, plon = _destination(lat, 0.0, bearing, radius * 0.999)
+        assert min_lat <= plat <= max_lat
+        assert min_lon <= plon <= max_lon
+
+
+def test_in_bbox_across_the_antimeridian():
+    bbox = geo.parse_bbox("170,-20,-170,-10")
+    assert geo.in_bbox(-15, 175, bbox) and geo.in_bbox(-15, -175, bbox)
+    assert not geo.in_bbox(-15, 0, bbox) and not geo.in_bbox(-25, 175, bbox)
+
+
+def _names_near(client, lat, lon, max_distance):
+    r = client.get("/locations/", params={"lat": lat, "lon": lon, "max_distance": max_distance, "limit": 5000})
+    assert r.status_code == 200
+    return [loc["name"] for loc in r.json()]
+
+
+def test_distance_search_crosses_the_antimeridian(client):
+    client.post("/locations/", json={"name": "Suva East Wings", "lat": -17.0, "lon": 179.95})
+    client.post("/locations/", json={"name": "Suva West Wings", "lat": -17.0, "lon": -179.95})
+    client.post("/locations/", json={"name": "Suva Far Wings", "lat": -17.0, "lon": 178.0})
+    for lon in (179.99, -179.99):
+        names = _names_near(client, -17.0, lon, 20)
+        assert "Suva East Wings" in names and "Suva West Wings" in names
+        assert "Suva Far Wings" not in names
+
+
+def test_distance_search_near_a_pole(client):
+    client.post("/locations/", json={"name": "Pole Wings A", "lat": 89.95, "lon": 10.0})
+    client.post("/locations/", json={"name": "Pole Wings B", "lat": 89.95, "lon": -170.0})
+    names = _names_near(client, 89.9, 10.0, 50)
+    assert "Pole Wings A" in names and "Pole Wings B" in names
@@ -0,0 +1,50 @@
+import re
+
+from sqlalchemy import select
+
+import instrumentation
+import models
+from database import SessionLocal
+
+
+def _timing(response):
+    match = re.search(r'db;dur=[\d.]+;desc="(\d+) queries, (\d+) rows"', response.headers["server-timing"])
+    assert match, response.headers["server-timing"]
+    return int(match.group(1)), int(match.group(2))
+
+
+def test_server_timing_counts_core_rows(client, location):
+    for i in range(5):
+        client.post("/reviews/", json={"location_id": location["id"], "rating": 5 + i})
+    response = client.get("/reviews/", params={"limit": 4})
+    assert response.status_code == 200 and len(response.json()) == 4
+    queries, rows = _timing(response)
+    assert queries >= 1
+    assert rows >= 4  # a Core select: no ORM objects are loaded
+
+    cached = client.get("/reviews/", params={"limit": 4})
+    assert _timing(cached) == (0, 0)
+
+
+def test_rows_counted_per_fetch_style():
+    instrumentation.watch_app_engines()
+    stats = instrumentation.RequestStats()
+    token = instrumentation._current.set(stats)
+    try:
+        with SessionLocal() as db:
+            total = db.query(models.WingLocation).count()
+            stats.rows = 0
+            db.execute(select(models.WingLocation.id)).fetchmany(1)
+            assert stats.rows >= 1
+            stats.rows = 0
+            assert len(db.execute(select(models.WingLocation.id)).all()) == total == stats.rows
+            stats.rows = 0
+            assert len(list(db.query(models.WingLocation))) == total == stats.rows
+    finally:
+        instrumentation._current.reset(token)
+
+
+def test_metrics_reports_rows(client, location):
+    client.get(f"/locations/by-id/{location['id']}")
+    body = client.get("/metrics").text
+    assert re.search(r'wings_db_rows_fetched_total\{method="GET",route="/locations/by-id/\{location_id\}",status="200"\} [1-9]', body)
@@ -0,0 +1,67 @@
+import pytest
+
+AS_OF = "2001-06-30"
+
+
+@pytest.fixture(scope="module")
+def board():
+    """Locations whose only reviews fall in June/July 2001, far from every other test's data."""
+    from fastapi.testclient import TestClient
+
+    import main
+
+    client = TestClient(main.app)
+    ids = {name: client.post("/locations/", json={"name": f"Board {name}"}).json()["id"] for name in "ABC"}
+    reviews = [{"location_id": ids["A"], "rating": 10, "created_at": "2001-06-29T12:00:00"}] * 2
+    reviews += [{"location_id": ids["B"], "rating": 9, "created_at": f"2001-06-{day}T20:00:00"} for day in range(24, 30)]
+    reviews += [{"location_id": ids["B"], "rating": 9, "created_at": "2001-06-30T23:59:00"}] * 2
+    reviews += [{"location_id": ids["C"], "rating": 5, "created_at": "2001-06-25T08:00:00"}] * 3
+    # just outside the 7-day window on either side
+    reviews += [{"location_id": ids["B"], "rating": 1, "created_at": "2001-06-23T23:59:00"}]
+    reviews += [{"location_id": ids["B"], "rating": 1, "created_at": "2001-07-01T00:00:00"}]
+    assert client.post("/reviews/bulk", json=reviews).status_code < 300
+    return ids
+
+
+def _leaderboard(client, **params):
+    r = client.get("/locations/leaderboard", params={"as_of": AS_OF, **params})
+    assert r.status_code == 200
+    return r.json()
+
+
+def _expected(totals, prior_weight):
+    mean = sum(s for s, _ in totals.values()) / sum(c for _, c in totals.values())
+    return {name: (prior_weight * mean + s) / (prior_weight + c) for name, (s, c) in totals.items()}
+
+
+@pytest.mark.parametrize("prior_weight,order", [(5, "ABC"), (20, "BAC"), (0, "ABC")])
+def test_bayesian_scores(client, board, prior_weight, order):
+    rows = _leaderboard(client, window="7d", prior_weight=prior_weight)
+    names = {loc_id: name for name, loc_id in board.items()}
+    assert [names[row["id"]] for row in rows] == list(order)
+    expected = _expected({"A": (20, 2), "B": (72, 8), "C": (15, 3)}, prior_weight)
+    for rank, row in enumerate(rows, start=1):
+        name = names[row["id"]]
+        assert row["rank"] == rank
+        assert row["score"] == pytest.approx(expected[name])
+    assert {names[row["id"]]: row["window_review_count"] for row in rows} == {"A": 2, "B": 8, "C": 3}
+    assert rows[1 if order[0] == "A" else 0]["window_average"] == pytest.approx(9)
+
+
+def test_windows_follow_as_of(client, board):
+    month = {row["id"]: row for row in _leaderboard(client, window="30d", prior_weight=0)}
+    assert month[board["B"]]["window_review_count"] == 9
+    assert month[board["B"]]["window_average"] == pytest.approx(73 / 9)
+
+    later = {row["id"]: row for row in _leaderboard(client, window="7d", prior_weight=0, as_of="2001-07-01")}
+    assert later[board["B"]]["window_review_count"] == 8  # gains the 1 on 07-01, drops the 9 on 06-24
+    assert later[board["B"]]["window_average"] == pytest.approx(8)
+
+    assert _leaderboard(client, window="7d", as_of="2001-06-01") == []
+
+
+def test_min_reviews_and_paging(client, board):
+    rows = _leaderboard(client, window="7d", min_reviews=3)
+    assert [row["id"] for row in rows] == [board["B"], board["C"]]
+    page = _leaderboard(client, window="7d", skip=1, limit=1)
+    assert len(page) == 1 and page[0]["rank"] == 2
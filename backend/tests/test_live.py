@@ -0,0 +1,43 @@
+import asyncio
+import json
+import logging
+
+import live
+
+
+async def _drain(subscriber, count):
+    return [json.loads(await asyncio.wait_for(subscriber.queue.get(), 2)) for _ in range(count)]
+
+
+def test_failing_event_resyncs_and_publisher_survives(caplog):
+    async def scenario():
+        hub = live.Hub()
+        everyone = hub.subscribe(everything=True)
+        circular = {"type": "broken"}
+        circular["self"] = circular  # json.dumps raises on it
+        hub.publish(circular)
+        hub.publish({"type": "bulk", "entity": "reviews", "count": 2})
+        received = await _drain(everyone, 2)
+        alive = not hub._task.done()
+        await hub.stop()
+        return received, alive, everyone.resyncs
+
+    with caplog.at_level(logging.ERROR, logger="live"):
+        received, alive, resyncs = asyncio.run(scenario())
+    assert received == [{"type": "resync"}, {"type": "bulk", "entity": "reviews", "count": 2}]
+    assert alive and resyncs == 1
+    assert "dropping broken event" in caplog.text
+
+
+def test_restarted_publisher_keeps_queued_events():
+    async def scenario():
+        hub = live.Hub()
+        everyone = hub.subscribe(everything=True)
+        hub.publish({"type": "bulk", "entity": "reviews", "count": 1})
+        await hub.stop()  # cancelled before it ran: the event is still queued
+        hub.publish({"type": "bulk", "entity": "locations", "count": 3})
+        received = await _drain(everyone, 2)
+        await hub.stop()
+        return received
+
+    assert [event["count"] for event in asyncio.run(scenario())] == [1, 3]
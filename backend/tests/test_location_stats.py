@@ -0,0 +1,70 @@
+import pytest
+
+import location_stats
+import models
+from database import SessionLocal
+
+
+def _tables(db, ids):
+    stats = [
+        tuple(getattr(row, c.name) for c in models.LocationStats.__table__.columns)
+        for row in db.query(models.LocationStats).filter(models.LocationStats.location_id.in_(ids))
+        .order_by(models.LocationStats.location_id)
+    ]
+    daily = [
+        tuple(getattr(row, c.name) for c in models.LocationDailyStats.__table__.columns)
+        for row in db.query(models.LocationDailyStats).filter(models.LocationDailyStats.location_id.in_(ids))
+        .order_by(models.LocationDailyStats.location_id, models.LocationDailyStats.day)
+    ]
+    return stats, daily
+
+
+def _assert_matches_recount(ids):
+    with SessionLocal() as db:
+        incremental = _tables(db, ids)
+        location_stats.rebuild(db)
+        recounted = _tables(db, ids)
+        db.rollback()
+    for kept, fresh in zip(incremental, recounted):
+        assert len(kept) == len(fresh)
+        for a, b in zip(kept, fresh):
+            assert a == pytest.approx(b) if all(isinstance(x, (int, float)) for x in a) else a == b
+
+
+def test_deltas_match_a_full_recount(client):
+    one = client.post("/locations/", json={"name": "Stats One"}).json()["id"]
+    two = client.post("/locations/", json={"name": "Stats Two"}).json()["id"]
+    ids = [one, two]
+    reviews = [
+        client.post("/reviews/", json={"location_id": one, "rating": r, "heat": h, "comment": f"size: {s}"}).json()
+        for r, h, s in ((8, 5, 7), (6.5, None, 3), (9, 9, 5))
+    ]
+    client.post("/reviews/bulk", json=[
+        {"location_id": two, "rating": 4, "heat": 2, "created_at": "2026-01-05T12:00:00"},
+        {"location_id": two, "rating": 7, "created_at": "2026-01-05T18:30:00"},
+        {"location_id": two, "rating": 5, "sauce": 2, "created_at": "2025-12-31T23:59:00"},
+    ])
+    _assert_matches_recount(ids)
+
+    client.patch(f"/reviews/by-id/{reviews[0]['id']}", json={"rating": 2, "heat": None})
+    client.patch(f"/reviews/by-id/{reviews[1]['id']}", json={"location_id": two})
+    _assert_matches_recount(ids)
+
+    with SessionLocal() as db:
+        before = db.get(models.LocationStats, two).review_count + db.get(models.LocationStats, one).review_count
+    client.post("/locations/merge", json={"from_id": one, "into_id": two})
+    _assert_matches_recount(ids)
+    with SessionLocal() as db:
+        assert db.get(models.LocationStats, one) is None
+        assert db.get(models.LocationStats, two).review_count == before
+        days = {row.day.isoformat(): row.review_count for row in db.query(models.LocationDailyStats).filter_by(location_id=two)}
+    assert days["2026-01-05"] == 2 and days["2025-12-31"] == 1
+
+
+def test_add_review_creates_the_first_row(client, location):
+    client.post("/reviews/", json={"location_id": location["id"], "rating": 7.5, "heat": 4})
+    with SessionLocal() as db:
+        row = db.get(models.LocationStats, location["id"])
+        assert (row.review_count, row.rating_sum, row.rating_count, row.heat_sum) == (1, 7.5, 1, 4)
+        assert location_stats.row_average(row, "rating") == 7.5
+        assert location_stats.row_average(row, "sauce") is None
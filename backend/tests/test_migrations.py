@@ -0,0 +1,52 @@
+import os
+import sqlite3
+import subprocess
+import sys
+
+import search_index
+from conftest import BACKEND
+
+
+def _alembic(db_path, *args):
+    env = {**os.environ, "DB_PATH": db_path}
+    subprocess.run([sys.executable, "-m", "alembic", *args], cwd=BACKEND, env=env, check=True, capture_output=True)
+
+
+def _fts_schema(db_path):
+    with sqlite3.connect(db_path) as conn:
+        rows = conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE name LIKE '%fts%' AND sql IS NOT NULL "
+            "AND (type = 'trigger' OR sql LIKE 'CREATE VIRTUAL TABLE%')"
+        ).fetchall()
+    return {name: " ".join(sql.split()) for name, sql in rows}
+
+
+def test_downgrade_to_base_and_back(tmp_path):
+    db_path = str(tmp_path / "migrations.db")
+    _alembic(db_path, "upgrade", "head")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO wing_locations (name, address) VALUES ('Anchor Bar', 'Buffalo')")
+        assert conn.execute("SELECT rowid FROM locations_fts WHERE locations_fts MATCH 'anchor'").fetchall() == [(1,)]
+
+    _alembic(db_path, "downgrade", "0002")  # 0003's downgrade recreates wing_reviews and its triggers
+    assert {"wing_reviews_fts_ai", "wing_reviews_fts_ad", "wing_reviews_fts_au"} <= set(_fts_schema(db_path))
+
+    _alembic(db_path, "downgrade", "base")
+    with sqlite3.connect(db_path) as conn:
+        left = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE name NOT LIKE 'sqlite_%'")}
+    assert left == {"alembic_version"}
+
+    _alembic(db_path, "upgrade", "head")
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO wing_locations (name, address) VALUES ('Duff''s', 'Amherst')")
+        assert conn.execute("SELECT rowid FROM locations_fts WHERE locations_fts MATCH 'duff*'").fetchall() == [(1,)]
+
+
+def test_migrated_fts_schema_matches_search_index(tmp_path):
+    migrated = str(tmp_path / "migrated.db")
+    _alembic(migrated, "upgrade", "head")
+    expected = {}
+    for statement in search_index._SCHEMA:
+        words = statement.replace("IF NOT EXISTS ", "").split()
+        expected[words[3] if words[1] == "VIRTUAL" else words[2]] = " ".join(words)
+    assert _fts_schema(migrated) == expected
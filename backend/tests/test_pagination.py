@@ -0,0 +1,126 @@
+import base64
+import json
+
+import pytest
+
+import pagination
+
+
+def _token(sort, values):
+    raw = json.dumps({"s": sort, "v": values}).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+@pytest.fixture
+def locations(client):
+    ids = []
+    for i in range(7):
+        r = client.post("/locations/", json={"name": f"Cursor Spot {i}", "lat": 10.0 + i / 1000, "lon": 20.0})
+        ids.append(r.json()["id"])
+        client.post("/reviews/", json={"location_id": ids[-1], "rating": i % 4 + 5})
+    return ids
+
+
+def _walk(client, params):
+    seen, cursor = [], None
+    while True:
+        r = client.get("/locations/", params={**params, **({"cursor": cursor} if cursor else {})})
+        assert r.status_code == 200
+        seen += [loc["id"] for loc in r.json()]
+        cursor = r.headers.get("x-next-cursor")
+        if not cursor:
+            return seen
+
+
+@pytest.mark.parametrize("sort_by", [None, "rating", "reviews", "date_created", "recently_reviewed"])
+@pytest.mark.parametrize("near", [False, True])
+def test_cursor_walk_matches_one_page(client, locations, sort_by, near):
+    params = {"search": "Cursor Spot"}
+    if near:
+        params = {"lat": 10.0, "lon": 20.0, "max_distance": 5}
+    if sort_by:
+        params["sort_by"] = sort_by
+    everything = [loc["id"] for loc in client.get("/locations/", params={**params, "limit": 100}).json()]
+    assert set(locations) <= set(everything)
+    assert _walk(client, {**params, "limit": 3}) == everything
+
+
+def test_review_cursor_round_trip(client, locations):
+    everything = [r["id"] for r in client.get("/reviews/", params={"limit": 1000}).json()]
+    seen, cursor = [], None
+    while True:
+        r = client.get("/reviews/", params={"limit": 4, **({"cursor": cursor} if cursor else {})})
+        seen += [row["id"] for row in r.json()]
+        cursor = r.headers.get("x-next-cursor")
+        if not cursor:
+            break
+    assert seen == everything
+
+
+@pytest.mark.parametrize("params", [
+    {"cursor": "not base64 json"},
+    {"cursor": _token("", [1])},  # too short for the name sort
+    {"cursor": _token("", [{"x": 1}, 1])},
+    {"cursor": _token("", [[1], 1])},
+    {"cursor": _token("", [True, 1])},
+    {"cursor": _token("rating", ["x", 1]), "sort_by": "rating"},
+    {"cursor": _token("rating", [{"dt": 5}, "a", 1]), "sort_by": "rating"},
+    {"cursor": _token("rating", ["x", "Cursor Spot 1", 1]), "sort_by": "rating"},  # str where a float goes
+    {"cursor": _token("", ["x", 1]), "search": "Cursor Spot"},  # str where the relevance rank goes
+    {"cursor": _token("reviews", [1.5, "a", 1]), "sort_by": "reviews"},
+    {"cursor": _token("rating", ["x", "Cursor Spot 1", 1]), "sort_by": "rating", "lat": 10.0, "lon": 20.0},
+    {"cursor": _token("", [1]), "lat": 10.0, "lon": 20.0},
+    {"cursor": _token("rating", ["x", 1, 2]), "sort_by": "rating", "lat": 10.0, "lon": 20.0},
+    {"cursor": _token("distance", [[1], 2]), "sort_by": "distance", "lat": 10.0, "lon": 20.0},
+])
+def test_bad_location_cursor_is_400(client, locations, params):
+    r = client.get("/locations/", params=params)
+    assert r.status_code == 400, r.text
+
+
+def test_cursor_for_another_sort_is_400(client, locations):
+    first = client.get("/locations/", params={"limit": 2, "sort_by": "rating"})
+    r = client.get("/locations/", params={"limit": 2, "sort_by": "name", "cursor": first.headers["x-next-cursor"]})
+    assert r.status_code == 400
+
+
+@pytest.mark.parametrize("values", [[{"a": 1}], [[1]], [1, 2], [], ["5"], [2.5]])
+def test_bad_review_cursor_is_400(client, values):
+    assert client.get("/reviews/", params={"cursor": _token("id", values)}).status_code == 400
+
+
+def test_datetime_values_round_trip():
+    from datetime import datetime
+
+    values = [datetime(2026, 1, 2, 3, 4, 5), "name", 3]
+    assert pagination.decode_cursor(pagination.encode_cursor("x", values), "x", [datetime, str, int]) == values
+
+
+def test_forged_types_behave_alike_on_both_paths(client, locations):
+    token = _token("rating", ["x", "Cursor Spot 1", 1])
+    sql = client.get("/locations/", params={"sort_by": "rating", "cursor": token})
+    distance = client.get("/locations/", params={"sort_by": "rating", "cursor": token, "lat": 10.0, "lon": 20.0})
+    assert sql.status_code == distance.status_code == 400
+    assert sql.json() == distance.json() == {"detail": "Invalid cursor"}
+
+
+@pytest.mark.parametrize("path, params", [
+    ("/locations/", {}),
+    ("/locations/", {"lat": 10.0, "lon": 20.0}),
+    ("/reviews/", {}),
+])
+@pytest.mark.parametrize("limit", [0, -1, 5001])
+def test_out_of_range_limit_is_422(client, locations, path, params, limit):
+    assert client.get(path, params={**params, "limit": limit}).status_code == 422
+
+
+@pytest.mark.parametrize("path, params", [
+    ("/locations/", {"search": "Cursor Spot"}),
+    ("/locations/", {"lat": 10.0, "lon": 20.0}),
+    ("/reviews/", {}),
+])
+def test_limit_one_pages(client, locations, path, params):
+    first = client.get(path, params={**params, "limit": 1})
+    assert first.status_code == 200 and len(first.json()) == 1
+    second = client.get(path, params={**params, "limit": 1, "cursor": first.headers["x-next-cursor"]})
+    assert second.status_code == 200 and second.json()[0]["id"] != first.json()[0]["id"]
@@ -0,0 +1,64 @@
+import response_cache
+
+
+def test_etag_and_not_modified(client, location):
+    url = f"/locations/by-id/{location['id']}"
+    first = client.get(url)
+    etag = first.headers["etag"]
+    assert first.status_code == 200 and first.headers["cache-control"] == "no-cache"
+
+    for header in (etag, f"W/{etag}", f'"stale", {etag}', "*"):
+        r = client.get(url, headers={"If-None-Match": header})
+        assert r.status_code == 304 and r.content == b""
+        assert r.headers["etag"] == etag
+    r = client.get(url, headers={"If-None-Match": '"stale"'})
+    assert r.status_code == 200 and r.json() == first.json()
+
+
+def test_writes_invalidate(client, location):
+    url = f"/locations/by-id/{location['id']}"
+    before = client.get(url)
+    client.post("/reviews/", json={"location_id": location["id"], "rating": 9})
+    after = client.get(url, headers={"If-None-Match": before.headers["etag"]})
+    assert after.status_code == 200
+    assert after.headers["etag"] != before.headers["etag"]
+    assert after.json()["review_count"] == before.json()["review_count"] + 1
+
+
+def test_equivalent_parameters_share_an_entry(client, location):
+    client.get("/locations/", params={"lat": 40, "lon": -75})
+    hits = response_cache.cache.hits
+    for params in (
+        {"lat": "40.0", "lon": "-75.00"},
+        {"lon": -75, "lat": 40},
+        {"lat": 40, "lon": -75, "max_distance": 20, "skip": 0},
+    ):
+        assert client.get("/locations/", params=params).status_code == 200
+    assert response_cache.cache.hits == hits + 3
+    client.get("/locations/", params={"lat": 40, "lon": -75, "max_distance": 21})
+    assert response_cache.cache.hits == hits + 3
+
+
+def test_put_after_a_write_is_dropped():
+    cache = response_cache.ResponseCache(max_entries=2, ttl_seconds=60)
+    version = cache.version
+    cache.invalidate()  # a write commits while the response is computed
+    cache.put("k", version, "stale")
+    assert cache.get("k") is None
+    cache.put("k", cache.version, "fresh")
+    assert cache.get("k") == "fresh"
+
+
+def test_lru_eviction_and_ttl():
+    cache = response_cache.ResponseCache(max_entries=2, ttl_seconds=60)
+    for key in "abc":
+        cache.put(key, cache.version, key)
+    assert cache.get("a") is None and cache.get("c") == "c"
+    assert cache.stats()["evictions"] == 1
+
+    expired = response_cache.ResponseCache(max_entries=2, ttl_seconds=0)
+    expired.put("a", expired.version, "a")
+    assert expired.get("a") is None
+    disabled = response_cache.ResponseCache(max_entries=0, ttl_seconds=60)
+    disabled.put("a", disabled.version, "a")
+    assert disabled.get("a") is None
@@ -0,0 +1,72 @@
+import pytest
+
+import models
+import review_attributes
+
+COMMENT = "style: Buffalo \npresentation: 7\ncount_wing: 0\ncost: 0.00\nsauce: 2\nheat: x\nnotes: crispy"
+
+
+def test_parse_comment():
+    assert review_attributes.parse_comment(COMMENT) == {"style": "buffalo", "presentation": 7, "sauce": 2}
+    assert review_attributes.parse_comment("Cost: 9.50\ncost: 1\ndoneness: None") == {"cost": 9.5}
+    assert review_attributes.parse_comment(None) == {}
+
+
+@pytest.mark.parametrize("convert", ["presentation", "count_wing", "count_drum", "cost"])
+def test_form_zero_is_not_entered(convert):
+    assert review_attributes.CONVERTERS[convert]("0") is None
+    assert review_attributes.CONVERTERS[convert]("3") == 3
+
+
+def test_complete_keeps_given_fields():
+    review = models.WingReview(comment=COMMENT, presentation=None, sauce=0, count_drum=0)
+    review_attributes.complete(review, {"comment", "presentation", "sauce", "count_drum"})
+    assert review.presentation is None  # explicit null
+    assert review.sauce == 0  # a real score on the sauce scale
+    assert review.count_drum is None  # the form's default
+    assert review.style == "buffalo"
+
+
+def _review(client, location, **fields):
+    r = client.post("/reviews/", json={"location_id": location["id"], "rating": 8, **fields})
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def _patch(client, review, **fields):
+    r = client.patch(f"/reviews/by-id/{review['id']}", json=fields)
+    assert r.status_code == 200, r.text
+    return r.json()
+
+
+def test_create_derives_only_missing_fields(client, location):
+    review = _review(client, location, comment=COMMENT, sauce=None, presentation=0)
+    assert review["style"] == "buffalo"
+    assert review["sauce"] is None
+    assert review["presentation"] is None
+    assert review["count_wing"] is None and review["cost"] is None
+
+
+def test_edit_rederives_from_new_comment(client, location):
+    review = _review(client, location, comment="presentation: 7\nsize: 5\ndoneness: 5", doneness=8)
+    assert (review["presentation"], review["size"], review["doneness"]) == (7, 5, 8)
+
+    review = _patch(client, review, rating=6)
+    assert (review["presentation"], review["size"], review["doneness"]) == (7, 5, 8)
+
+    review = _patch(client, review, comment="presentation: 9\ndoneness: 3")
+    assert review["presentation"] == 9  # followed the comment
+    assert review["size"] is None  # its line is gone
+    assert review["doneness"] == 8  # set by the client, not from the comment
+
+    review = _patch(client, review, comment="presentation: 4", presentation=None)
+    assert review["presentation"] is None
+
+
+def test_edit_with_null_clears_without_comment_change(client, location):
+    review = _review(client, location, comment="sauce: 2")
+    assert review["sauce"] == 2
+    review = _patch(client, review, sauce=None)
+    assert review["sauce"] is None
+    review = _patch(client, review, comment="sauce: 2\nnice")
+    assert review["sauce"] is None  # cleared on purpose, not because the comment lacked it
@@ -0,0 +1,63 @@
+import pytest
+
+import search_index
+
+
+@pytest.mark.parametrize("text,expected", [
+    ("tandy top", '"tandy"* "top"*'),
+    ("  O'Malley's  ", '"O"* "Malley"* "s"*'),
+    ('hot "AND" NEAR(', '"hot"* "AND"* "NEAR"*'),
+    ("", None),
+    ("!! --", None),
+])
+def test_match_query_quotes_each_word_as_a_prefix(text, expected):
+    assert search_index.match_query(text) == expected
+
+
+def _search(client, **params):
+    r = client.get("/locations/", params=params)
+    assert r.status_code == 200
+    return [loc["name"] for loc in r.json()]
+
+
+def test_location_search_matches_prefixes_and_ranks(client):
+    client.post("/locations/", json={"name": "Quokka", "address": "9 Harbour Rd"})
+    client.post("/locations/", json={"name": "Big Lou's Sports Bar and Grill", "address": "Quokka Plaza, Suite 4, Far North Side"})
+    client.post("/locations/", json={"name": "Café Quorn", "address": "2 Elm St"})
+
+    assert _search(client, search="quok") == ["Quokka", "Big Lou's Sports Bar and Grill"]
+    assert _search(client, search="quok", sort_by="name") == ["Big Lou's Sports Bar and Grill", "Quokka"]
+    assert _search(client, search="cafe quo") == ["Café Quorn"]
+    assert _search(client, search="quok harb") == ["Quokka"]
+    assert _search(client, search="q") == _search(client, search="q", sort_by="relevance")
+
+
+def test_location_search_follows_merges(client):
+    gone = client.post("/locations/", json={"name": "Wombat Wings"}).json()["id"]
+    kept = client.post("/locations/", json={"name": "Wallaby Wings"}).json()["id"]
+    client.post("/locations/merge", json={"from_id": gone, "into_id": kept})
+    assert _search(client, search="womb") == []
+    assert _search(client, search="wall") == ["Wallaby Wings"]
+
+
+def test_review_search(client):
+    one = client.post("/locations/", json={"name": "Search One"}).json()["id"]
+    two = client.post("/locations/", json={"name": "Search Two"}).json()["id"]
+    best = client.post("/reviews/", json={"location_id": one, "rating": 8, "comment": "Crispy"}).json()["id"]
+    long = client.post("/reviews/", json={
+        "location_id": two, "rating": 6, "comment": "Sauce was fine but the skin was not very crispy at all, sadly",
+    }).json()["id"]
+    client.post("/reviews/", json={"location_id": two, "rating": 5, "comment": "Soggy"})
+
+    def found(q, **params):
+        rows = client.get("/reviews/search", params={"q": q, **params}).json()
+        return [row["id"] for row in rows if row["location_id"] in (one, two)]
+
+    assert found("cris") == [best, long]
+    assert client.get("/reviews/search", params={"q": "cris", "location_id": one}).json()[0]["location_name"] == "Search One"
+    assert found("cris", location_id=two) == [long]
+    assert found("crispy soggy") == []
+    assert client.get("/reviews/search", params={"q": "?!"}).json() == []
+
+    client.patch(f"/reviews/by-id/{best}", json={"comment": "Limp"})
+    assert found("cris") == [long]
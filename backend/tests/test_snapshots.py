@@ -0,0 +1,30 @@
+import logging
+
+import snapshots
+
+
+def test_create_logs_instead_of_printing(tmp_path, capsys, caplog):
+    with caplog.at_level(logging.INFO, logger="snapshots"):
+        path = snapshots.create(str(tmp_path))
+    assert capsys.readouterr() == ("", "")
+    assert any(record.getMessage().startswith(f"snapshot {path}") for record in caplog.records)
+    assert snapshots.list_snapshots(str(tmp_path)) == [path]
+    assert snapshots.verify(path)
+
+
+def test_scheduler_logs_failures_and_keeps_running(monkeypatch, capsys, caplog):
+    scheduler = snapshots.Scheduler(interval_hours=1e-6)
+    calls = []
+
+    def fail(interval_seconds):
+        calls.append(interval_seconds)
+        if len(calls) >= 2:
+            scheduler.stop()
+        raise OSError("disk full")
+
+    monkeypatch.setattr(snapshots, "run_if_due", fail)
+    with caplog.at_level(logging.ERROR, logger="snapshots"):
+        scheduler._run()
+    assert len(calls) == 2
+    assert capsys.readouterr().err == ""
+    assert [record.exc_info[1].args for record in caplog.records] == [("disk full",), ("disk full",)]
@@ -0,0 +1,70 @@
+import asyncio
+
+import pytest
+
+import models, schemas
+import review_attributes
+import write_queue
+from database import SessionLocal
+
+
+def _count(comment):
+    with SessionLocal() as db:
+        return db.query(models.WingReview).filter(models.WingReview.comment == comment).count()
+
+
+def _item(location_id, comment):
+    return schemas.WingReviewCreate(location_id=location_id, rating=7, comment=comment)
+
+
+def test_cancelled_waiter_and_bad_row(location, monkeypatch):
+    complete = review_attributes.complete
+
+    def fail_on_bad(review, given):
+        if review.comment == "wq bad":
+            raise ValueError("bad row")
+        complete(review, given)
+
+    monkeypatch.setattr(review_attributes, "complete", fail_on_bad)
+    writer = write_queue.ReviewWriter(max_batch=10, max_delay=0.2)
+
+    async def scenario():
+        good = asyncio.ensure_future(writer.submit(_item(location["id"], "wq good")))
+        gone = asyncio.ensure_future(writer.submit(_item(location["id"], "wq gone")))
+        bad = asyncio.ensure_future(writer.submit(_item(location["id"], "wq bad")))
+        await asyncio.sleep(0.01)
+        gone.cancel()  # the client disconnected while its batch was forming
+        results = await asyncio.wait_for(asyncio.gather(good, gone, bad, return_exceptions=True), 5)
+        # The writer survived: a later submission still goes through
+        later = await asyncio.wait_for(writer.submit(_item(location["id"], "wq later")), 5)
+        return results, later
+
+    try:
+        (good, gone, bad), later = asyncio.run(scenario())
+    finally:
+        writer.stop()
+
+    assert isinstance(good, schemas.WingReview) and good.comment == "wq good"
+    assert isinstance(gone, asyncio.CancelledError)
+    assert isinstance(bad, ValueError)
+    assert later.comment == "wq later"
+    assert [_count(c) for c in ("wq good", "wq gone", "wq bad", "wq later")] == [1, 1, 0, 1]
+
+
+def test_unknown_location_fails_alone(location):
+    writer = write_queue.ReviewWriter(max_batch=10, max_delay=0.1)
+
+    async def scenario():
+        return await asyncio.gather(
+            writer.submit(_item(location["id"], "wq ok")),
+            writer.submit(_item(10**9, "wq nowhere")),
+            return_exceptions=True,
+        )
+
+    try:
+        ok, nowhere = asyncio.run(scenario())
+    finally:
+        writer.stop()
+    assert ok.comment == "wq ok"
+    assert getattr(nowhere, "status_code", None) == 404
+    assert writer.batches == 1
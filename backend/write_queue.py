@@ -0,0 +1,170 @@
+"""Group commit for POST /reviews/ (optional; REVIEW_WRITE_QUEUE=1).
+
+Requests validate their review, enqueue it and wait. A single writer thread
+takes up to WRITE_QUEUE_MAX_BATCH queued reviews, waiting at most
+WRITE_QUEUE_MAX_DELAY_MS for more after the first, and inserts them with
+their location_stats updates in one transaction. So a burst of submissions
+pays one commit (one fsync) per batch instead of one each, and no request
+thread ever waits on SQLite's write lock. Each request gets its review back
+only after the batch has committed.
+
+If a batch fails, its reviews are retried one transaction each, so a bad
+review fails alone. A request that disconnects while waiting still has its
+review written (once); only the reply is dropped. With several uvicorn workers each worker has its own
+writer.
+"""
+import asyncio
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+
+from fastapi import HTTPException
+
+import location_stats
+import models, schemas
+import review_attributes
+from bulk_import import UNASSIGNED_ADDRESS, UNASSIGNED_NAME
+from database import SessionLocal
+
+ENABLED = os.environ.get("REVIEW_WRITE_QUEUE", "").lower() in ("1", "true", "yes")
+MAX_BATCH = int(os.environ.get("WRITE_QUEUE_MAX_BATCH", "64"))
+MAX_DELAY = float(os.environ.get("WRITE_QUEUE_MAX_DELAY_MS", "5")) / 1000
+
+
+def _unassigned_id(db) -> int:
+    loc = db.query(models.WingLocation.id).filter(models.WingLocation.name == UNASSIGNED_NAME).first()
+    if loc:
+        return loc.id
+    location = models.WingLocation(name=UNASSIGNED_NAME, address=UNASSIGNED_ADDRESS)
+    db.add(location)
+    db.flush()
+    return location.id
+
+
+def insert_reviews(db, items):
+    """Insert WingReviewCreate items and fold them into location_stats (flush, no commit).
+
+    Returns one schemas.WingReview or HTTPException per item, in order.
+    """
+    explicit = {item.location_id for item in items if item.location_id is not None}
+    known = {
+        loc_id for (loc_id,) in db.query(models.WingLocation.id).filter(models.WingLocation.id.in_(explicit))
+    } if explicit else set()
+    unassigned = None
+    results = [None] * len(items)
+    reviews = {}
+    for i, item in enumerate(items):
+        data = item.model_dump()
+        if item.location_id is None:
+            if unassigned is None:
+                unassigned = _unassigned_id(db)
+            data["location_id"] = unassigned
+        elif item.location_id not in known:
+            results[i] = HTTPException(status_code=404, detail="Location not found")
+            continue
+        reviews[i] = models.WingReview(**data)
+        review_attributes.complete(reviews[i], item.model_fields_set)
+    db.add_all(reviews.values())
+    db.flush()
+    for i, review in reviews.items():
+        location_stats.add_review(db, review)
+        results[i] = schemas.WingReview.model_validate(review)  # before commit expires the object
+    return results
+
+
+class ReviewWriter:
+    """The single writer thread and its queue of (WingReviewCreate, Future)."""
+
+    def __init__(self, max_batch: int = MAX_BATCH, max_delay: float = MAX_DELAY):
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.batches = 0
+        self.written = 0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    async def submit(self, item: schemas.WingReviewCreate) -> schemas.WingReview:
+        """Queue a review; returns it (with id) once its batch has committed."""
+        future = Future()
+        self._ensure_started()
+        self._queue.put((item, future))
+        return await asyncio.wrap_future(future)
+
+    def _ensure_started(self) -> None:
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="review-writer", daemon=True)
+                self._thread.start()
+
+    def stop(self, timeout: float = 10) -> None:
+        """Flush what is queued, then end the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(None)
+            thread.join(timeout)
+
+    def _take_batch(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is None:
+                self._queue.put(None)  # stop after this batch
+                break
+            batch.append(entry)
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._take_batch()
+            if batch is None:
+                return
+            items = [item for item, _ in batch]
+            try:
+                results = self._write(items)
+            except Exception:
+                # One bad review shouldn't fail its whole batch: retry them one transaction each
+                results = []
+                for item in items:
+                    try:
+                        results += self._write([item])
+                    except Exception as exc:
+                        results.append(exc)
+            # Only after the writes: a failure here must not look like a failed (and retried) batch
+            for (_, future), result in zip(batch, results):
+                _resolve(future, result)
+
+    def _write(self, items) -> list:
+        with SessionLocal() as db:
+            results = insert_reviews(db, items)
+            db.commit()
+        self.batches += 1
+        self.written += len(items)
+        return results
+
+
+def _resolve(future: Future, result) -> None:
+    """Hand a result to its waiting request, unless that request has gone (its future was cancelled)."""
+    if future.done():
+        return
+    try:
+        if isinstance(result, Exception):
+            future.set_exception(result)
+        else:
+            future.set_result(result)
+    except InvalidStateError:
+        pass  # cancelled between the check and the set
+
+
+writer = ReviewWriter()
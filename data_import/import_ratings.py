@@ -4,53 +4,103 @@ import requests
 # Path to the Dart ratings file
 DART_FILE = 'ratings_fixed.json'
 API_BASE = 'http://localhost:8000'
+# Rows per POST /reviews/bulk request (the server commits in its own batches)
+CHUNK_SIZE = 2000
+READ_SIZE = 64 * 1024
 
-# Helper to load the Dart file as a Python list
-def load_ratings():
-    with open(DART_FILE, 'r') as f:
-        return json.load(f)
 
-def get_or_create_location(name, address, lat=None, lon=None):
-    # Check if location exists by name only
-    resp = requests.get(f"{API_BASE}/locations/")
+def iter_ratings(path=DART_FILE):
+    """Yield entries of the top-level JSON array one at a time without loading the whole file."""
+    decoder = json.JSONDecoder()
+    with open(path, 'r') as f:
+        buffer = ''
+        started = False
+        eof = False
+        while True:
+            # Skip whitespace, the opening bracket and separators
+            stripped = buffer.lstrip()
+            if not started and stripped.startswith('['):
+                stripped = stripped[1:]
+                started = True
+            stripped = stripped.lstrip().lstrip(',').lstrip()
+            buffer = stripped
+            if started and buffer.startswith(']'):
+                return
+            if buffer and started:
+                try:
+                    entry, end = decoder.raw_decode(buffer)
+                except ValueError:
+                    if eof:
+                        raise
+                else:
+                    yield entry
+                    buffer = buffer[end:]
+                    continue
+            if eof:
+                if buffer.strip():
+                    raise ValueError(f"Unexpected trailing data in {path}")
+                return
+            chunk = f.read(READ_SIZE)
+            eof = not chunk
+            buffer += chunk
+
+
+# Rating form fields sent as typed review columns rather than comment lines
+ATTRIBUTE_FIELDS = ['heat', 'style', 'presentation', 'count_wing', 'count_drum', 'cooking_style', 'size', 'cost',
+                    'sauce', 'doneness']
+
+
+def to_bulk_row(entry):
+    fields = entry['fields']
+    # Compose a comment with the remaining fields
+    skip = ['venu_name', 'address', 'overall_rating'] + ATTRIBUTE_FIELDS
+    comment = '\n'.join(f"{k}: {v}" for k, v in fields.items() if k not in skip)
+    row = {
+        "location_name": fields['venu_name'],
+        "location_address": fields['address'],
+        "location_lat": fields.get('lat'),
+        "location_lon": fields.get('lon'),
+        "rating": fields['overall_rating'],
+        "comment": comment,
+        "created_at": fields.get('created'),
+    }
+    for key in ATTRIBUTE_FIELDS:
+        if fields.get(key) not in (None, ''):
+            row[key] = fields[key]
+    if row.get('cost') is not None:
+        row['cost'] = float(row['cost']) or None  # the form's "0.00" means no price was entered
+    return row
+
+
+def post_chunk(rows, offset):
+    body = '\n'.join(json.dumps(row) for row in rows)
+    resp = requests.post(
+        f"{API_BASE}/reviews/bulk",
+        data=body.encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+    )
     resp.raise_for_status()
-    locations = resp.json()
-    for loc in locations:
-        if loc['name'].strip().lower() == name.strip().lower():
-            return loc['id']
-    # Create location
-    payload = {"name": name, "address": address}
-    if lat is not None:
-        payload["lat"] = lat
-    if lon is not None:
-        payload["lon"] = lon
-    resp = requests.post(f"{API_BASE}/locations/", json=payload)
-    if resp.status_code != 200:
-        print(f"Failed to create location: name={name!r}, address={address!r}, lat={lat}, lon={lon}, status={resp.status_code}, response={resp.text}")
-        resp.raise_for_status()
-    return resp.json()['id']
+    result = resp.json()
+    for err in result['errors']:
+        print(f"Failed to import row {offset + err['index']} ({rows[err['index']]['location_name']!r}): {err['error']}")
+    print(f"Imported {result['inserted']} review(s), created {result['locations_created']} location(s) "
+          f"(rows {offset}-{offset + len(rows) - 1})")
+    return result
+
 
 def main():
-    ratings = load_ratings()
-    for entry in ratings:
-        fields = entry['fields']
-        name = fields['venu_name']
-        address = fields['address']
-        lat = fields.get('lat')
-        lon = fields.get('lon')
-        location_id = get_or_create_location(name, address, lat, lon)
-        # Compose a comment with all fields
-        comment = '\n'.join(f"{k}: {v}" for k, v in fields.items() if k not in ['venu_name', 'address', 'overall_rating'])
-        data = {
-            "location_id": location_id,
-            "rating": fields['overall_rating'],
-            "comment": comment
-        }
-        resp = requests.post(f"{API_BASE}/reviews/", json=data)
-        if resp.status_code == 200:
-            print(f"Imported review for {name}")
-        else:
-            print(f"Failed to import review for {name}: {resp.text}")
+    chunk = []
+    offset = 0
+    inserted = 0
+    for entry in iter_ratings():
+        chunk.append(to_bulk_row(entry))
+        if len(chunk) >= CHUNK_SIZE:
+            inserted += post_chunk(chunk, offset)['inserted']
+            offset += len(chunk)
+            chunk = []
+    if chunk:
+        inserted += post_chunk(chunk, offset)['inserted']
+    print(f"Done. Imported {inserted} review(s).")
 
 if __name__ == '__main__':
-    main() 
\ No newline at end of file
+    main()
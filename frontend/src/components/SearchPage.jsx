@@ -1,7 +1,8 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import { Link, useNavigate } from 'react-router-dom';
 import { isAdmin } from '../utils/admin';
 import { API_BASE } from '../api';
+import { subscribeLive, withSummary } from '../live';
 import './SearchPage.css';
 
 const iconColor = '#3d2914';
@@ -147,6 +148,25 @@ export default function SearchPage() {
     }
   };
 
+  // Keep the listed locations' counts and averages current from live events
+  const listedIds = locations.map((loc) => loc.id).join(',');
+  const refetch = useRef(fetchLocations);
+  refetch.current = fetchLocations; // the latest filters, not those of the render that subscribed
+  useEffect(() => {
+    if (!listedIds) return undefined;
+    return subscribeLive({ locations: listedIds.split(',').map(Number) }, (event) => {
+      if (event.type === 'resync') {
+        refetch.current();
+      } else if (event.type === 'review.created' || event.type === 'review.updated') {
+        setLocations((list) => list.map((loc) => withSummary(withSummary(loc, event.location), event.previous_location)));
+      } else if (event.type === 'location.merged') {
+        setLocations((list) => list
+          .filter((loc) => loc.id !== event.from_id)
+          .map((loc) => withSummary(loc, event.location)));
+      }
+    });
+  }, [listedIds]);
+
   const handleSearch = (e) => {
     setSearchTerm(e.target.value);
     setMode('city');
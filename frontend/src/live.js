@@ -0,0 +1,42 @@
+import { API_BASE } from './api'
+
+/**
+ * Follow the backend's live change feed (GET /live/events, server-sent events).
+ * - locations: location ids to follow; bbox: "min_lon,min_lat,max_lon,max_lat"; all: every event.
+ * - onEvent gets each event object (see backend/live.py). After a dropped connection
+ *   reconnects it gets { type: 'resync' }, since events sent in between are lost.
+ * Returns a function that closes the stream.
+ */
+export function subscribeLive({ locations = [], bbox = null, all = false }, onEvent) {
+  const params = new URLSearchParams()
+  if (locations.length) params.set('locations', locations.join(','))
+  if (bbox) params.set('bbox', bbox)
+  if (all) params.set('all', 'true')
+  if (!params.toString()) return () => {}
+  const source = new EventSource(`${API_BASE}/live/events?${params.toString()}`)
+  let dropped = false
+  source.onmessage = (e) => {
+    try {
+      onEvent(JSON.parse(e.data))
+    } catch (err) {
+      console.error('Bad live event:', err)
+    }
+  }
+  source.onerror = () => { dropped = true }
+  source.onopen = () => {
+    if (dropped) onEvent({ type: 'resync' })
+    dropped = false
+  }
+  return () => source.close()
+}
+
+/** Copy a live event's location summary (counts and averages) onto a location object. */
+export function withSummary(location, summary) {
+  if (!summary || summary.id !== location.id) return location
+  return {
+    ...location,
+    review_count: summary.review_count,
+    average_rating: summary.average_rating,
+    average_heat: summary.average_heat,
+  }
+}
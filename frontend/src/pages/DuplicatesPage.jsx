@@ -2,6 +2,7 @@ import { useEffect, useState } from 'react'
 import { Link, useSearchParams } from 'react-router-dom'
 import { isAdmin } from '../utils/admin'
 import { API_BASE } from '../api'
+import { subscribeLive } from '../live'
 
 export default function DuplicatesPage() {
   const [searchParams] = useSearchParams()
@@ -27,10 +28,12 @@ export default function DuplicatesPage() {
 
   const fetchLocationsByIds = (idsString) => {
     setError(null)
-    const url = new URL(`${API_BASE}/locations/`)
-    url.searchParams.set('ids', idsString)
-    url.searchParams.set('limit', '100')
-    return fetch(url.toString())
+    const ids = idsString.split(',').map((s) => parseInt(s.trim(), 10)).filter((n) => !Number.isNaN(n))
+    return fetch(`${API_BASE}/locations/batch-get`, {
+      method: 'POST',
+      headers: { 'Content-Type': 'application/json' },
+      body: JSON.stringify({ ids }),
+    })
       .then((res) => {
         if (!res.ok) throw new Error('Failed to load locations')
         return res.json()
@@ -67,6 +70,28 @@ export default function DuplicatesPage() {
     }
   }, [idsParam])
 
+  // Review counts patch in place; new, merged or bulk-imported locations change the groups, so refetch
+  useEffect(() => {
+    if (!isAdmin()) return undefined
+    const selection = idsParam && idsParam.trim()
+    return subscribeLive({ all: true }, (event) => {
+      if (event.type === 'review.created' || event.type === 'review.updated') {
+        const summaries = [event.location, event.previous_location].filter(Boolean)
+        setGroups((list) => list.map((group) => ({
+          ...group,
+          locations: group.locations.map((loc) => {
+            const summary = summaries.find((s) => s.id === loc.id)
+            return summary ? { ...loc, review_count: summary.review_count } : loc
+          }),
+        })))
+      } else if (selection) {
+        fetchLocationsByIds(selection)
+      } else {
+        fetchDuplicates()
+      }
+    })
+  }, [idsParam])
+
   const handleMerge = async (fromId, intoId) => {
     if (fromId === intoId) return
     setMergeResult(null)
@@ -126,7 +151,7 @@ export default function DuplicatesPage() {
       <p style={{ color: '#666', marginBottom: '1.5rem' }}>
         {fromSearchSelection
           ? 'Pick one location to keep and merge the others into it. Reviews from merged locations will move to the chosen one.'
-          : 'Locations grouped by normalized name. Pick one to keep and merge the others into it.'}
+          : 'Locations grouped by similar names or nearby coordinates. Pick one to keep and merge the others into it.'}
       </p>
 
       {mergeResult && (
@@ -136,7 +161,7 @@ export default function DuplicatesPage() {
       )}
 
       {groups.length === 0 ? (
-        <p style={{ color: '#666' }}>No duplicate groups found. Names are matched after normalizing (lowercase, trim).</p>
+        <p style={{ color: '#666' }}>No duplicate groups found. Names are compared after normalizing (case, punctuation, spacing).</p>
       ) : (
         <div style={{ display: 'flex', flexDirection: 'column', gap: '1.5rem' }}>
           {groups.map((group) => (
@@ -146,7 +171,7 @@ export default function DuplicatesPage() {
               style={{ border: '1px solid #ddd', borderRadius: 8, padding: '1rem', background: '#fafafa' }}
             >
               <h3 style={{ margin: '0 0 0.75rem', fontSize: '1rem', color: '#1a1a1a' }}>
-                “{group.normalized_name}” ({group.locations.length} locations)
+                “{group.normalized_name}” ({group.locations.length} locations{typeof group.score === 'number' ? `, similarity ${Math.round(group.score * 100)}%` : ''})
               </h3>
               <ul style={{ listStyle: 'none', padding: 0, margin: 0 }}>
                 {group.locations.map((loc) => (
@@ -1,6 +1,7 @@
 import { useEffect, useState } from 'react'
-import { useParams, Link } from 'react-router-dom'
+import { useParams, Link, useNavigate } from 'react-router-dom'
 import { API_BASE } from '../api'
+import { subscribeLive, withSummary } from '../live'
 
 function formatReviewDate(isoString) {
   if (!isoString) return '—'
@@ -19,19 +20,26 @@ export default function LocationDetailPage() {
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState(null)
   const [reviewsError, setReviewsError] = useState(null)
+  const [reloadKey, setReloadKey] = useState(0) // bumped to refetch after a live resync
+  const navigate = useNavigate()
 
   useEffect(() => {
     let cancelled = false
     setLoading(true)
     setError(null)
     setReviewsError(null)
-    fetch(`${API_BASE}/locations/by-id/${id}`)
+    // One round trip: the location, its averages and its reviews (newest first)
+    fetch(`${API_BASE}/locations/by-id/${id}?include=reviews,stats&reviews_limit=500`)
       .then((res) => {
         if (!res.ok) throw new Error(res.status === 404 ? 'Location not found' : 'Failed to load location')
         return res.json()
       })
       .then((locData) => {
-        if (!cancelled) setLocation(locData)
+        if (cancelled) return
+        const { reviews: reviewsData, ...loc } = locData
+        setLocation(loc)
+        if (Array.isArray(reviewsData)) setReviews(reviewsData)
+        else setReviewsError('Could not load reviews')
       })
       .catch((err) => {
         if (!cancelled) setError(err.message)
@@ -39,30 +47,30 @@ export default function LocationDetailPage() {
       .finally(() => {
         if (!cancelled) setLoading(false)
       })
-    fetch(`${API_BASE}/reviews/?location_id=${id}&limit=500`)
-      .then((res) => {
-        if (!res.ok) {
-          return res.text().then((t) => {
-            throw new Error(t?.slice(0, 80) || `Reviews error ${res.status}`)
-          })
-        }
-        return res.json()
-      })
-      .then((reviewsData) => {
-        if (!cancelled) {
-          const list = Array.isArray(reviewsData) ? reviewsData : []
-          list.sort((a, b) => {
-            const ta = a.created_at ? new Date(a.created_at).getTime() : 0
-            const tb = b.created_at ? new Date(b.created_at).getTime() : 0
-            return tb - ta
-          })
-          setReviews(list)
-        }
-      })
-      .catch((err) => {
-        if (!cancelled) setReviewsError(err?.message || 'Could not load reviews')
-      })
     return () => { cancelled = true }
+  }, [id, reloadKey])
+
+  // Patch the page from live events instead of refetching it
+  useEffect(() => {
+    const locationId = Number(id)
+    return subscribeLive({ locations: [locationId] }, (event) => {
+      if (event.type === 'resync') {
+        setReloadKey((k) => k + 1)
+      } else if (event.type === 'review.created' || event.type === 'review.updated') {
+        const review = event.review
+        setLocation((loc) => loc && withSummary(withSummary(loc, event.location), event.previous_location))
+        setReviews((list) => {
+          const rest = list.filter((r) => r.id !== review.id)
+          if (review.location_id !== locationId) return rest // moved to another location
+          const index = list.findIndex((r) => r.id === review.id)
+          if (index === -1) return [review, ...rest]
+          return list.map((r) => (r.id === review.id ? review : r))
+        })
+      } else if (event.type === 'location.merged') {
+        if (event.from_id === locationId) navigate(`/locations/${event.into_id}`, { replace: true })
+        else setReloadKey((k) => k + 1) // reviews moved in
+      }
+    })
   }, [id])
 
   if (loading) return <div style={{ maxWidth: 700, margin: 'auto', padding: 20, textAlign: 'left' }}>Loading…</div>